@@ -46,6 +46,9 @@ class CodonTable(object):
     back_table = {}       # for back translations
     start_codons = []
     stop_codons = []
+    # Codon to amino acid dictionary, filled in by Bio.Seq when translating
+    # (a class attribute so AmbiguousCodonTable won't forward it):
+    _codon_lookup = None
     # Not always called from derived classes!
     def __init__(self, nucleotide_alphabet = nucleotide_alphabet,
                  protein_alphabet = protein_alphabet,
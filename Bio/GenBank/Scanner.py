@@ -28,10 +28,48 @@ ftp://ftp.ncbi.nih.gov/genbank/docs/
 
 import warnings
 import re
+from StringIO import StringIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.Alphabet import generic_protein
 
+class _RecordingHandle(object):
+    """Handle wrapper keeping a copy of all the lines read (PRIVATE)."""
+    def __init__(self, handle):
+        self._handle = handle
+        self.lines = []
+
+    def readline(self):
+        line = self._handle.readline()
+        self.lines.append(line)
+        return line
+
+class _LazyFeaturesRecord(SeqRecord):
+    """SeqRecord which only parses its feature table when needed (PRIVATE).
+
+    The feature table is held as a string, and only turned into SeqFeature
+    objects the first time the features property is used. If you only need
+    the identifiers, annotations and sequences this saves a lot of time.
+    """
+    #Tuple of the scanner class, feature table string, sequence type and
+    #expected sequence length (or None once parsed).
+    _feature_table = None
+
+    def _get_features(self):
+        if self._feature_table is not None:
+            scanner_class, text, seq_type, expected_size = self._feature_table
+            self._features = scanner_class()._parse_feature_table(text,
+                                                seq_type, expected_size)
+            self._feature_table = None
+        return self._features
+
+    def _set_features(self, value):
+        self._feature_table = None
+        self._features = value
+
+    features = property(fget=_get_features, fset=_set_features,
+                        doc="List of SeqFeature objects (parsed on demand).")
+
 class InsdcScanner(object):
     """Basic functions for breaking up a GenBank/EMBL file into sub sections.
 
@@ -364,7 +402,41 @@ class InsdcScanner(object):
         """
         pass
 
-    def feed(self, handle, consumer, do_features=True):
+    def _read_feature_table(self):
+        """Returns the feature table as a string for parsing later (PRIVATE).
+
+        Returns None if there is no feature table. Like parse_features with
+        skip=True, but keeps the raw lines (including the line after the
+        table, so that it can be parsed on its own later).
+        """
+        if self.line.rstrip() not in self.FEATURE_START_MARKERS:
+            return None
+        first_line = self.line
+        handle = self.handle
+        self.handle = _RecordingHandle(handle)
+        try:
+            self.parse_features(skip=True)
+            lines = self.handle.lines
+        finally:
+            self.handle = handle
+        return first_line.rstrip() + "\n" + "".join(lines)
+
+    def _parse_feature_table(self, text, seq_type, expected_size):
+        """Returns a list of SeqFeature objects from _read_feature_table (PRIVATE)."""
+        from Bio.GenBank import _FeatureConsumer
+        from Bio.GenBank.utils import FeatureValueCleaner
+
+        consumer = _FeatureConsumer(use_fuzziness = 1, 
+                    feature_cleaner = FeatureValueCleaner())
+        #The location parsing depends on these:
+        consumer._seq_type = seq_type
+        consumer._expected_size = expected_size
+        self.set_handle(StringIO(text))
+        self.line = self.handle.readline()
+        self._feed_feature_table(consumer, self.parse_features(skip=False))
+        return consumer.data.features
+
+    def feed(self, handle, consumer, do_features=True, lazy=False):
         """Feed a set of data into the consumer.
 
         This method is intended for use with the "old" code in Bio.GenBank
@@ -374,6 +446,9 @@ class InsdcScanner(object):
         consumer - The consumer that should be informed of events.
         do_features - Boolean, should the features be parsed?
                       Skipping the features can be much faster.
+        lazy - Boolean, should the feature table be kept as a string
+               to be parsed only when the record's features are used?
+               Requires a consumer whose data is a _LazyFeaturesRecord.
 
         Return values:
         true  - Passed a record
@@ -396,7 +471,14 @@ class InsdcScanner(object):
         self._feed_header_lines(consumer, self.parse_header())
 
         #Features (common to both EMBL and GenBank):
-        if do_features:
+        if do_features and lazy:
+            consumer.start_feature_table()
+            text = self._read_feature_table()
+            if text is not None:
+                consumer.data._feature_table = (self.__class__, text,
+                                                consumer._seq_type,
+                                                consumer._expected_size)
+        elif do_features:
             self._feed_feature_table(consumer, self.parse_features(skip=False))
         else:
             self.parse_features(skip=True) # ignore the data
@@ -414,9 +496,12 @@ class InsdcScanner(object):
         #And we are done
         return True
 
-    def parse(self, handle, do_features=True):
+    def parse(self, handle, do_features=True, lazy=False):
         """Returns a SeqRecord (with SeqFeatures if do_features=True)
 
+        If lazy=True, the feature table is only parsed into SeqFeature
+        objects when the record's features are first used.
+
         See also the method parse_records() for use on multi-record files.
         """
         from Bio.GenBank import _FeatureConsumer
@@ -424,25 +509,28 @@ class InsdcScanner(object):
 
         consumer = _FeatureConsumer(use_fuzziness = 1, 
                     feature_cleaner = FeatureValueCleaner())
+        if lazy:
+            consumer.data = _LazyFeaturesRecord(None, id=None, description="")
 
-        if self.feed(handle, consumer, do_features):
+        if self.feed(handle, consumer, do_features, lazy):
             return consumer.data
         else:
             return None
 
     
-    def parse_records(self, handle, do_features=True):
+    def parse_records(self, handle, do_features=True, lazy=False):
         """Returns a SeqRecord object iterator
 
         Each record (from the ID/LOCUS line to the // line) becomes a SeqRecord
 
         The SeqRecord objects include SeqFeatures if do_features=True
+        (parsed only when first used if lazy=True)
         
         This method is intended for use in Bio.SeqIO
         """
         #This is a generator function
         while True:
-            record = self.parse(handle, do_features)
+            record = self.parse(handle, do_features, lazy)
             if record is None : break
             assert record.id is not None
             assert record.name != "<unknown name>"
@@ -49,6 +49,9 @@ class Atom(object):
      
         """
         self.level="A"
+        # CoordinateStore (if any) with the coordinates, and the row there
+        self._store=None
+        self._index=None
         # Reference to the residue 
         self.parent=None
         # the atomic data
@@ -71,6 +74,30 @@ class Atom(object):
         self.element = self._assign_element(element)
         self.mass = self._assign_atom_mass()
         
+    @classmethod
+    def _from_store(cls, store, index, name, bfactor, occupancy, altloc,
+                    fullname, serial_number, element):
+        """Make an Atom for a row already added to a CoordinateStore (PRIVATE).
+
+        This gives the same as creating an Atom with the coordinates in the
+        row and adding it to the store, but is quicker.  Used when building
+        many atoms at once (see StructureBuilder.init_atoms).
+        """
+        atom=cls.__new__(cls)
+        atom.__dict__.update(level="A", parent=None, name=name,
+                             fullname=fullname, coord=store._rows[index],
+                             bfactor=bfactor, occupancy=occupancy,
+                             altloc=altloc, full_id=None, id=name,
+                             disordered_flag=0, anisou_array=None,
+                             siguij_array=None, sigatm_array=None,
+                             serial_number=serial_number, xtra={},
+                             _store=store, _index=index)
+        store.atoms.append(atom)
+        assert not element or element == element.upper(), element
+        atom.element=atom._assign_element(element)
+        atom.mass=atom._assign_atom_mass()
+        return atom
+
     def _assign_element(self, element):
         """Tries to guess element from atom name if not recognised."""
         if not element or element.capitalize() not in IUPACData.atom_weights:
@@ -107,9 +134,33 @@ class Atom(object):
         else:
             return float('NaN')
 
+    def _in_store(self):
+        "Whether the coordinates are a row of a CoordinateStore (PRIVATE)."
+        store=self._store
+        return store is not None and self.coord is store._rows[self._index]
+
 
     # Special methods   
 
+    def __getstate__(self):
+        "The coordinates of an atom in a CoordinateStore are pickled there."
+        if self._in_store():
+            state=self.__dict__.copy()
+            del state["coord"]
+            return state
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        store=state.get("_store")
+        if store is None:
+            # e.g. pickled by an older version
+            self._store=None
+            self._index=None
+        elif "coord" not in state and "_rows" in store.__dict__:
+            self.coord=store._rows[self._index]
+        # Otherwise the store does this once it is unpickled
+
     def __repr__(self):
         "Print Atom object as <Atom atom_name>."
         return "<Atom %s>" % self.get_id()
@@ -136,7 +187,11 @@ class Atom(object):
         self.bfactor=bfactor
 
     def set_coord(self, coord):
-        self.coord=coord
+        if self._in_store():
+            # Keep using the row of the CoordinateStore
+            self.coord[:]=coord
+        else:
+            self.coord=coord
 
     def set_altloc(self, altloc):
         self.altloc=altloc
@@ -274,7 +329,7 @@ class Atom(object):
         @param tran: the translation vector
         @type tran: size 3 Numeric array
         """
-        self.coord=numpy.dot(self.coord, rot)+tran
+        self.set_coord(numpy.dot(self.coord, rot)+tran)
         
     def get_vector(self):
         """
@@ -294,6 +349,9 @@ class Atom(object):
         # Do a shallow copy then explicitly copy what needs to be deeper.
         shallow = copy.copy(self)
         shallow.detach_parent()
+        # The copy is not in the CoordinateStore (if any)
+        shallow._store = None
+        shallow._index = None
         shallow.set_coord(copy.copy(self.get_coord()))
         return shallow
 
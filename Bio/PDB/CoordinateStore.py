@@ -0,0 +1,257 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Columnar storage of the atomic coordinates of a Structure object.
+
+The StructureBuilder puts the coordinates of all the atoms of a Structure
+into a single Nx3 NumPy array (held in a CoordinateStore object).  The
+coord attribute of each Atom object is simply a view of its row of this
+array, so atom.get_coord() is as quick as ever, changes to the array show
+up in the atoms, and changes to the atom coordinates (in place, or with
+set_coord or transform) update the array.  The store also gives arrays of
+the B factors, occupancies, elements and serial numbers, which are made
+from the atoms when asked for (so are copies).
+
+This means operations on all the atoms can be done as single NumPy
+operations on the arrays rather than atom by atom, e.g.
+
+>>> from Bio.PDB.PDBParser import PDBParser
+>>> structure = PDBParser().get_structure("1A8O", "PDB/1A8O.pdb")
+>>> store = structure.coordinate_store
+>>> len(store), store.coord.shape
+(644, (644, 3))
+>>> sulphurs = store.select(store.element == "S")
+>>> [atom.get_parent().get_resname() for atom in sulphurs]
+['CYS', 'CYS']
+>>> store.select(store.bfactor > 60)
+[<Atom O>, <Atom O>, <Atom O>]
+
+All the atoms built into the structure are in the store, including every
+alternative location of disordered atoms (and any atoms later detached
+from the structure).
+
+The PDB parser reserves a row for every atom in the file before building
+the structure, so the array is not reallocated while parsing.  If more
+atoms are added later than there is room for, the array is reallocated
+and the atoms moved to views of the new one; arrays taken from the store
+(or from atom.get_coord()) before then are no longer linked to it.
+Likewise an atom whose coord attribute is replaced by another array
+(rather than changed in place or with set_coord) no longer uses the store.
+"""
+
+import numpy
+
+from Bio.PDB.PDBExceptions import PDBException
+
+
+class CoordinateStore(object):
+    """Array of the coordinates of many atoms.
+
+    The coord array has one row per atom, in the order the atoms were
+    added, and the Atom objects themselves are in the atoms list.  The
+    bfactor, occupancy, element and serial_number arrays are made from
+    the atoms in the same order (missing serial numbers are given as -1).
+    """
+    def __init__(self, capacity=0):
+        self.atoms=[]
+        self._coord=numpy.zeros((capacity, 3))
+        # The views of the rows which the atoms have as their coord
+        self._rows=[]
+
+    # Special methods
+
+    def __len__(self):
+        "Return the number of atoms."
+        return len(self.atoms)
+
+    def __repr__(self):
+        return "<CoordinateStore with %i atoms>" % len(self)
+
+    def __getstate__(self):
+        "Only pickle the used rows of the array."
+        state=self.__dict__.copy()
+        state["_coord"]=self.coord
+        del state["_rows"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rows=list(self._coord)
+        # Atoms already unpickled (the others see Atom.__setstate__)
+        for atom, row in zip(self.atoms, self._rows):
+            if "_store" in atom.__dict__ and "coord" not in atom.__dict__:
+                atom.coord=row
+
+    # Private methods
+
+    def _resize(self, capacity):
+        n=len(self.atoms)
+        new=numpy.zeros((max(capacity, n), 3))
+        new[:n]=self._coord[:n]
+        self._coord=new
+        rows=list(new[:n])
+        for atom, old, row in zip(self.atoms, self._rows, rows):
+            if atom.coord is old:
+                atom.coord=row
+        self._rows=rows
+
+    def _indices(self, atom_list):
+        """Return the row numbers of the atoms, or None (PRIVATE).
+
+        Returns None unless all the atoms use their row of this store.
+        """
+        rows=self._rows
+        indices=numpy.empty(len(atom_list), numpy.intp)
+        for i, atom in enumerate(atom_list):
+            if getattr(atom, "_store", None) is not self \
+               or atom.coord is not rows[atom._index]:
+                return None
+            indices[i]=atom._index
+        return indices
+
+    # Public methods
+
+    def reserve(self, count):
+        """Make room for count more atoms, so adding them does not reallocate."""
+        needed=len(self.atoms)+count
+        if needed>len(self._coord):
+            self._resize(needed)
+
+    def add(self, atom):
+        """Move the coordinates of an Atom object into the store.
+
+        The atom is given the next row of the array, and its coord becomes
+        a view of that row.  Returns the row number.
+        """
+        if atom._store is not None:
+            raise PDBException("%r is already in a CoordinateStore" % atom)
+        index=len(self.atoms)
+        if index==len(self._coord):
+            #Grow the array geometrically, so adding is O(1) on average
+            self._resize(max(2*index, 64))
+        row=self._coord[index]
+        row[:]=atom.coord
+        atom.coord=row
+        atom._store=self
+        atom._index=index
+        self._rows.append(row)
+        self.atoms.append(atom)
+        return index
+
+    def extend(self, coord):
+        """Add rows for several atoms at once, returns the first row number.
+
+        This only adds the coordinates; the caller must make an Atom object
+        for each new row (see Atom._from_store), in the same order.
+        """
+        start=len(self.atoms)
+        end=start+len(coord)
+        if end>len(self._coord):
+            self._resize(max(2*len(self._coord), end, 64))
+        new=self._coord[start:end]
+        new[:]=coord
+        self._rows.extend(new)
+        return start
+
+    def trim(self):
+        """Release any spare rows kept for adding more atoms.
+
+        This reallocates the array, see above.
+        """
+        self._resize(len(self))
+
+    @property
+    def coord(self):
+        "Nx3 array of the atomic coordinates (a view, so may be modified)."
+        return self._coord[:len(self.atoms)]
+
+    @property
+    def bfactor(self):
+        "Array of the B factors (a copy)."
+        return numpy.array([_as_float(a.bfactor) for a in self.atoms], float)
+
+    @property
+    def occupancy(self):
+        "Array of the occupancies (a copy)."
+        return numpy.array([_as_float(a.occupancy) for a in self.atoms], float)
+
+    @property
+    def element(self):
+        "Array of the elements as strings (a copy)."
+        element=numpy.empty(len(self.atoms), object)
+        element[:]=[a.element for a in self.atoms]
+        return element
+
+    @property
+    def serial_number(self):
+        "Array of the atom serial numbers, -1 if missing (a copy)."
+        return numpy.array([_serial(a.serial_number) for a in self.atoms],
+                           numpy.int64)
+
+    def select(self, selection):
+        """Return a list of the atoms for a boolean mask or row numbers."""
+        selection=numpy.asarray(selection)
+        if selection.dtype==bool:
+            selection=numpy.flatnonzero(selection)
+        atoms=self.atoms
+        return [atoms[i] for i in selection]
+
+    def transform(self, rot, tran, selection=None):
+        """
+        Apply rotation and translation to the atomic coordinates.
+
+        The coordinates of all the atoms (or of those selected by a boolean
+        mask or row numbers) are transformed by one matrix multiplication.
+
+        @param rot: A right multiplying rotation matrix
+        @type rot: 3x3 Numeric array
+
+        @param tran: the translation vector
+        @type tran: size 3 Numeric array
+        """
+        coord=self.coord
+        if selection is None:
+            coord[:]=numpy.dot(coord, rot)+tran
+        else:
+            coord[selection]=numpy.dot(coord[selection], rot)+tran
+
+    def distances(self, center):
+        "Return an array of the distance of each atom from center."
+        diff=self.coord-center
+        return numpy.sqrt((diff*diff).sum(axis=1))
+
+    def search(self, center, radius):
+        "Return the atoms within radius of center."
+        return self.select(self.distances(center)<=radius)
+
+
+def _serial(serial_number):
+    """Serial number for the array, -1 if missing (PRIVATE)."""
+    if serial_number is None:
+        return -1
+    return serial_number
+
+
+def _as_float(value):
+    """Convert a B factor or occupancy to float, NaN if missing (PRIVATE)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def get_coords(atom_list):
+    """Return an Nx3 array of the coordinates of a list of atoms.
+
+    If all the atoms use rows of the same CoordinateStore, these are taken
+    from its array directly.
+    """
+    if atom_list:
+        store=getattr(atom_list[0], "_store", None)
+        if store is not None:
+            indices=store._indices(atom_list)
+            if indices is not None:
+                return store._coord[indices]
+    return numpy.array([a.get_coord() for a in atom_list])
@@ -208,6 +208,13 @@ class DisorderedEntityWrapper(object):
             raise AttributeError
         return getattr(self.selected_child, method)
 
+    def __getstate__(self):
+        "Pickle the wrapper itself, not forwarding this to the child."
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __getitem__(self, id):
         "Return the child with the given id."
         return self.selected_child[id]
@@ -10,6 +10,7 @@ import numpy
 from Bio.KDTree import KDTree
 
 from Bio.PDB.PDBExceptions import PDBException
+from Bio.PDB.CoordinateStore import get_coords
 from Bio.PDB.Selection import unfold_entities, entity_levels, uniqueify
 
 
@@ -33,10 +34,8 @@ class NeighborSearch(object):
         with this to optimize speed if you feel like it.
         """
         self.atom_list=atom_list
-        # get the coordinates
-        coord_list = [a.get_coord() for a in atom_list]
-        # to Nx3 array of type float
-        self.coords=numpy.array(coord_list).astype("f")
+        # get the coordinates as Nx3 array of type float
+        self.coords=get_coords(atom_list).astype("f")
         assert(bucket_size>1)
         assert(self.coords.shape[1]==3)
         self.kdt=KDTree(3, bucket_size)
@@ -252,6 +252,29 @@ class PDBList(object):
         return final_file
             
 
+    def get_local_file(self, pdb_code, obsolete=0):
+        """Returns the filename of a structure in the local file tree, or None.
+
+        Looks for the pdbXXXX.ent file (or pdbXXXX.ent.gz, as in a mirror
+        of the PDB) as stored by retrieve_pdb_file, in either a PDB-style
+        directory tree or a flat tree.  If obsolete==1, looks in the tree
+        of obsolete files instead.
+
+        @return: filename, or None if the structure is not there
+        @rtype: string
+        """
+        code=pdb_code.lower()
+        if not obsolete:
+            tree=self.local_pdb
+        else:
+            tree=self.obsolete_pdb
+        for path in (os.path.join(tree, code[1:3]), tree):
+            for filename in ("pdb%s.ent" % code, "pdb%s.ent.gz" % code):
+                filename=os.path.join(path, filename)
+                if os.path.isfile(filename):
+                    return filename
+        return None
+
     def update_pdb(self):
         """
         I guess this is the 'most wanted' function from this module.
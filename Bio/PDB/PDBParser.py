@@ -23,6 +23,16 @@ from Bio.PDB.parse_pdb_header import _parse_pdb_header_list
 # If PDB spec says "COLUMNS 18-20" this means line[17:20]
 
 
+def _columns(records, start, end):
+    """Fixed width column of an array of lines, as a NumPy string array (PRIVATE).
+
+    Takes a 2D array of the characters of the lines (as bytes), and
+    returns a 1D array of the strings line[start:end] for each line.
+    """
+    column=numpy.ascontiguousarray(records[:, start:end])
+    return column.view("S%i" % (end-start)).ravel()
+
+
 class PDBParser(object):
     """
     Parse a PDB file and return a Structure object.
@@ -105,7 +115,9 @@ class PDBParser(object):
         # Extract the header; return the rest of the file
         self.header, coords_trailer=self._get_header(header_coords_trailer)
         # Parse the atomic data; return the PDB file trailer
-        self.trailer=self._parse_coordinates(coords_trailer)
+        self.trailer=self._parse_coordinates_fast(coords_trailer)
+        if self.trailer is None:
+            self.trailer=self._parse_coordinates(coords_trailer)
     
     def _get_header(self, header_coords_trailer):
         "Get the header of the PDB file, return the rest."
@@ -124,8 +136,16 @@ class PDBParser(object):
         header_dict=_parse_pdb_header_list(header)
         return header_dict, coords_trailer
     
+    def _reserve_atoms(self, count):
+        """Tell the structure builder how many atoms are coming (PRIVATE)."""
+        reserve=getattr(self.structure_builder, "_reserve_atoms", None)
+        if reserve is not None:
+            reserve(count)
+
     def _parse_coordinates(self, coords_trailer):
         "Parse the atomic data in the PDB file."
+        self._reserve_atoms(len([line for line in coords_trailer
+                                 if line[0:6] in ("ATOM  ", "HETATM")]))
         local_line_counter=0
         structure_builder=self.structure_builder
         current_model_id=0
@@ -266,6 +286,218 @@ class PDBParser(object):
         self.line_counter=self.line_counter+local_line_counter
         return []
 
+    def _parse_coordinates_fast(self, coords_trailer):
+        """Parse the atomic data in the PDB file in bulk (PRIVATE).
+
+        Gives the same result as _parse_coordinates, but decodes the fixed
+        columns of all the ATOM/HETATM lines at once using NumPy, and then
+        builds the hierarchy with one call to the structure builder per
+        residue (using its init_atoms method).
+
+        Returns None without building anything if the builder does not
+        support this (e.g. it overrides init_atom but not init_atoms), or
+        if any field cannot be decoded (so the line by line parser can give
+        the appropriate errors and warnings).
+        """
+        structure_builder=self.structure_builder
+        supported=getattr(structure_builder, "_init_atoms_supported", None)
+        if supported is None or not supported() or not coords_trailer:
+            return None
+        try:
+            lines=numpy.array(coords_trailer, "S80")
+        except (UnicodeError, ValueError):
+            return None
+        chars=lines.view(numpy.uint8).reshape(len(lines), 80)
+        record_types=_columns(chars, 0, 6)
+        # End of atomic data
+        end=numpy.flatnonzero((record_types=="END   ")|(record_types=="CONECT"))
+        if len(end):
+            end=int(end[0])
+            chars=chars[:end]
+            record_types=record_types[:end]
+        else:
+            end=len(lines)
+        hetatm=record_types=="HETATM"
+        atom_lines=numpy.flatnonzero((record_types=="ATOM  ")|hetatm)
+        model_lines=numpy.flatnonzero((record_types=="MODEL ")|
+                                      (record_types=="ENDMDL"))
+        extra_lines=numpy.flatnonzero((record_types=="ANISOU")|
+                                      (record_types=="SIGUIJ")|
+                                      (record_types=="SIGATM"))
+        if len(extra_lines) and (not len(atom_lines) or
+                                 extra_lines[0]<atom_lines[0]):
+            # These would apply to an atom from before
+            return None
+        records=chars[atom_lines]
+        hetatm=hetatm[atom_lines]
+        try:
+            coords=numpy.empty((len(atom_lines), 3))
+            coords[:, 0]=_columns(records, 30, 38).astype(float)
+            coords[:, 1]=_columns(records, 38, 46).astype(float)
+            coords[:, 2]=_columns(records, 46, 54).astype(float)
+            # The coordinates were always single precision
+            coords=coords.astype("f")
+            occupancies=_columns(records, 54, 60).astype(float)
+            bfactors=_columns(records, 60, 66).astype(float)
+            resseqs=_columns(records, 22, 26).astype(int)
+        except ValueError:
+            return None
+        serial_column=_columns(records, 6, 11)
+        try:
+            serial_numbers=serial_column.astype(int)
+        except ValueError:
+            serial_numbers=numpy.zeros(len(atom_lines), int)
+            for i, serial in enumerate(serial_column):
+                try:
+                    serial_numbers[i]=int(serial)
+                except ValueError:
+                    serial_numbers[i]=0
+        fullnames=_columns(records, 12, 16).tolist()
+        altlocs=_columns(records, 16, 17)
+        resnames=_columns(records, 17, 20)
+        chainids=_columns(records, 21, 22)
+        icodes=_columns(records, 26, 27)
+        segids=_columns(records, 72, 76)
+        elements=numpy.char.strip(_columns(records, 76, 78)).tolist()
+        water=(resnames=="HOH")|(resnames=="WAT")
+        hetero_flags=numpy.where(hetatm, numpy.where(water, "W", "H"), " ")
+        disordered=altlocs!=" "
+        # Where a new residue (or chain etc) might start, i.e. atoms which
+        # differ from the one before in any of these, or follow a MODEL
+        # or ENDMDL record
+        same=numpy.ones(len(atom_lines), bool)
+        same[:1]=False
+        models_before=numpy.searchsorted(model_lines, atom_lines)
+        for column in (resnames, chainids, icodes, segids, resseqs,
+                       hetero_flags, models_before):
+            same[1:]&=column[1:]==column[:-1]
+        starts=numpy.flatnonzero(~same)
+        altlocs=altlocs.tolist()
+        resnames=resnames.tolist()
+        chainids=chainids.tolist()
+        icodes=icodes.tolist()
+        segids=segids.tolist()
+        hetero_flags=hetero_flags.tolist()
+        # Current atom after each atom line, for the ANISOU records etc
+        current_atoms=[None]*len(atom_lines)
+
+        line_counter=self.line_counter+1
+        # Whether a model is open after each MODEL or ENDMDL record
+        model_open=[record_types[i]=="MODEL " for i in model_lines]
+
+        def init_model(i, model_id):
+            structure_builder.set_line_counter(line_counter+i)
+            try:
+                serial_num=int(_columns(chars[i:i+1], 10, 14)[0])
+            except ValueError:
+                self._handle_PDB_exception("Invalid or missing model serial number",
+                                           line_counter+i)
+                serial_num=0
+            structure_builder.init_model(model_id, serial_num)
+
+        self._reserve_atoms(len(atom_lines))
+        current_model_id=0
+        current_model_open=0
+        current_chain_id=None
+        current_segid=None
+        current_residue_id=None
+        current_resname=None
+        next_model=0
+        runs=zip(starts, list(starts[1:])+[len(atom_lines)])
+        for first, last in runs:
+            # MODEL and ENDMDL records before this residue
+            while next_model<len(model_lines) and \
+                  model_lines[next_model]<atom_lines[first]:
+                current_model_open=model_open[next_model]
+                if current_model_open:
+                    init_model(model_lines[next_model], current_model_id)
+                    current_model_id+=1
+                current_chain_id=None
+                current_residue_id=None
+                next_model+=1
+            global_line_counter=line_counter+atom_lines[first]
+            structure_builder.set_line_counter(global_line_counter)
+            if not current_model_open:
+                structure_builder.init_model(current_model_id)
+                current_model_id+=1
+                current_model_open=1
+            resname=resnames[first]
+            hetero_flag=hetero_flags[first]
+            resseq=int(resseqs[first])
+            icode=icodes[first]
+            residue_id=(hetero_flag, resseq, icode)
+            if current_segid!=segids[first]:
+                current_segid=segids[first]
+                structure_builder.init_seg(current_segid)
+            if current_chain_id!=chainids[first] or \
+               current_residue_id!=residue_id or current_resname!=resname:
+                if current_chain_id!=chainids[first]:
+                    current_chain_id=chainids[first]
+                    structure_builder.init_chain(current_chain_id)
+                current_residue_id=residue_id
+                current_resname=resname
+                try:
+                    structure_builder.init_residue(resname, hetero_flag, resseq, icode)
+                except PDBConstructionException, message:
+                    self._handle_PDB_exception(message, global_line_counter)
+            # Then the atoms of the residue
+            names=[]
+            for fullname in fullnames[first:last]:
+                # get rid of whitespace in atom names
+                split_list=fullname.split()
+                if len(split_list)!=1:
+                    # atom name has internal spaces, e.g. " N B ", so
+                    # we do not strip spaces
+                    names.append(fullname)
+                else:
+                    # atom name is like " CA ", so we can strip spaces
+                    names.append(split_list[0])
+            atoms=None
+            if not disordered[first:last].any():
+                atoms=structure_builder.init_atoms(names, coords[first:last],
+                        bfactors[first:last], occupancies[first:last],
+                        fullnames[first:last], serial_numbers[first:last],
+                        elements[first:last])
+            if atoms is not None:
+                current_atoms[first:last]=atoms
+                continue
+            for i in range(first, last):
+                structure_builder.set_line_counter(line_counter+atom_lines[i])
+                try:
+                    structure_builder.init_atom(names[i-first], coords[i],
+                            float(bfactors[i]), float(occupancies[i]),
+                            altlocs[i], fullnames[i], int(serial_numbers[i]),
+                            elements[i])
+                except PDBConstructionException, message:
+                    self._handle_PDB_exception(message, line_counter+atom_lines[i])
+                current_atoms[i]=getattr(structure_builder, "atom", None)
+        # Any MODEL records after the last atom
+        for i, is_model in zip(model_lines[next_model:], model_open[next_model:]):
+            if is_model:
+                init_model(i, current_model_id)
+                current_model_id+=1
+        # Anisotropic B factors etc go on the atom before them
+        owners=numpy.searchsorted(atom_lines, extra_lines)-1
+        for i, owner in zip(extra_lines, owners):
+            atom=current_atoms[owner]
+            if atom is None:
+                continue
+            line=coords_trailer[i]
+            record_type=record_types[i]
+            if record_type=="ANISOU":
+                anisou=map(float, (line[28:35], line[35:42], line[43:49], line[49:56], line[56:63], line[63:70]))
+                # U's are scaled by 10^4 
+                atom.set_anisou((numpy.array(anisou, 'f')/10000.0).astype('f'))
+            elif record_type=="SIGUIJ":
+                siguij=map(float, (line[28:35], line[35:42], line[42:49], line[49:56], line[56:63], line[63:70]))
+                # U sigma's are scaled by 10^4
+                atom.set_siguij((numpy.array(siguij, 'f')/10000.0).astype('f'))
+            else:
+                sigatm=map(float, (line[30:38], line[38:45], line[46:54], line[54:60], line[60:66]))
+                atom.set_sigatm(numpy.array(sigatm, 'f'))
+        self.line_counter=self.line_counter+end
+        return coords_trailer[end:]
+
     def _handle_PDB_exception(self, message, line_counter):
         """
         This method catches an exception that occurs in the StructureBuilder
@@ -11,9 +11,14 @@ from Bio.PDB.Entity import Entity
 class Structure(Entity):
     """
     The Structure class contains a collection of Model instances.
+
+    Structures made by the parsers also have a CoordinateStore (in the
+    coordinate_store attribute) holding the coordinates of all the atoms
+    as a NumPy array, otherwise this is None.
     """
     def __init__(self, id):
         self.level="S"
+        self.coordinate_store=None
         Entity.__init__(self, id)
 
     # Special methods
@@ -37,6 +42,39 @@ class Structure(Entity):
 
     # Public 
 
+    def transform(self, rot, tran):
+        """
+        Apply rotation and translation to the atomic coordinates.
+
+        If all the atoms of the structure are in its CoordinateStore, they
+        (including every alternative location of disordered atoms) are
+        transformed in one go.
+
+        @param rot: A right multiplying rotation matrix
+        @type rot: 3x3 Numeric array
+
+        @param tran: the translation vector
+        @type tran: size 3 Numeric array
+        """
+        store=self.coordinate_store
+        if store is not None:
+            atoms=[]
+            for chain in self.get_chains():
+                for residue in chain.get_unpacked_list():
+                    atoms.extend(residue.get_unpacked_list())
+            indices=store._indices(atoms)
+            if indices is not None:
+                store.transform(rot, tran, indices)
+                return
+        # Atoms added from elsewhere (or no store)
+        Entity.transform(self, rot, tran)
+
+    def copy(self):
+        shallow = Entity.copy(self)
+        # The copied atoms keep their own coordinates etc.
+        shallow.coordinate_store = None
+        return shallow
+
     def get_chains(self):
         for m in self:
             for c in m:
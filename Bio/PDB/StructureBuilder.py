@@ -16,6 +16,7 @@ from Bio.PDB.Model import Model
 from Bio.PDB.Chain import Chain
 from Bio.PDB.Residue import Residue, DisorderedResidue
 from Bio.PDB.Atom import Atom, DisorderedAtom 
+from Bio.PDB.CoordinateStore import CoordinateStore
 
 from Bio.PDB.PDBExceptions import \
         PDBConstructionException, PDBConstructionWarning
@@ -39,6 +40,26 @@ class StructureBuilder(object):
                 return 0
         return 1
 
+    def _init_atoms_supported(self):
+        """Return True if init_atoms can be used in place of init_atom.
+
+        This is not the case for a subclass which overrides init_atom but
+        not init_atoms, as the atoms must then go through its init_atom.
+        """
+        def overrides(name):
+            method=getattr(type(self), name)
+            return getattr(method, "im_func", method) \
+                   is not StructureBuilder.__dict__[name]
+        return overrides("init_atoms") or not overrides("init_atom")
+
+    def _reserve_atoms(self, count):
+        """Make room in the CoordinateStore for count more atoms (PRIVATE).
+
+        Called by the parser before giving it the atoms, so that the array
+        of coordinates is not reallocated as they are added.
+        """
+        self.structure.coordinate_store.reserve(count)
+
     # Public methods called by the Parser classes
 
     def set_header(self, header):
@@ -61,6 +82,8 @@ class StructureBuilder(object):
         o id - string
         """
         self.structure=Structure(structure_id)
+        # All the atomic coordinates etc. go in one set of arrays
+        self.structure.coordinate_store=CoordinateStore()
 
     def init_model(self, model_id, serial_num = None):
         """Initiate a new Model object with given id.
@@ -195,6 +218,7 @@ class StructureBuilder(object):
                                   PDBConstructionWarning)
         atom=self.atom=Atom(name, coord, b_factor, occupancy, altloc,
                             fullname, serial_number, element)
+        self.structure.coordinate_store.add(atom)
         if altloc!=" ":
             # The atom is disordered
             if residue.has_id(name):
@@ -231,6 +255,47 @@ class StructureBuilder(object):
             # The atom is not disordered
             residue.add(atom)
 
+    def init_atoms(self, names, coords, b_factors, occupancies, fullnames,
+                   serial_numbers, elements):
+        """
+        Initiate several new Atom objects in the current residue at once.
+
+        This is quicker than calling init_atom for each atom, but is only
+        for atoms with a blank altloc.  The arguments are lists (or NumPy
+        arrays) with one entry per atom, as for the init_atom arguments.
+
+        Returns the list of new Atom objects, or None (having done nothing)
+        if the atoms cannot be simply added to the residue, because some
+        names are repeated or already in it, or the residue is disordered or
+        missing.  In that case call init_atom for each atom instead.  This
+        is also the case for a subclass which overrides init_atom but not
+        this method.
+        """
+        residue=self.residue
+        if residue is None or residue.is_disordered()==2 \
+           or not self._init_atoms_supported():
+            return None
+        if len(set(names))!=len(names):
+            return None
+        for name in names:
+            if residue.has_id(name):
+                return None
+        store=self.structure.coordinate_store
+        start=store.extend(coords)
+        b_factors=_as_list(b_factors)
+        occupancies=_as_list(occupancies)
+        serial_numbers=_as_list(serial_numbers)
+        atoms=[]
+        for i, name in enumerate(names):
+            atom=Atom._from_store(store, start+i, name, b_factors[i],
+                                  occupancies[i], " ", fullnames[i],
+                                  serial_numbers[i], elements[i])
+            residue.add(atom)
+            atoms.append(atom)
+        if atoms:
+            self.atom=atoms[-1]
+        return atoms
+
     def set_anisou(self, anisou_array):
         "Set anisotropic B factor of current Atom."
         self.atom.set_anisou(anisou_array)
@@ -255,3 +320,10 @@ class StructureBuilder(object):
         pass
 
 
+
+
+def _as_list(values):
+    """Values of a NumPy array as Python numbers, or the list (PRIVATE)."""
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return values
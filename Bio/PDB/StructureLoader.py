@@ -0,0 +1,428 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Load many structures at once, in parallel and with a cache.
+
+The StructureLoader takes a list of file names or PDB codes, parses the
+files (optionally in a pool of worker processes), and returns a
+CompactStructure for each.  This holds all the atomic data as NumPy
+arrays, so it is small and quick to pickle (e.g. to send it between
+processes), and can be turned into a full Structure object when needed:
+
+>>> from Bio.PDB.StructureLoader import StructureLoader
+>>> loader = StructureLoader()
+>>> compact = loader.get_structure("PDB/1A8O.pdb")
+>>> compact
+<CompactStructure id=1A8O with 644 atoms>
+>>> compact.coord.shape
+(644, 3)
+>>> structure = compact.to_structure()
+>>> len(list(structure.get_atoms()))
+644
+
+The most recently used structures are kept in a cache, so asking for the
+same file again (if it has not been changed) does not parse it again:
+
+>>> loader.get_structure("PDB/1A8O.pdb") is compact
+True
+
+PDB codes are looked up in a local copy of the PDB, as stored by a PDBList
+object (e.g. a mirror of the PDB's divided tree of pdbXXXX.ent.gz files)::
+
+    from Bio.PDB.PDBList import PDBList
+    loader = StructureLoader(pdb_list=PDBList(pdb="/data/pdb"), workers=4)
+    structures = loader.get_structures(["1a8o", "1mot"])
+
+Files ending .cif (or .mmcif) are parsed with the MMCIFParser, and others
+with the PDBParser (either may be compressed with gzip, except mmCIF).
+"""
+
+import gzip
+import os
+import warnings
+
+import numpy
+
+from Bio.PDB.PDBParser import PDBParser
+from Bio.PDB.StructureBuilder import StructureBuilder
+from Bio.PDB.CoordinateStore import get_coords, _serial
+from Bio.PDB.PDBExceptions import \
+        PDBConstructionException, PDBConstructionWarning
+
+
+class CompactStructure(object):
+    """
+    Picklable columnar copy of a Structure, as NumPy arrays.
+
+    There is one entry per atom (including each alternative location of
+    disordered atoms) in the arrays coord, bfactor, occupancy, element,
+    serial_number (-1 if missing), name, fullname and altloc.  Atoms of
+    the same residue are consecutive, and the residues are described by
+    the arrays residue_start (index of the first atom), residue_model
+    (index into the models list of (model id, serial number) tuples),
+    chain_id, segid, hetfield, resseq, icode and resname.
+
+    Anisotropic B factors and standard deviations are kept too, but not
+    any other attributes added to the Structure or its entities.
+    """
+    def __init__(self, id, header, models):
+        self.id=id
+        self.header=header
+        self.models=models
+
+    # Special methods
+
+    def __len__(self):
+        "Return the number of atoms."
+        return len(self.coord)
+
+    def __repr__(self):
+        return "<CompactStructure id=%s with %i atoms>" % (self.id, len(self))
+
+    # Public methods
+
+    @classmethod
+    def from_structure(cls, structure):
+        """Make a CompactStructure from a Structure object."""
+        models=structure.get_list()
+        model_index=dict((id(model), i) for i, model in enumerate(models))
+        store=structure.coordinate_store
+        if store is not None:
+            # In the order they were built
+            atoms=store.atoms
+        else:
+            atoms=[]
+            for model in models:
+                for chain in model:
+                    for residue in chain.get_unpacked_list():
+                        atoms.extend(residue.get_unpacked_list())
+        rows=[]
+        residues=[]
+        residue_start=[]
+        residue_model=[]
+        # Skip any atoms no longer in the structure
+        last_residue=None
+        model_number=None
+        for i, atom in enumerate(atoms):
+            residue=atom.get_parent()
+            if residue is not last_residue:
+                last_residue=residue
+                model_number=None
+                if residue is not None and residue.get_parent() is not None:
+                    model=residue.get_parent().get_parent()
+                    model_number=model_index.get(id(model))
+                if model_number is not None:
+                    residues.append(residue)
+                    residue_start.append(len(rows))
+                    residue_model.append(model_number)
+            if model_number is not None:
+                rows.append(i)
+        compact=cls(structure.get_id(), getattr(structure, "header", {}),
+                    [(model.get_id(), model.serial_num) for model in models])
+        atoms=[atoms[i] for i in rows]
+        # Straight from the store's array if the atoms are all in it
+        compact.coord=numpy.asarray(get_coords(atoms), float).reshape(-1, 3)
+        compact.bfactor=numpy.array([a.get_bfactor() for a in atoms], float)
+        compact.occupancy=numpy.array([a.get_occupancy() for a in atoms], float)
+        compact.element=_strings([a.element for a in atoms])
+        compact.serial_number=numpy.array([_serial(a.get_serial_number())
+                                           for a in atoms], numpy.int64)
+        compact.name=_strings([a.get_name() for a in atoms])
+        compact.fullname=_strings([a.get_fullname() for a in atoms])
+        compact.altloc=_strings([a.get_altloc() for a in atoms])
+        for name, size in (("anisou", 6), ("siguij", 6), ("sigatm", 5)):
+            values=[getattr(a, name+"_array") for a in atoms]
+            if [v for v in values if v is not None]:
+                array=numpy.empty((len(values), size), "f")
+                array.fill(numpy.nan)
+                for i, value in enumerate(values):
+                    if value is not None:
+                        array[i]=value
+                setattr(compact, name, array)
+            else:
+                setattr(compact, name, None)
+        compact.residue_start=numpy.array(residue_start, numpy.intp)
+        compact.residue_model=numpy.array(residue_model, numpy.intp)
+        compact.chain_id=_strings([r.get_parent().get_id() for r in residues])
+        compact.segid=_strings([r.get_segid() for r in residues])
+        compact.hetfield=_strings([r.get_id()[0] for r in residues])
+        compact.resseq=numpy.array([r.get_id()[1] for r in residues], numpy.int64)
+        compact.icode=_strings([r.get_id()[2] for r in residues])
+        compact.resname=_strings([r.get_resname() for r in residues])
+        return compact
+
+    def to_structure(self, structure_builder=None):
+        """Return a new Structure object with the atoms.
+
+        The atoms are given to the structure builder (by default a new
+        StructureBuilder) in the same way as by the parser, so disordered
+        atoms and residues are rebuilt in the same way.
+        """
+        if structure_builder is None:
+            structure_builder=StructureBuilder()
+        warning_list=warnings.filters[:]
+        warnings.filterwarnings('ignore', category=PDBConstructionWarning)
+        try:
+            self._build(structure_builder)
+        finally:
+            warnings.filters=warning_list
+        structure_builder.set_header(self.header)
+        return structure_builder.get_structure()
+
+    # Private methods
+
+    def _build(self, structure_builder):
+        structure_builder.init_structure(self.id)
+        structure_builder.init_seg(" ")
+        names=self.name.tolist()
+        fullnames=self.fullname.tolist()
+        altlocs=self.altloc.tolist()
+        elements=self.element.tolist()
+        serial_numbers=[None if s==-1 else s for s in self.serial_number.tolist()]
+        starts=self.residue_start.tolist()
+        ends=starts[1:]+[len(self)]
+        chain_ids=self.chain_id.tolist()
+        segids=self.segid.tolist()
+        hetfields=self.hetfield.tolist()
+        resseqs=self.resseq.tolist()
+        icodes=self.icode.tolist()
+        resnames=self.resname.tolist()
+        next_model=0
+        current_chain_id=None
+        current_segid=" "
+        current_residue=None
+        for r, (start, end) in enumerate(zip(starts, ends)):
+            # Including any models without atoms
+            while next_model<=self.residue_model[r]:
+                model_id, serial_num=self.models[next_model]
+                structure_builder.init_model(model_id, serial_num)
+                next_model+=1
+                current_chain_id=None
+            if current_segid!=segids[r]:
+                current_segid=segids[r]
+                structure_builder.init_seg(current_segid)
+            hetfield=hetfields[r]
+            if hetfield.startswith("H_"):
+                hetfield="H"
+            residue=(hetfield, resseqs[r], icodes[r], resnames[r])
+            if current_chain_id!=chain_ids[r]:
+                current_chain_id=chain_ids[r]
+                structure_builder.init_chain(current_chain_id)
+                current_residue=None
+            if current_residue!=residue:
+                current_residue=residue
+                try:
+                    structure_builder.init_residue(residue[3], hetfield,
+                                                   residue[1], residue[2])
+                except PDBConstructionException:
+                    pass
+            atoms=None
+            if not [a for a in altlocs[start:end] if a!=" "]:
+                atoms=structure_builder.init_atoms(names[start:end],
+                        self.coord[start:end], self.bfactor[start:end],
+                        self.occupancy[start:end], fullnames[start:end],
+                        serial_numbers[start:end], elements[start:end])
+            if atoms is None:
+                atoms=[]
+                for i in range(start, end):
+                    try:
+                        structure_builder.init_atom(names[i], self.coord[i],
+                            float(self.bfactor[i]), float(self.occupancy[i]),
+                            altlocs[i], fullnames[i], serial_numbers[i],
+                            elements[i])
+                    except PDBConstructionException:
+                        pass
+                    atoms.append(getattr(structure_builder, "atom", None))
+            for name in ("anisou", "siguij", "sigatm"):
+                values=getattr(self, name)
+                if values is not None:
+                    for atom, value in zip(atoms, values[start:end]):
+                        if atom is not None and not numpy.isnan(value[0]):
+                            setattr(atom, name+"_array", value.copy())
+        while next_model<len(self.models):
+            model_id, serial_num=self.models[next_model]
+            structure_builder.init_model(model_id, serial_num)
+            next_model+=1
+
+
+def _strings(values):
+    """NumPy array of strings, of the shortest type needed (PRIVATE)."""
+    if not values:
+        return numpy.zeros(0, "S1")
+    return numpy.array(values)
+
+
+class StructureCache(object):
+    """
+    Cache of the most recently used structures (or any other objects).
+
+    Works like a dictionary, but holds at most maxsize entries, forgetting
+    the least recently used entry when a new one is added.
+    """
+    def __init__(self, maxsize=100):
+        self.maxsize=maxsize
+        self._entries={}
+        self._counter=0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        entry=self._entries[key]
+        self._counter+=1
+        entry[0]=self._counter
+        return entry[1]
+
+    def __setitem__(self, key, value):
+        if self.maxsize<=0:
+            return
+        if key not in self._entries and len(self._entries)>=self.maxsize:
+            # Forget the least recently used entry
+            oldest=min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest]
+        self._counter+=1
+        self._entries[key]=[self._counter, value]
+
+    def clear(self):
+        "Remove all the entries."
+        self._entries.clear()
+
+
+def _load(job):
+    """Parse a structure file, returning a CompactStructure (PRIVATE).
+
+    Runs in the worker processes.
+    """
+    structure_id, filename, (PERMISSIVE, QUIET)=job
+    lower=filename.lower()
+    if lower.endswith(".gz"):
+        lower=lower[:-3]
+    if lower.endswith(".cif") or lower.endswith(".mmcif"):
+        if filename.lower().endswith(".gz"):
+            raise ValueError("Compressed mmCIF files are not supported: %s"
+                             % filename)
+        from Bio.PDB.MMCIFParser import MMCIFParser
+        structure=MMCIFParser().get_structure(structure_id, filename)
+    else:
+        parser=PDBParser(PERMISSIVE=PERMISSIVE, QUIET=QUIET)
+        if filename.lower().endswith(".gz"):
+            handle=gzip.open(filename)
+            try:
+                structure=parser.get_structure(structure_id, handle)
+            finally:
+                handle.close()
+        else:
+            structure=parser.get_structure(structure_id, filename)
+    return CompactStructure.from_structure(structure)
+
+
+class StructureLoader(object):
+    """
+    Load many structure files, in parallel and with a cache.
+    """
+    def __init__(self, pdb_list=None, workers=1, cache_size=100,
+                 PERMISSIVE=True, QUIET=True):
+        """
+        Arguments:
+
+        o pdb_list - optional PDBList object, whose local file tree (see
+        its get_local_file method) is used to find the files for PDB codes.
+
+        o workers - number of worker processes to parse files with
+        (default 1, parse them in this process).
+
+        o cache_size - number of structures to keep in the cache (default
+        100), as CompactStructure objects.
+
+        o PERMISSIVE, QUIET - as for the PDBParser (but by default quiet).
+        """
+        self.pdb_list=pdb_list
+        self.workers=workers
+        self.options=(bool(PERMISSIVE), bool(QUIET))
+        self.cache=StructureCache(cache_size)
+
+    # Private methods
+
+    def _key(self, filename):
+        """Cache key of a file: its path, time modified and size, and the
+        parser options (PRIVATE)."""
+        stat=os.stat(filename)
+        return (os.path.abspath(filename), stat.st_mtime, stat.st_size,
+                self.options)
+
+    def _load_all(self, jobs):
+        if self.workers<=1 or len(jobs)<=1:
+            return [_load(job) for job in jobs]
+        try:
+            import multiprocessing
+        except ImportError:
+            #Python 2.5
+            from Bio import MissingPythonDependencyError
+            raise MissingPythonDependencyError("Requires multiprocessing, "
+                                               "which is included Python 2.6+")
+        pool=multiprocessing.Pool(min(self.workers, len(jobs)))
+        try:
+            return pool.map(_load, jobs, 1)
+        finally:
+            pool.terminate()
+
+    # Public methods
+
+    def resolve(self, source):
+        """Return the structure id and file name for a file name or PDB code.
+
+        Existing files are used as they are, otherwise the source is taken
+        as a PDB code to look for in the local file tree of the PDBList.
+        The structure id is the PDB code, or the file name without any
+        extensions (and pdb prefix, for pdbXXXX.ent files).
+        """
+        if os.path.isfile(source):
+            filename=source
+        else:
+            filename=None
+            if self.pdb_list is not None:
+                filename=self.pdb_list.get_local_file(source)
+                if filename is None:
+                    filename=self.pdb_list.get_local_file(source, obsolete=1)
+            if filename is None:
+                raise ValueError("Could not find structure file %r" % source)
+        structure_id=os.path.basename(filename).split(".")[0]
+        if len(structure_id)==7 and structure_id.lower().startswith("pdb") \
+           and ".ent" in filename.lower():
+            structure_id=structure_id[3:]
+        return structure_id, filename
+
+    def get_structures(self, sources):
+        """Return a list of CompactStructure objects for a list of files.
+
+        The sources may be file names or PDB codes (see the resolve
+        method).  Any not in the cache are parsed (in parallel, if there
+        are several worker processes) and added to the cache.
+        """
+        keys=[]
+        jobs={}
+        for source in sources:
+            structure_id, filename=self.resolve(source)
+            key=self._key(filename)
+            keys.append(key)
+            if key not in self.cache and key not in jobs:
+                jobs[key]=(structure_id, filename, self.options)
+        found={}
+        for key in keys:
+            if key in self.cache:
+                found[key]=self.cache[key]
+        job_keys=jobs.keys()
+        for key, compact in zip(job_keys,
+                                self._load_all([jobs[k] for k in job_keys])):
+            self.cache[key]=compact
+            found[key]=compact
+        return [found[key] for key in keys]
+
+    def get_structure(self, source):
+        """Return a CompactStructure for a file name or PDB code."""
+        return self.get_structures([source])[0]
@@ -9,6 +9,7 @@ import numpy
 
 from Bio.SVDSuperimposer import SVDSuperimposer
 from Bio.PDB.PDBExceptions import PDBException
+from Bio.PDB.CoordinateStore import get_coords
 
 
 class Superimposer(object):
@@ -31,12 +32,8 @@ class Superimposer(object):
         """
         if not (len(fixed)==len(moving)):
             raise PDBException("Fixed and moving atom lists differ in size")
-        l=len(fixed)
-        fixed_coord=numpy.zeros((l, 3))
-        moving_coord=numpy.zeros((l, 3))
-        for i in range(0, len(fixed)):
-            fixed_coord[i]=fixed[i].get_coord()
-            moving_coord[i]=moving[i].get_coord()
+        fixed_coord=get_coords(fixed).astype(float)
+        moving_coord=get_coords(moving).astype(float)
         sup=SVDSuperimposer()
         sup.set(fixed_coord, moving_coord)
         sup.run()
@@ -52,8 +49,16 @@ class Superimposer(object):
         rot, tran=self.rotran
         rot=rot.astype('f')
         tran=tran.astype('f')
-        for atom in atom_list:
-            atom.transform(rot, tran)
+        store=getattr(atom_list[0], "_store", None) if atom_list else None
+        indices=None
+        if store is not None:
+            indices=store._indices(atom_list)
+        if indices is not None:
+            # All in one CoordinateStore, so transform them in one go
+            store.transform(rot, tran, indices)
+        else:
+            for atom in atom_list:
+                atom.transform(rot, tran)
 
 
 if __name__=="__main__":
@@ -160,6 +160,10 @@ class FormattedSeq(object):
         else:
             raise TypeError('expected Seq or MutableSeq, got %s' % type(seq))
 
+    #Optional tuple of (linear, dict of compsite patterns to site lists),
+    #filled in by RestrictionBatch.search via _SiteFinder.
+    _sites = None
+
     def __len__(self):
         return len(self.data) - 1
 
@@ -211,6 +215,12 @@ class FormattedSeq(object):
         pattern is the regular expression pattern corresponding to the
         enzyme restriction site.
         size is the size of the restriction enzyme recognition-site size."""
+        if self._sites is not None and self._sites[0] == self.linear:
+            #Results precomputed by a RestrictionBatch search, see _SiteFinder
+            try:
+                return self._sites[1][pattern.pattern]
+            except (KeyError, AttributeError):
+                pass
         if self.is_linear():
             data = self.data
         else:
@@ -223,6 +233,195 @@ class FormattedSeq(object):
         return self.klass(self.data[i], self.alphabet)
     
 
+def _plus_strand(name):
+    """Stand in for a match object's group method, site on plus strand (PRIVATE).
+    """
+    return name
+
+def _minus_strand(name):
+    """Stand in for a match object's group method, site on minus strand (PRIVATE).
+    """
+    return None
+
+_compsite_re = re.compile(r"^\(\?P<[^>]+>([^()]*)\)\|\(\?P<[^>]+>([^()]*)\)$")
+_site_token_re = re.compile(r"\[[ACGT]+\]|[ACGT.]")
+
+def _site_tokens(site):
+    """Split a compsite regular expression into a list per base (PRIVATE).
+
+    Each entry is a string of the allowed bases, or '.' for any base. Returns
+    None if the site isn't in the expected format.
+    """
+    tokens = _site_token_re.findall(site)
+    if "".join(tokens) != site:
+        return None
+    return [t.strip("[]") for t in tokens]
+
+def _expand_tokens(tokens):
+    """Return all the unambiguous words matching a list of tokens (PRIVATE)."""
+    words = [""]
+    for t in tokens:
+        words = [w + letter for w in words for letter in t]
+    return words
+
+
+class _SiteFinder(object):
+    """Search for the sites of many enzymes in a single pass (PRIVATE).
+
+    This builds an Aho-Corasick automaton from all the recognition sites
+    of a set of enzymes (on both strands), expanding any ambiguous bases
+    like [AG] into all the matching words. Sites with N (any base, '.' in
+    the compsite regular expression) are found via their longest stretch
+    without N, and each candidate is then checked with a regular
+    expression. Enzymes sharing a site (isoschizomers) share the work.
+
+    The search method returns the same lists as FormattedSeq.finditer
+    would give for each enzyme's compsite pattern.
+    """
+
+    def __init__(self, enzymes):
+        #Map each pattern to (index, size), with one index per unique site:
+        self.patterns = {}
+        sites = {}
+        words = []
+        for enzyme in enzymes:
+            pattern = enzyme.compsite.pattern
+            if pattern in self.patterns:
+                continue
+            match = _compsite_re.match(pattern)
+            if not match:
+                #Leave this one to FormattedSeq.finditer
+                continue
+            strands = [_site_tokens(match.group(1)),
+                       _site_tokens(match.group(2))]
+            if None in strands or len(strands[0]) != len(strands[1]) \
+            or not strands[0]:
+                continue
+            key = match.groups()
+            if key not in sites:
+                sites[key] = len(sites)
+                for strand, site, tokens in zip((0, 1), key, strands):
+                    words.extend(self._site_words(sites[key], strand,
+                                                  site, tokens))
+            self.patterns[pattern] = (sites[key], len(strands[0]))
+        self.count = len(sites)
+        self.max_size = max([1] + [s for i, s in self.patterns.values()])
+        self._build(words)
+
+    def _site_words(self, index, strand, site, tokens):
+        """Returns list of (word, output) for a site on one strand (PRIVATE).
+
+        The output is a tuple of the site index, the strand (0 for plus, 1 for
+        minus, so the plus strand sorts first), the offset of the end of the
+        word from the start of the site, and (if the word is not the whole
+        site) a compiled regular expression to check the site.
+        """
+        if "." not in tokens:
+            size = len(tokens)
+            return [(w, (index, strand, size - 1, None))
+                    for w in _expand_tokens(tokens)]
+        #Use the best stretch without any N, preferring longer and then
+        #less ambiguous stretches (which will give fewer false hits):
+        best = None
+        start = 0
+        for end in range(len(tokens) + 1):
+            if end == len(tokens) or tokens[end] == ".":
+                if start < end:
+                    chunk = tokens[start:end]
+                    count = len(_expand_tokens(chunk))
+                    if best is None or (end - start, -count) > best[0]:
+                        best = ((end - start, -count), start, end)
+                start = end + 1
+        if best is None:
+            #All N, matches anything - unlikely to happen.
+            best = ((1, -4), 0, 1)
+            tokens = ["ACGT"] + tokens[1:]
+        score, start, end = best
+        check = re.compile(site)
+        return [(w, (index, strand, end - 1, check))
+                for w in _expand_tokens(tokens[start:end])]
+
+    def _build(self, words):
+        """Make the automaton's transition table and outputs (PRIVATE)."""
+        goto = [{}]
+        outputs = [[]]
+        for word, output in words:
+            state = 0
+            for letter in word:
+                if letter not in goto[state]:
+                    goto[state][letter] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = goto[state][letter]
+            outputs[state].append(output)
+        #Breadth first, so the shorter fall back states are done first:
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = [0]
+        for state in queue:
+            for letter, child in goto[state].iteritems():
+                queue.append(child)
+                if state:
+                    fail[child] = delta[fail[state]].get(letter, 0)
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+            if state:
+                delta[state] = dict(delta[fail[state]])
+                delta[state].update(goto[state])
+        self._delta = delta
+        #Using None rather than an empty list makes the scan a bit faster
+        self._outputs = [o or None for o in outputs]
+
+    def search(self, fseq):
+        """Returns dict mapping compsite patterns to FormattedSeq.finditer lists.
+        """
+        data = fseq.data
+        limit = len(data)
+        if not fseq.linear:
+            data = data + data[1:self.max_size]
+        found = [[] for i in range(self.count)]
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        #Non ACGT letters (including the leading space) go back to the root
+        for i, letter in enumerate(data):
+            state = delta[state].get(letter, 0)
+            if outputs[state] is not None:
+                for index, strand, offset, check in outputs[state]:
+                    start = i - offset
+                    if check is None or (start >= 0 and check.match(data, start)):
+                        found[index].append((start, strand))
+        answer = {}
+        cache = {}
+        for pattern, (index, size) in self.patterns.iteritems():
+            if (index, size) in cache:
+                answer[pattern] = cache[index, size]
+                continue
+            #Mimic re.finditer: the sequence for a circular search is extended
+            #by size-1 bases, matches do not overlap, and the forward strand
+            #site is preferred when both match at the same place.
+            if fseq.linear:
+                end = limit
+            else:
+                end = limit + min(size - 1, limit - 1)
+            hits = found[index]
+            hits.sort()
+            sites = []
+            after = 0
+            for start, strand in hits:
+                if start >= after and start + size <= end:
+                    if strand:
+                        sites.append((start, _minus_strand))
+                    else:
+                        sites.append((start, _plus_strand))
+                    after = start + size
+            answer[pattern] = cache[index, size] = sites
+        return answer
+
+
+#Compiled compsite regular expressions, shared by isoschizomers:
+_compiled_sites = {}
+
 class RestrictionType(type):
     """RestrictionType. Type from which derives all enzyme classes.
 
@@ -241,11 +440,37 @@ class RestrictionType(type):
         # 2011/11/26 - Nobody knows what this call was supposed to accomplish,
         # but all unit tests seem to pass without it. 
         # super(RestrictionType, cls).__init__(cls, name, bases, dct)
+        #
+        # The compsite regular expression is only compiled when first used,
+        # see the compsite property below.
+
+    def _get_compsite(cls):
+        """Compiled regular expression for the site on both strands (PRIVATE).
+
+        Compiling hundreds of regular expressions is slow, so this is done
+        when first needed (e.g. for a search) rather than on import."""
+        for klass in cls.__mro__:
+            if "compsite" in klass.__dict__:
+                pattern = klass.__dict__["compsite"]
+                break
+        else:
+            raise AttributeError("compsite")
+        if not isinstance(pattern, basestring):
+            #Already compiled
+            return pattern
+        try:
+            return _compiled_sites[pattern]
+        except KeyError:
+            pass
         try :
-            cls.compsite = re.compile(cls.compsite)
+            compiled = re.compile(pattern)
         except Exception, err :
             raise ValueError("Problem with regular expression, re.compiled(%s)" \
-                             % repr(cls.compsite))
+                             % repr(pattern))
+        _compiled_sites[pattern] = compiled
+        return compiled
+
+    compsite = property(_get_compsite)
         
     def __add__(cls, other):
         """RE.__add__(other) -> RestrictionBatch().
@@ -2013,6 +2238,24 @@ class RestrictionBatch(set):
         print '\n'.join(supply)
         return
 
+    def _find_sites(self, fseq):
+        """B._find_sites(fseq) -> fseq with the sites of all enzymes cached.
+
+        for internal use only.
+
+        Rather than each enzyme scanning the sequence with its own regular
+        expression, all the sites are found in a single pass using an
+        automaton built once for the enzymes in the batch."""
+        if len(self) < 2:
+            return fseq
+        enzymes = frozenset(self)
+        finder = getattr(self, "_site_finder", None)
+        if finder is None or finder[0] != enzymes:
+            finder = enzymes, _SiteFinder(enzymes)
+            self._site_finder = finder
+        fseq._sites = fseq.linear, finder[1].search(fseq)
+        return fseq
+
     def search(self, dna, linear=True):
         """B.search(dna) -> dict."""
         #
@@ -2032,7 +2275,7 @@ class RestrictionBatch(set):
                 return self.mapping
             else:
                 self.already_mapped = str(dna), linear
-                fseq = FormattedSeq(dna, linear)
+                fseq = self._find_sites(FormattedSeq(dna, linear))
                 self.mapping = dict([(x, x.search(fseq)) for x in self])
                 return self.mapping
         elif isinstance(dna, FormattedSeq):
@@ -2040,7 +2283,9 @@ class RestrictionBatch(set):
                 return self.mapping
             else:
                 self.already_mapped = str(dna), dna.linear
-                self.mapping = dict([(x, x.search(dna)) for x in self])
+                #Work on a copy, so as not to leave the site cache on dna
+                fseq = self._find_sites(FormattedSeq(dna))
+                self.mapping = dict([(x, x.search(fseq)) for x in self])
                 return self.mapping
         raise TypeError("Expected Seq or MutableSeq instance, got %s instead"\
                         %type(dna))
@@ -2380,6 +2625,10 @@ class Analysis(RestrictionBatch, PrintFormat):
 #   It is essential to run Restriction with doc string optimisation (-OO switch)
 #   as the doc string of 660 classes take a lot of processing.
 #
+#   The most expensive step used to be compiling the compsite regular
+#   expression of every enzyme, which is now only done when an enzyme's
+#   compsite is first used (see RestrictionType.compsite).
+#
 CommOnly    = RestrictionBatch()    # commercial enzymes
 NonComm     = RestrictionBatch()    # not available commercially
 for TYPE, (bases, enzymes) in typedict.iteritems():
@@ -16,7 +16,9 @@ __docformat__ ="epytext en" #Don't just use plain text in epydoc API pages!
 import string #for maketrans only
 import array
 import sys
+from itertools import imap, izip
 
+from Bio._py3k import _as_string
 from Bio import Alphabet
 from Bio.Alphabet import IUPAC
 from Bio.Data.IUPACData import ambiguous_dna_complement, ambiguous_rna_complement
@@ -749,24 +751,33 @@ class Seq(object):
            ...
         ValueError: Proteins do not have complements!
         """
+        ttable = self._get_complement_table()
+        #Much faster on really long sequences than the previous loop based one.
+        #thx to Michael Palmer, University of Waterloo
+        return Seq(str(self).translate(ttable), self.alphabet)
+
+    def _get_complement_table(self):
+        """Returns the DNA or RNA complement translation table (PRIVATE).
+
+        This is based on the alphabet, or for generic nucleotide alphabets
+        on the presence of U or T in the sequence.
+        """
         base = Alphabet._get_base_alphabet(self.alphabet)
         if isinstance(base, Alphabet.ProteinAlphabet):
             raise ValueError("Proteins do not have complements!")
         if isinstance(base, Alphabet.DNAAlphabet):
-            ttable = _dna_complement_table
+            return _dna_complement_table
         elif isinstance(base, Alphabet.RNAAlphabet):
-            ttable = _rna_complement_table
-        elif ('U' in self._data or 'u' in self._data) \
-        and ('T' in self._data or 't' in self._data):
+            return _rna_complement_table
+        data = self._data
+        if ('U' in data or 'u' in data) \
+        and ('T' in data or 't' in data):
             #TODO - Handle this cleanly?
             raise ValueError("Mixed RNA/DNA found")
-        elif 'U' in self._data or 'u' in self._data:
-            ttable = _rna_complement_table
+        elif 'U' in data or 'u' in data:
+            return _rna_complement_table
         else:
-            ttable = _dna_complement_table
-        #Much faster on really long sequences than the previous loop based one.
-        #thx to Michael Palmer, University of Waterloo
-        return Seq(str(self).translate(ttable), self.alphabet)
+            return _dna_complement_table
 
     def reverse_complement(self):
         """Returns the reverse complement sequence. New Seq object.
@@ -1495,6 +1506,250 @@ class UnknownSeq(Seq):
         else :
             return Seq("", s.alphabet)
 
+class BufferSeq(Seq):
+    """A read-only sequence held in a buffer, where slicing does not copy.
+
+    Slicing a normal Seq object makes a new string holding a copy of the
+    letters, which is a problem when working with (many) small regions of
+    chromosome sized sequences. Here the sequence is held in a buffer such
+    as a (byte) string, a bytearray or a memory mapped file (mmap), and
+    slices with a step of one are just views on the same buffer:
+
+    >>> from Bio.Seq import BufferSeq
+    >>> from Bio.Alphabet import generic_dna
+    >>> my_seq = BufferSeq("ACGTTGCAACGTTGCA", generic_dna)
+    >>> my_seq
+    BufferSeq('ACGTTGCAACGTTGCA', DNAAlphabet())
+    >>> sub_seq = my_seq[4:10]
+    >>> sub_seq
+    BufferSeq('TGCAAC', DNAAlphabet())
+    >>> sub_seq._buffer is my_seq._buffer
+    True
+
+    You can also give the start and end of the region in the buffer to use,
+    e.g. to skip a header line in a memory mapped FASTA file:
+
+    >>> BufferSeq(">Example\\nACGTACGT", generic_dna, start=9)
+    BufferSeq('ACGTACGT', DNAAlphabet())
+
+    The reverse complement is also a view on the same buffer, so taking
+    a small window from the reverse strand of a chromosome only needs the
+    letters in that window. These are only turned into a string when
+    needed (e.g. by str, find, count, iteration or translation):
+
+    >>> rc = my_seq.reverse_complement()
+    >>> rc
+    BufferSeq('TGCAACGTTGCAACGT', DNAAlphabet())
+    >>> rc[2:8]
+    BufferSeq('CAACGT', DNAAlphabet())
+    >>> rc[2:8]._buffer is my_seq._buffer
+    True
+    >>> rc[2:8].translate()
+    Seq('QR', ExtendedIUPACProtein())
+
+    A plain Seq object can be wrapped like this without copying its
+    string, using BufferSeq(str(seq), seq.alphabet).
+
+    Otherwise this behaves like a Seq object (including the string like
+    methods, which work on a copy of the letters), but adding sequences
+    together gives a normal Seq object.
+    """
+    #Reverse strand views (strand -1) also hold the complement table
+    _strand = 1
+    _ttable = None
+
+    def __init__(self, data, alphabet = Alphabet.generic_alphabet,
+                 start=0, end=None):
+        """Create a new BufferSeq object.
+
+        Arguments:
+         - data     - The buffer, e.g. a string, bytearray or mmap object
+         - alphabet - Optional argument, an Alphabet object from Bio.Alphabet
+         - start    - Optional offset of the sequence in the buffer
+         - end      - Optional end of the sequence in the buffer (default
+                      is the end of the buffer)
+        """
+        if isinstance(data, (Seq, MutableSeq)):
+            raise TypeError("The sequence data given to a BufferSeq object "
+                            "should be a string or buffer (not another Seq "
+                            "object etc)")
+        if end is None:
+            end = len(data)
+        if not 0 <= start <= end <= len(data):
+            raise ValueError("Invalid start %r and end %r for buffer of "
+                             "length %i" % (start, end, len(data)))
+        self._buffer = data
+        self._start = start
+        self._end = end
+        self.alphabet = alphabet
+
+    def _get_letters(self, start, end):
+        """Returns the letters from start to end of the buffer (PRIVATE)."""
+        return _as_string(self._buffer[start:end])
+
+    def _view(self, start, end):
+        """Returns a new object sharing the same buffer (PRIVATE)."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._start = start
+        new._end = end
+        return new
+
+    @property
+    def _data(self):
+        """The sequence as a string (PRIVATE, used by the Seq methods)."""
+        return str(self)
+
+    def __len__(self):
+        """Returns the length of the sequence, use len(my_seq)."""
+        return self._end - self._start
+
+    def __str__(self):
+        """Returns the full sequence as a python string, use str(my_seq)."""
+        letters = self._get_letters(self._start, self._end)
+        if self._strand == -1:
+            return letters.translate(self._ttable)[::-1]
+        return letters
+
+    def __iter__(self):
+        """Iterate over the letters in the sequence."""
+        return iter(str(self))
+
+    def __repr__(self):
+        """Returns a (truncated) representation of the sequence for debugging."""
+        if len(self) > 60:
+            #Avoid turning all of a (large) buffer into a string
+            return "%s('%s...%s', %s)" % (self.__class__.__name__,
+                                          str(self[:54]), str(self[-3:]),
+                                          repr(self.alphabet))
+        else:
+            return "%s(%s, %s)" % (self.__class__.__name__,
+                                   repr(str(self)),
+                                   repr(self.alphabet))
+
+    def __getitem__(self, index):
+        """Returns a subsequence of single letter, use my_seq[index].
+
+        >>> my_seq = BufferSeq("ACGTTGCAACGTTGCA")
+        >>> my_seq[0]
+        'A'
+        >>> my_seq[-1]
+        'A'
+        >>> my_seq[5:-5][1:3]
+        BufferSeq('CA', Alphabet())
+        >>> my_seq.reverse_complement()[5:-5][1:3]
+        BufferSeq('GT', Alphabet())
+
+        Slices with a step other than one give a normal Seq object:
+
+        >>> my_seq[::2]
+        Seq('AGTCAGTC', Alphabet())
+        """
+        length = self._end - self._start
+        if isinstance(index, int):
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError("index out of range")
+            if self._strand == -1:
+                index = self._end - index - 1
+                return self._get_letters(index, index + 1).translate(self._ttable)
+            index += self._start
+            return self._get_letters(index, index + 1)
+        start, end, step = index.indices(length)
+        if step == 1:
+            end = max(start, end)
+            if self._strand == -1:
+                #Counting back from the end of the region in the buffer
+                return self._view(self._end - end, self._end - start)
+            return self._view(self._start + start, self._start + end)
+        return Seq(str(self)[index], self.alphabet)
+
+    def __add__(self, other):
+        """Add another sequence or string to this sequence (gives a Seq)."""
+        #Offload to the base class...
+        return Seq(str(self), self.alphabet) + other
+
+    def __radd__(self, other):
+        #Offload to the base class...
+        return other + Seq(str(self), self.alphabet)
+
+    def reverse_complement(self):
+        """Returns the reverse complement as a view on the same buffer.
+
+        >>> from Bio.Alphabet import generic_dna
+        >>> my_dna = BufferSeq("CCCCCgatA-G", generic_dna)
+        >>> my_dna.reverse_complement()
+        BufferSeq('C-TatcGGGGG', DNAAlphabet())
+        >>> my_dna.reverse_complement().reverse_complement()
+        BufferSeq('CCCCCgatA-G', DNAAlphabet())
+        """
+        ttable = self._get_complement_table()
+        new = self._view(self._start, self._end)
+        new._strand = - self._strand
+        new._ttable = ttable
+        return new
+
+#All the four letter DNA words in order of their two bit packed byte value
+#(A=0, C=1, G=2, T=3 with the first letter in the highest two bits):
+_packed_words = [a + b + c + d for a in "ACGT" for b in "ACGT" \
+                 for c in "ACGT" for d in "ACGT"]
+_packed_values = dict((word, value) for value, word in enumerate(_packed_words))
+
+class PackedSeq(BufferSeq):
+    """A read-only unambiguous DNA sequence packed into two bits per letter.
+
+    Holding an unambiguous DNA sequence (just the letters A, C, G and T)
+    with four letters per byte takes a quarter of the memory of a string:
+
+    >>> from Bio.Seq import PackedSeq
+    >>> from Bio.Alphabet import IUPAC
+    >>> my_seq = PackedSeq("ACGTTGCAACGTTGCAA", IUPAC.unambiguous_dna)
+    >>> my_seq
+    PackedSeq('ACGTTGCAACGTTGCAA', IUPACUnambiguousDNA())
+    >>> len(my_seq)
+    17
+    >>> len(my_seq._buffer)
+    5
+
+    As with the BufferSeq object, slicing does not copy the packed data:
+
+    >>> my_seq[1:5]
+    PackedSeq('CGTT', IUPACUnambiguousDNA())
+    >>> my_seq[1:5]._buffer is my_seq._buffer
+    True
+
+    Other letters (including lower case and ambiguity codes) can't be held:
+
+    >>> PackedSeq("ACGTN")
+    Traceback (most recent call last):
+       ...
+    ValueError: PackedSeq can only hold the letters A, C, G and T
+    """
+    def __init__(self, data, alphabet = Alphabet.generic_dna):
+        """Create a new PackedSeq object from a string of A, C, G and T."""
+        if not isinstance(data, basestring):
+            raise TypeError("The sequence data given to a PackedSeq object "
+                            "should be a string (not another Seq object etc)")
+        #Pad the end with A (zero bits) to give a whole number of bytes
+        padded = data + "A" * (-len(data) % 4)
+        try:
+            self._buffer = array.array("B",
+                [_packed_values[padded[i:i+4]] for i in range(0, len(padded), 4)])
+        except KeyError:
+            raise ValueError("PackedSeq can only hold the letters A, C, G and T")
+        self._start = 0
+        self._end = len(data)
+        self.alphabet = alphabet
+
+    def _get_letters(self, start, end):
+        """Returns the letters from start to end unpacked as a string (PRIVATE)."""
+        first = start // 4
+        offset = first * 4
+        words = [_packed_words[value] for value in \
+                 self._buffer[first:(end + 3) // 4]]
+        return "".join(words)[start - offset:end - offset]
+
 class MutableSeq(object):
     """An editable sequence object (with an alphabet).
 
@@ -1957,15 +2212,8 @@ def _translate_str(sequence, table, stop_symbol="*", to_stop=False,
     TranslationError: Extra in frame stop codon found.
     """
     sequence = sequence.upper()
-    amino_acids = []
-    forward_table = table.forward_table
-    stop_codons = table.stop_codons
-    if table.nucleotide_alphabet.letters is not None:
-        valid_letters = set(table.nucleotide_alphabet.letters.upper())
-    else:
-        #Assume the worst case, ambiguous DNA or RNA:
-        valid_letters = set(IUPAC.ambiguous_dna.letters.upper() + \
-                            IUPAC.ambiguous_rna.letters.upper())
+    lookup = _get_codon_lookup(table)
+    amino_acids = ""
     if cds:
         if str(sequence[:3]).upper() not in table.start_codons:
             raise CodonTable.TranslationError(\
@@ -1973,32 +2221,126 @@ def _translate_str(sequence, table, stop_symbol="*", to_stop=False,
         if len(sequence) % 3 != 0:
             raise CodonTable.TranslationError(\
                 "Sequence length %i is not a multiple of three" % len(sequence))
-        if str(sequence[-3:]).upper() not in stop_codons:
+        if str(sequence[-3:]).upper() not in table.stop_codons:
             raise CodonTable.TranslationError(\
                 "Final codon '%s' is not a stop codon" % sequence[-3:])
         #Don't translate the stop symbol, and manually translate the M
         sequence = sequence[3:-3]
-        amino_acids = ["M"]
+        amino_acids = "M"
     n = len(sequence)
-    for i in xrange(0,n-n%3,3):
-        codon = sequence[i:i+3]
+    n -= n % 3
+    #Look up all the codons in one go (each is a three letter string):
+    codons = imap("".join, izip(sequence[0:n:3], sequence[1:n:3],
+                                sequence[2:n:3]))
+    try:
+        amino_acids += _lookup_codons(lookup, codons)
+    except CodonTable.TranslationError:
+        if not (to_stop or cds):
+            raise
+        #Invalid codons after the first stop codon are not a problem,
+        #so go through the codons one by one up to the stop codon:
+        translated = []
+        for i in xrange(0, n, 3):
+            amino_acid = lookup[sequence[i:i+3]]
+            if amino_acid == _STOP_CODE:
+                break
+            translated.append(amino_acid)
+        if cds:
+            raise CodonTable.TranslationError(\
+                "Extra in frame stop codon found.")
+        return amino_acids + "".join(translated).replace(_POS_STOP_CODE,
+                                                         pos_stop)
+    if _STOP_CODE in amino_acids:
+        if cds:
+            raise CodonTable.TranslationError(\
+                "Extra in frame stop codon found.")
+        if to_stop:
+            amino_acids = amino_acids[:amino_acids.index(_STOP_CODE)]
+    return amino_acids.replace(_STOP_CODE, stop_symbol) \
+                      .replace(_POS_STOP_CODE, pos_stop)
+
+def _translate_str_frames(sequence, table, stop_symbol="*", pos_stop="X"):
+    """Helper function to translate a nucleotide string in three frames (PRIVATE).
+
+    Returns a list of three strings, the same as translating sequence,
+    sequence[1:] and sequence[2:] using _translate_str, but looking up all
+    the overlapping codons in a single pass.
+
+    >>> from Bio.Data import CodonTable
+    >>> table = CodonTable.ambiguous_generic_by_id[1]
+    >>> _translate_str_frames("ATGGCCTAGC", table)
+    ['MA*', 'WPS', 'GL']
+    """
+    sequence = sequence.upper()
+    codons = imap("".join, izip(sequence, sequence[1:], sequence[2:]))
+    amino_acids = _lookup_codons(_get_codon_lookup(table), codons)
+    return [amino_acids[frame::3].replace(_STOP_CODE, stop_symbol) \
+                                 .replace(_POS_STOP_CODE, pos_stop) \
+            for frame in range(3)]
+
+#Placeholders used in the codon lookup tables for stop codons and possible
+#stop codons (e.g. TAN or NNN), replaced by the user's chosen symbols:
+_STOP_CODE = "\x00"
+_POS_STOP_CODE = "\x01"
+
+class _CodonLookup(dict):
+    """Dictionary mapping upper case codons to a single letter (PRIVATE).
+
+    Stop codons map to _STOP_CODE and possible stop codons to _POS_STOP_CODE.
+    Any codon not already in the dictionary is translated on demand using
+    the table's forward_table (which may still cope with letters outside
+    the alphabet, e.g. ACX is T), and remembered.  Invalid codons raise a
+    TranslationError.
+    """
+    def __init__(self, table):
+        dict.__init__(self)
+        self.forward_table = table.forward_table
+        self.stop_codons = table.stop_codons
+        if table.nucleotide_alphabet.letters is not None:
+            self.valid_letters = set(table.nucleotide_alphabet.letters.upper())
+        else:
+            #Assume the worst case, ambiguous DNA or RNA:
+            self.valid_letters = set(IUPAC.ambiguous_dna.letters.upper() + \
+                                     IUPAC.ambiguous_rna.letters.upper())
+
+    def __missing__(self, codon):
         try:
-            amino_acids.append(forward_table[codon])
+            amino_acid = self.forward_table[codon]
         except (KeyError, CodonTable.TranslationError):
             #Todo? Treat "---" as a special case (gapped translation)
-            if codon in table.stop_codons:
-                if cds:
-                    raise CodonTable.TranslationError(\
-                        "Extra in frame stop codon found.")
-                if to_stop : break
-                amino_acids.append(stop_symbol)
-            elif valid_letters.issuperset(set(codon)):
+            if codon in self.stop_codons:
+                amino_acid = _STOP_CODE
+            elif self.valid_letters.issuperset(set(codon)):
                 #Possible stop codon (e.g. NNN or TAN)
-                amino_acids.append(pos_stop)
+                amino_acid = _POS_STOP_CODE
             else:
                 raise CodonTable.TranslationError(\
                     "Codon '%s' is invalid" % codon)
-    return "".join(amino_acids)
+        self[codon] = amino_acid
+        return amino_acid
+
+def _get_codon_lookup(table):
+    """Returns a _CodonLookup dictionary for the table (PRIVATE).
+
+    The dictionary starts with every upper case codon made from the table's
+    nucleotide letters (including ambiguous codons), with the ambiguity
+    already resolved using the table's forward_table.  This is worked out
+    once and kept with the CodonTable.
+    """
+    if table._codon_lookup is not None:
+        return table._codon_lookup
+    lookup = _CodonLookup(table)
+    letters = lookup.valid_letters
+    for a in letters:
+        for b in letters:
+            for c in letters:
+                lookup[a + b + c]
+    table._codon_lookup = lookup
+    return lookup
+
+def _lookup_codons(lookup, codons):
+    """Returns the codons translated as a string using the lookup (PRIVATE)."""
+    return "".join(imap(lookup.__getitem__, codons))
 
 def translate(sequence, table="Standard", stop_symbol="*", to_stop=False,
               cds=False):
@@ -2076,16 +2418,24 @@ def translate(sequence, table="Standard", stop_symbol="*", to_stop=False,
         return sequence.toseq().translate(table, stop_symbol, to_stop, cds)
     else:
         #Assume its a string, return a string
-        try:
-            codon_table = CodonTable.ambiguous_generic_by_id[int(table)]
-        except ValueError:
-            codon_table = CodonTable.ambiguous_generic_by_name[table]
-        except (AttributeError, TypeError):
-            if isinstance(table, CodonTable.CodonTable):
-                codon_table = table
-            else:
-                raise ValueError('Bad table argument')
+        codon_table = _get_str_codon_table(table)
         return _translate_str(sequence, codon_table, stop_symbol, to_stop, cds)
+
+def _get_str_codon_table(table):
+    """Returns the CodonTable to use for translating strings (PRIVATE).
+
+    The table can be a name (string), an NCBI identifier (integer), or a
+    CodonTable object.
+    """
+    try:
+        return CodonTable.ambiguous_generic_by_id[int(table)]
+    except ValueError:
+        return CodonTable.ambiguous_generic_by_name[table]
+    except (AttributeError, TypeError):
+        if isinstance(table, CodonTable.CodonTable):
+            return table
+        else:
+            raise ValueError('Bad table argument')
       
 def reverse_complement(sequence):
     """Returns the reverse complement sequence of a nucleotide string.
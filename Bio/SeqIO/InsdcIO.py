@@ -69,6 +69,24 @@ def EmblIterator(handle):
     #This calls a generator function:
     return EmblScanner(debug=0).parse_records(handle)
 
+def _GenBankLazyIterator(handle):
+    """Breaks up a GenBank file into SeqRecord objects with lazy features (PRIVATE).
+
+    Like GenBankIterator, but the feature table of each record is only
+    parsed into SeqFeature objects when the record's features property
+    is first used. This is used for the "genbank-lazy" format name.
+    """
+    return GenBankScanner(debug=0).parse_records(handle, lazy=True)
+
+def _EmblLazyIterator(handle):
+    """Breaks up an EMBL file into SeqRecord objects with lazy features (PRIVATE).
+
+    Like EmblIterator, but the feature table of each record is only
+    parsed into SeqFeature objects when the record's features property
+    is first used. This is used for the "embl-lazy" format name.
+    """
+    return EmblScanner(debug=0).parse_records(handle, lazy=True)
+
 def ImgtIterator(handle):
     """Breaks up an IMGT file into SeqRecord objects.
 
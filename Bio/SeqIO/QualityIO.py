@@ -369,8 +369,16 @@ from Bio.Seq import Seq, UnknownSeq
 from Bio.SeqRecord import SeqRecord
 from Bio.SeqIO.Interfaces import SequentialSequenceWriter
 from math import log
+from array import array
 import warnings
 from Bio import BiopythonWarning, BiopythonParserWarning
+from Bio._py3k import _as_bytes, _as_string
+
+try:
+    import numpy
+except ImportError:
+    #Only needed for the optional quality_array argument of the parsers
+    numpy = None
 
 
 # define score offsets. See discussion for differences between Sanger and
@@ -534,6 +542,30 @@ def _get_phred_quality(record):
                          "letter_annotations of SeqRecord (id=%s)." \
                          % record.id)
 
+def _array_quality_str(qualities, offset, low, high):
+    """Encode a NumPy array of integer scores as an ASCII string (PRIVATE).
+
+    This is done with a couple of array operations, rather than looking up
+    each score in turn. Returns None if the qualities are not an integer
+    array, or if any score is outside the range low to high (in which case
+    the caller should fall back on the general code).
+    """
+    try:
+        if qualities.dtype.kind not in "iu":
+            return None
+    except AttributeError:
+        #Not a NumPy array (e.g. a list)
+        return None
+    if len(qualities) and (qualities.min() < low or qualities.max() > high):
+        return None
+    #Use a signed type large enough to avoid any overflow on adding
+    codes = (qualities.astype(numpy.int16) + offset).astype(numpy.uint8)
+    try:
+        return _as_string(codes.tobytes())
+    except AttributeError:
+        #NumPy older than 1.9
+        return _as_string(codes.tostring())
+
 #Only map 0 to 93, we need to give a warning on truncating at 93
 _phred_to_sanger_quality_str = dict((qp, chr(min(126, qp+SANGER_SCORE_OFFSET))) \
                                     for qp in range(0, 93+1))
@@ -610,6 +642,10 @@ def _get_sanger_quality_str(record):
         #Fall back on solexa scores...
         pass
     else:
+        #A NumPy array (e.g. from parsing with quality_array=True)?
+        answer = _array_quality_str(qualities, SANGER_SCORE_OFFSET, 0, 93)
+        if answer is not None:
+            return answer
         #Try and use the precomputed mapping:
         try:
             return "".join([_phred_to_sanger_quality_str[qp] \
@@ -676,6 +712,10 @@ def _get_illumina_quality_str(record):
         #Fall back on solexa scores...
         pass
     else:
+        #A NumPy array (e.g. from parsing with quality_array=True)?
+        answer = _array_quality_str(qualities, SOLEXA_SCORE_OFFSET, 0, 62)
+        if answer is not None:
+            return answer
         #Try and use the precomputed mapping:
         try:
             return "".join([_phred_to_illumina_quality_str[qp] \
@@ -742,6 +782,10 @@ def _get_solexa_quality_str(record):
         #Fall back on PHRED scores...
         pass
     else:
+        #A NumPy array (e.g. from parsing with quality_array=True)?
+        answer = _array_quality_str(qualities, SOLEXA_SCORE_OFFSET, -5, 62)
+        if answer is not None:
+            return answer
         #Try and use the precomputed mapping:
         try:
             return "".join([_solexa_to_solexa_quality_str[qs] \
@@ -941,8 +985,260 @@ def FastqGeneralIterator(handle):
         if not line : return #StopIteration at end of file
     assert False, "Should not reach this line"
         
+class FastqBatch(object):
+    """A batch of FASTQ reads held as columns of data (rather than per read).
+
+    Rather than one object per read, the sequences of all the reads are held
+    concatenated in a single string, as are the qualities, with an array of
+    offsets giving where each read starts (plus a final entry for the end).
+    The titles are held in a list. You would normally get these batches from
+    the FastqBatchIterator function:
+
+    >>> handle = open("Quality/example.fastq", "rU")
+    >>> for batch in FastqBatchIterator(handle, max_reads=2):
+    ...     print len(batch), list(batch.offsets)
+    2 [0, 25, 50]
+    1 [0, 25]
+    >>> handle.close()
+
+    Each read's sequence is at batch.sequences[start:end] where start and end
+    are consecutive offsets. The batch can also be treated as a list of
+    title, sequence and quality string tuples:
+
+    >>> title, seq, qual = batch[0]
+    >>> print title
+    EAS54_6_R1_2_1_443_348
+    >>> print seq
+    GTTGCTTCTGGCGTGGGTGGGGGGG
+    >>> print qual
+    ;;;;;;;;;;;9;7;;.7;393333
+    """
+    def __init__(self, titles, sequences, qualities, offsets):
+        """Create a batch from the columns of read data.
+
+         - titles - list of title strings (without the leading "@")
+         - sequences - string of all the sequences concatenated
+         - qualities - string of all the quality strings concatenated
+         - offsets - array of integers, the start of each read in the
+                     sequences and qualities strings, plus their length
+                     as the final entry
+        """
+        if len(offsets) != len(titles) + 1:
+            raise ValueError("Expected %i offsets for %i reads, not %i" \
+                             % (len(titles) + 1, len(titles), len(offsets)))
+        if len(sequences) != len(qualities):
+            raise ValueError("Sequences and qualities of different lengths")
+        if offsets[-1] != len(sequences):
+            raise ValueError("Final offset should be the sequences length")
+        self.titles = titles
+        self.sequences = sequences
+        self.qualities = qualities
+        self.offsets = offsets
+
+    def __len__(self):
+        """Returns the number of reads in the batch."""
+        return len(self.titles)
+
+    def __getitem__(self, index):
+        """Returns a (title, sequence, quality) tuple for the read."""
+        index, start, end = self._bounds(index)
+        return (self.titles[index], self.sequences[start:end],
+                self.qualities[start:end])
+
+    def _bounds(self, index):
+        """Returns the read index (made non-negative), start and end (PRIVATE).
+
+        Raises an IndexError if the index is out of range.
+        """
+        if index < 0:
+            index += len(self.titles)
+        if not 0 <= index < len(self.titles):
+            raise IndexError("Read index out of range")
+        return index, self.offsets[index], self.offsets[index + 1]
+
+    def __iter__(self):
+        """Iterate over the reads as (title, sequence, quality) tuples."""
+        offsets = self.offsets
+        for index, title in enumerate(self.titles):
+            start = offsets[index]
+            end = offsets[index + 1]
+            yield title, self.sequences[start:end], self.qualities[start:end]
+
+    def lengths(self):
+        """Returns an array of the read lengths.
+
+        >>> handle = open("Quality/example.fastq", "rU")
+        >>> batch = FastqBatchIterator(handle).next()
+        >>> handle.close()
+        >>> list(batch.lengths())
+        [25, 25, 25]
+        """
+        offsets = self.offsets
+        return array(offsets.typecode, [offsets[i + 1] - offsets[i] \
+                                        for i in xrange(len(self.titles))])
+
+    def quality_array(self, offset=SANGER_SCORE_OFFSET):
+        """Returns the scores of all the reads as one NumPy array.
+
+         - offset - ASCII offset of the quality encoding, default 33 (as
+                    used in Sanger FASTQ files), use 64 for Solexa and
+                    Illumina 1.3 to 1.7 FASTQ files.
+
+        This requires NumPy, and allows whole batch calculations like the
+        mean quality of each read::
+
+            scores = batch.quality_array()
+            totals = numpy.add.reduceat(scores, batch.offsets[:-1])
+            means = totals / numpy.asarray(batch.lengths(), float)
+        """
+        _check_quality_array()
+        #Signed as Solexa scores can be negative
+        return numpy.frombuffer(_as_bytes(self.qualities), numpy.uint8) \
+               .astype(numpy.int16) - offset
+
+    def subset(self, wanted):
+        """Returns a new batch of just the selected reads.
+
+         - wanted - sequence of booleans (one per read, e.g. a NumPy array
+                    from a vectorised filter), or of read indices
+
+        >>> handle = open("Quality/example.fastq", "rU")
+        >>> batch = FastqBatchIterator(handle).next()
+        >>> handle.close()
+        >>> print batch.subset([2, 0]).titles
+        ['EAS54_6_R1_2_1_443_348', 'EAS54_6_R1_2_1_413_324']
+        >>> print batch.subset([False, True, False]).titles
+        ['EAS54_6_R1_2_1_540_792']
+        """
+        wanted = list(wanted)
+        if len(wanted) == len(self.titles) and \
+        all(isinstance(w, bool) or getattr(w, "dtype", None) == bool
+            for w in wanted):
+            wanted = [i for i, w in enumerate(wanted) if w]
+        offsets = self.offsets
+        titles = []
+        seqs = []
+        quals = []
+        new_offsets = array(offsets.typecode, [0])
+        for index in wanted:
+            index, start, end = self._bounds(index)
+            titles.append(self.titles[index])
+            seqs.append(self.sequences[start:end])
+            quals.append(self.qualities[start:end])
+            new_offsets.append(new_offsets[-1] + end - start)
+        return FastqBatch(titles, "".join(seqs), "".join(quals), new_offsets)
+
+
+def FastqBatchIterator(handle, max_reads=10000, max_bases=None):
+    """Iterate over a FASTQ file in batches of reads (as FastqBatch objects).
+
+     - handle - input file
+     - max_reads - Maximum number of reads in a batch (default 10000).
+     - max_bases - Optional maximum number of bases in a batch (a batch is
+                   ended once it reaches this size, so it can be exceeded
+                   by at most one read). Useful to limit the memory used
+                   for long reads.
+
+    This uses the FastqGeneralIterator to parse the file (so the quality
+    strings are not checked or interpreted), collecting the reads into
+    batches which hold the sequences and qualities as columns. Processing
+    whole batches at a time (e.g. to trim or filter reads using NumPy) avoids
+    the overhead of creating a SeqRecord object for each read. Use the
+    write_fastq_batches function to save the batches to a file again.
+
+    >>> handle = open("Quality/example.fastq", "rU")
+    >>> for batch in FastqBatchIterator(handle, max_bases=30):
+    ...     print batch.titles
+    ['EAS54_6_R1_2_1_413_324', 'EAS54_6_R1_2_1_540_792']
+    ['EAS54_6_R1_2_1_443_348']
+    >>> handle.close()
+    """
+    if max_reads < 1:
+        raise ValueError("Need at least one read per batch")
+    titles = []
+    seqs = []
+    quals = []
+    offsets = array("l", [0])
+    bases = 0
+    for title, seq, qual in FastqGeneralIterator(handle):
+        titles.append(title)
+        seqs.append(seq)
+        quals.append(qual)
+        bases += len(seq)
+        offsets.append(bases)
+        if len(titles) >= max_reads or (max_bases and bases >= max_bases):
+            yield FastqBatch(titles, "".join(seqs), "".join(quals), offsets)
+            titles = []
+            seqs = []
+            quals = []
+            offsets = array("l", [0])
+            bases = 0
+    if titles:
+        yield FastqBatch(titles, "".join(seqs), "".join(quals), offsets)
+
+
+def write_fastq_batches(batches, handle):
+    """Write FastqBatch objects to a FASTQ file, returns the number of reads.
+
+     - batches - iterable of FastqBatch objects (or a single FastqBatch)
+     - handle - output file
+
+    Each read is written using four lines (without line wrapping), with the
+    title on the "@" line only. The quality strings are written as is, so
+    the output uses the same FASTQ variant as the input.
+
+    >>> from StringIO import StringIO
+    >>> handle = open("Quality/example.fastq", "rU")
+    >>> batches = FastqBatchIterator(handle)
+    >>> out_handle = StringIO()
+    >>> write_fastq_batches(batches, out_handle)
+    3
+    >>> handle.close()
+    >>> print out_handle.getvalue().split("\\n")[3]
+    ;;3;;;;;;;;;;;;7;;;;;;;88
+    """
+    if isinstance(batches, FastqBatch):
+        batches = [batches]
+    count = 0
+    for batch in batches:
+        offsets = batch.offsets
+        seqs = batch.sequences
+        quals = batch.qualities
+        lines = []
+        for index, title in enumerate(batch.titles):
+            start = offsets[index]
+            end = offsets[index + 1]
+            lines.append("@%s\n%s\n+\n%s\n" \
+                         % (title, seqs[start:end], quals[start:end]))
+        handle.write("".join(lines))
+        count += len(lines)
+    return count
+
+
+def _quality_array(quality_string, offset, low, high, dtype):
+    """Decode a FASTQ quality string into a NumPy array of scores (PRIVATE).
+
+    Rather than looking up each letter in turn, the string's ASCII values are
+    taken as an array and the offset subtracted in one go. The scores must be
+    in the range low to high, otherwise a ValueError is raised.
+    """
+    qualities = numpy.frombuffer(_as_bytes(quality_string), numpy.uint8)
+    if len(qualities) and (qualities.min() < low + offset \
+                           or qualities.max() > high + offset):
+        raise ValueError("Invalid character in quality string")
+    #Converting type first as an unsigned type can't hold negative scores
+    return qualities.astype(dtype) - dtype(offset)
+
+def _check_quality_array():
+    """Raise an exception if NumPy is missing (PRIVATE)."""
+    if numpy is None:
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Please install NumPy to decode "
+                                           "quality scores as arrays")
+
 #This is a generator function!
-def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = None):
+def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = None,
+                       quality_array = False):
     """Generator function to iterate over FASTQ records (as SeqRecord objects).
 
      - handle - input file
@@ -953,6 +1249,9 @@ def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = No
                    strings.  If this is not given, then the entire title line
                    will be used as the description, and the first word as the
                    id and name.
+     - quality_array - Optional boolean, default False. If True, the quality
+                   scores are given as a NumPy array (of unsigned 8 bit
+                   integers) rather than a list of integers.
 
     Note that use of title2ids matches that of Bio.SeqIO.FastaIO.
 
@@ -1006,8 +1305,22 @@ def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = No
 
     >>> print record.letter_annotations["phred_quality"]
     [26, 26, 26, 26, 26, 26, 26, 26, 26, 26, 26, 24, 26, 22, 26, 26, 13, 22, 26, 18, 24, 18, 18, 18, 18]
+
+    Building a list of integers for every read takes a significant amount of
+    time for large files. If you have NumPy installed, you can instead ask for
+    the qualities as a compact NumPy array, which is decoded from the quality
+    string using a single array operation::
+
+        handle = open("Quality/example.fastq", "rU")
+        for record in FastqPhredIterator(handle, quality_array=True):
+            print record.id, record.letter_annotations["phred_quality"].max()
+        handle.close()
+
+    Such arrays are also handled efficiently when writing FASTQ files.
     """
     assert SANGER_SCORE_OFFSET == ord("!")
+    if quality_array:
+        _check_quality_array()
     #Originally, I used a list expression for each record:
     #
     # qualities = [ord(letter)-SANGER_SCORE_OFFSET for letter in quality_string]
@@ -1025,9 +1338,13 @@ def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = No
             name = id
         record = SeqRecord(Seq(seq_string, alphabet),
                            id=id, name=name, description=descr)
-        qualities = [q_mapping[letter] for letter in quality_string]
-        if qualities and (min(qualities) < 0 or max(qualities) > 93):
-            raise ValueError("Invalid character in quality string")
+        if quality_array:
+            qualities = _quality_array(quality_string, SANGER_SCORE_OFFSET,
+                                       0, 93, numpy.uint8)
+        else:
+            qualities = [q_mapping[letter] for letter in quality_string]
+            if qualities and (min(qualities) < 0 or max(qualities) > 93):
+                raise ValueError("Invalid character in quality string")
         #For speed, will now use a dirty trick to speed up assigning the
         #qualities. We do this to bypass the length check imposed by the
         #per-letter-annotations restricted dict (as this has already been
@@ -1038,10 +1355,13 @@ def FastqPhredIterator(handle, alphabet = single_letter_alphabet, title2ids = No
         yield record
 
 #This is a generator function!
-def FastqSolexaIterator(handle, alphabet = single_letter_alphabet, title2ids = None):
+def FastqSolexaIterator(handle, alphabet = single_letter_alphabet, title2ids = None,
+                        quality_array = False):
     r"""Parsing old Solexa/Illumina FASTQ like files (which differ in the quality mapping).
 
-    The optional arguments are the same as those for the FastqPhredIterator.
+    The optional arguments are the same as those for the FastqPhredIterator,
+    except that with quality_array=True the array uses signed 8 bit integers
+    (as Solexa scores can be negative).
 
     For each sequence in Solexa/Illumina FASTQ files there is a matching string
     encoding the Solexa integer qualities using ASCII values with an offset
@@ -1175,6 +1495,8 @@ def FastqSolexaIterator(handle, alphabet = single_letter_alphabet, title2ids = N
     As shown above, the poor quality Solexa reads have been mapped to the
     equivalent PHRED score (e.g. -5 to 1 as shown earlier).
     """
+    if quality_array:
+        _check_quality_array()
     q_mapping = dict()
     for letter in range(0, 255):
         q_mapping[chr(letter)] = letter-SOLEXA_SCORE_OFFSET
@@ -1187,10 +1509,14 @@ def FastqSolexaIterator(handle, alphabet = single_letter_alphabet, title2ids = N
             name = id
         record = SeqRecord(Seq(seq_string, alphabet),
                            id=id, name=name, description=descr)
-        qualities = [q_mapping[letter] for letter in quality_string]
         #DO NOT convert these into PHRED qualities automatically!
-        if qualities and (min(qualities) < -5 or max(qualities)>62):
-            raise ValueError("Invalid character in quality string")
+        if quality_array:
+            qualities = _quality_array(quality_string, SOLEXA_SCORE_OFFSET,
+                                       -5, 62, numpy.int8)
+        else:
+            qualities = [q_mapping[letter] for letter in quality_string]
+            if qualities and (min(qualities) < -5 or max(qualities)>62):
+                raise ValueError("Invalid character in quality string")
         #Dirty trick to speed up this line:
         #record.letter_annotations["solexa_quality"] = qualities
         dict.__setitem__(record._per_letter_annotations,
@@ -1198,7 +1524,8 @@ def FastqSolexaIterator(handle, alphabet = single_letter_alphabet, title2ids = N
         yield record
 
 #This is a generator function!
-def FastqIlluminaIterator(handle, alphabet = single_letter_alphabet, title2ids = None):
+def FastqIlluminaIterator(handle, alphabet = single_letter_alphabet, title2ids = None,
+                          quality_array = False):
     """Parse Illumina 1.3 to 1.7 FASTQ like files (which differ in the quality mapping).
 
     The optional arguments are the same as those for the FastqPhredIterator.
@@ -1227,6 +1554,8 @@ def FastqIlluminaIterator(handle, alphabet = single_letter_alphabet, title2ids =
 
     NOTE - True Sanger style FASTQ files use PHRED scores with an offset of 33.
     """
+    if quality_array:
+        _check_quality_array()
     q_mapping = dict()
     for letter in range(0, 255):
         q_mapping[chr(letter)] = letter-SOLEXA_SCORE_OFFSET
@@ -1239,9 +1568,13 @@ def FastqIlluminaIterator(handle, alphabet = single_letter_alphabet, title2ids =
             name = id
         record = SeqRecord(Seq(seq_string, alphabet),
                            id=id, name=name, description=descr)
-        qualities = [q_mapping[letter] for letter in quality_string]
-        if qualities and (min(qualities) < 0 or max(qualities) > 62):
-            raise ValueError("Invalid character in quality string")
+        if quality_array:
+            qualities = _quality_array(quality_string, SOLEXA_SCORE_OFFSET,
+                                       0, 62, numpy.uint8)
+        else:
+            qualities = [q_mapping[letter] for letter in quality_string]
+            if qualities and (min(qualities) < 0 or max(qualities) > 62):
+                raise ValueError("Invalid character in quality string")
         #Dirty trick to speed up this line:
         #record.letter_annotations["phred_quality"] = qualities
         dict.__setitem__(record._per_letter_annotations,
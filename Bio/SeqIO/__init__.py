@@ -342,8 +342,10 @@ _FormatToIterator = {"fasta" : FastaIO.FastaIterator,
                      "gb" : InsdcIO.GenBankIterator,
                      "genbank" : InsdcIO.GenBankIterator,
                      "genbank-cds" : InsdcIO.GenBankCdsFeatureIterator,
+                     "genbank-lazy" : InsdcIO._GenBankLazyIterator,
                      "embl" : InsdcIO.EmblIterator,
                      "embl-cds" : InsdcIO.EmblCdsFeatureIterator,
+                     "embl-lazy" : InsdcIO._EmblLazyIterator,
                      "imgt" : InsdcIO.ImgtIterator,
                      "ig" : IgIO.IgIterator,
                      "swiss" : SwissIO.SwissIterator,
@@ -669,7 +671,8 @@ def to_dict(sequences, key_function=None):
         d[key] = record
     return d
 
-def index(filename, format, alphabet=None, key_function=None):
+def index(filename, format, alphabet=None, key_function=None,
+          use_mmap=False, cache_filename=None, compact=False):
     """Indexes a sequence file and returns a dictionary like object.
 
      - filename - string giving name of file to be indexed
@@ -680,6 +683,13 @@ def index(filename, format, alphabet=None, key_function=None):
      - key_function - Optional callback function which when given a
                   SeqRecord identifier string should return a unique
                   key for the dictionary.
+     - use_mmap - Optional boolean, default False. If True the file is
+                  accessed via a read only memory map (see below).
+     - cache_filename - Optional string, where to keep an offset cache file
+                  for reuse by later calls (see below).
+     - compact  - Optional boolean, default False. If True the keys and
+                  offsets are held in a compact sorted form rather than a
+                  Python dictionary (see below).
 
     This indexing function will return a dictionary like object, giving the
     SeqRecord objects as values:
@@ -699,6 +709,16 @@ def index(filename, format, alphabet=None, key_function=None):
     >>> print records.get("Missing", None)
     None
 
+    If you want lots of records, it is faster to ask for them all at once
+    with the get_many (or get_raw_many) method, which reads them from the
+    file in order of their position, but returns them in the order asked:
+
+    >>> for record in records.get_many(["EAS54_6_R1_2_1_540_792",
+    ...                                 "EAS54_6_R1_2_1_413_324"]):
+    ...     print record.id
+    EAS54_6_R1_2_1_540_792
+    EAS54_6_R1_2_1_413_324
+
     Note that this psuedo dictionary will not support all the methods of a
     true Python dictionary, for example values() is not defined since this
     would require loading all of the records into memory at once.
@@ -762,11 +782,74 @@ def index(filename, format, alphabet=None, key_function=None):
     to be completely parsed while building the index. Right now this is
     usually avoided.
 
+    If you are doing lots of random lookups on a large file, you can ask
+    for the file to be memory mapped with use_mmap=True. Each record is
+    then read directly from the mapped buffer rather than via a seek and
+    read on a file handle, and the memory pages are shared by all the
+    processes which have the same file mapped:
+
+    >>> from Bio import SeqIO
+    >>> records = SeqIO.index("Quality/example.fastq", "fastq", use_mmap=True)
+    >>> len(records)
+    3
+    >>> print records.get_raw("EAS54_6_R1_2_1_540_792")
+    @EAS54_6_R1_2_1_540_792
+    TTGGCAGGCCAAGGCCGATGGATCA
+    +
+    ;;;;;;;;;;;7;;;;;-;;;3;83
+    <BLANKLINE>
+
+    Scanning a very large file to build the index can take a while, so you
+    can ask for the keys and offsets to be saved to a cache file with the
+    cache_filename argument (e.g. the indexed filename plus ".idx"). Later
+    calls with the same cache filename will reuse it without scanning the
+    indexed file again, provided the indexed file's size and modification
+    time are unchanged (otherwise the cache file is rebuilt). The cache file
+    is memory mapped rather than loaded into a Python dictionary, so this
+    takes about the same time however many records there are. The cache also
+    records which key_function was used (from its code, and any default
+    arguments or closure variables), and is rebuilt if this changes. It
+    cannot tell if your key_function depends on anything else, such as a
+    global variable, so delete the cache file yourself if that changes.
+    Note the keys must be strings.
+
+    With millions of records, the Python dictionary of keys and offsets can
+    take a lot of memory. Using compact=True keeps the keys sorted in a
+    single string with arrays of the offsets and record lengths instead,
+    looking up keys with a binary search. This is a little slower, but uses
+    a fraction of the memory. Again the keys must be strings:
+
+    >>> records = SeqIO.index("Quality/example.fastq", "fastq", compact=True)
+    >>> len(records)
+    3
+    >>> list(records)
+    ['EAS54_6_R1_2_1_413_324', 'EAS54_6_R1_2_1_443_348', 'EAS54_6_R1_2_1_540_792']
+    >>> print records["EAS54_6_R1_2_1_540_792"].format("fasta")
+    >EAS54_6_R1_2_1_540_792
+    TTGGCAGGCCAAGGCCGATGGATCA
+    <BLANKLINE>
+
+    Notice that in this case the keys are iterated over in sorted order.
+
+    You can also index a file compressed with BGZF (the GZIP variant used in
+    BAM files, see Bio.bgzf and the bgzip tool from samtools/tabix), which is
+    detected automatically. Here the offsets recorded are BGZF virtual
+    offsets. Plain GZIP compressed files cannot be indexed as they do not
+    allow random access.
+
+    >>> records = SeqIO.index("Quality/example.fastq.bgz", "fastq")
+    >>> len(records)
+    3
+    >>> print records["EAS54_6_R1_2_1_540_792"].seq
+    TTGGCAGGCCAAGGCCGATGGATCA
+
     See also: Bio.SeqIO.index_db() and Bio.SeqIO.to_dict()
     """
     #Try and give helpful error messages:
     if not isinstance(filename, basestring):
         raise TypeError("Need a filename (not a handle)")
+    if cache_filename is not None and not isinstance(cache_filename, basestring):
+        raise TypeError("Need a string for the cache filename")
     if not isinstance(format, basestring):
         raise TypeError("Need a string for the file format (lower case)")
     if not format:
@@ -779,10 +862,11 @@ def index(filename, format, alphabet=None, key_function=None):
 
     #Map the file format to a sequence iterator:
     import _index #Lazy import
-    return _index._IndexedSeqFileDict(filename, format, alphabet, key_function)
+    return _index._IndexedSeqFileDict(filename, format, alphabet, key_function,
+                                      use_mmap, cache_filename, compact)
 
 def index_db(index_filename, filenames=None, format=None, alphabet=None,
-               key_function=None):
+               key_function=None, use_mmap=False, workers=1):
     """Index several sequence files and return a dictionary like object.
 
     The index is stored in an SQLite database rather than in memory (as in the
@@ -800,6 +884,11 @@ def index_db(index_filename, filenames=None, format=None, alphabet=None,
      - key_function - Optional callback function which when given a
                   SeqRecord identifier string should return a unique
                   key for the dictionary.
+     - use_mmap - Optional boolean, default False. If True the files are
+                  accessed via read only memory maps, as in the
+                  Bio.SeqIO.index(...) function.
+     - workers  - Optional integer, default 1. The number of processes to
+                  use when building a new index (see below).
 
     This indexing function will return a dictionary like object, giving the
     SeqRecord objects as values:
@@ -823,6 +912,19 @@ def index_db(index_filename, filenames=None, format=None, alphabet=None,
 
     In this example the two files contain 85 and 10 records respectively.
 
+    Building the index for lots of large files can take a while, so you can
+    ask for the files to be scanned using a pool of worker processes. Large
+    files in simple formats like FASTA, FASTQ and GenBank are also split
+    into chunks (starting at record boundaries) to be scanned in parallel:
+
+    >>> records = SeqIO.index_db(idx_name, files, "fasta", generic_protein,
+    ...                          get_gi, workers=2)
+    >>> len(records)
+    95
+
+    Note your key_function is still applied in the main process, so it can
+    be any function (it does not need to be picklable).
+
     See also: Bio.SeqIO.index() and Bio.SeqIO.to_dict()
     """
     #Try and give helpful error messages:
@@ -841,14 +943,18 @@ def index_db(index_filename, filenames=None, format=None, alphabet=None,
     if alphabet is not None and not (isinstance(alphabet, Alphabet) or \
                                      isinstance(alphabet, AlphabetEncoder)):
         raise ValueError("Invalid alphabet, %s" % repr(alphabet))
+    if workers < 1:
+        raise ValueError("Need at least one worker, not %r" % workers)
 
     #Map the file format to a sequence iterator:
     import _index #Lazy import
     return _index._SQLiteManySeqFilesDict(index_filename, filenames, format,
-                                          alphabet, key_function)
+                                          alphabet, key_function,
+                                          use_mmap=use_mmap, workers=workers)
 
 
-def convert(in_file, in_format, out_file, out_format, alphabet=None):
+def convert(in_file, in_format, out_file, out_format, alphabet=None,
+            workers=1):
     """Convert between two sequence file formats, return number of records.
 
      - in_file - an input handle or filename
@@ -856,6 +962,8 @@ def convert(in_file, in_format, out_file, out_format, alphabet=None):
      - out_file - an output handle or filename
      - out_format - output file format, lower case string
      - alphabet - optional alphabet to assume
+     - workers - Optional integer, default 1. The number of processes to
+                 use for the conversion (see below).
 
     NOTE - If you provide an output filename, it will be opened which will
     overwrite any existing file without warning. This may happen if even
@@ -876,7 +984,24 @@ def convert(in_file, in_format, out_file, out_format, alphabet=None):
     >EAS54_6_R1_2_1_443_348
     GTTGCTTCTGGCGTGGGTGGGGGGG
     <BLANKLINE>
+
+    Converting large files can be slow, so for simple formats like FASTA,
+    FASTQ, GenBank and EMBL you can ask for the conversion to be done in a
+    pool of worker processes. The input is split into chunks of records,
+    and the converted chunks are written out in their original order:
+
+    >>> handle = StringIO("")
+    >>> SeqIO.convert("Quality/example.fastq", "fastq", handle, "fasta",
+    ...               workers=2)
+    3
+    >>> print handle.getvalue().split()[-1]
+    GTTGCTTCTGGCGTGGGTGGGGGGG
+
+    Other formats (e.g. those with a header or footer in the output) are
+    converted in the current process as usual.
     """
+    if workers < 1:
+        raise ValueError("Need at least one worker, not %r" % workers)
     #Hack for SFF, will need to make this more general in future
     if in_format in _BinaryFormats :
         in_mode = 'rb'
@@ -896,7 +1021,7 @@ def convert(in_file, in_format, out_file, out_format, alphabet=None):
         with as_handle(out_file, out_mode) as out_handle:
             count = _handle_convert(in_handle, in_format,
                                     out_handle, out_format,
-                                    alphabet)
+                                    alphabet, workers)
     return count
 
 def _test():
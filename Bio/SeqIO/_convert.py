@@ -24,6 +24,9 @@ means that using Bio.SeqIO.convert() may be faster, as well as more convenient.
 All these file format specific optimisations are handled by this (private) module.
 """
 
+from collections import deque
+from StringIO import StringIO
+
 from Bio import SeqIO
 #NOTE - Lots of lazy imports further on...
 
@@ -353,8 +356,141 @@ _converter = {
     ("fastq-illumina", "qual") : _fastq_illumina_convert_qual,
     }
 
-def _handle_convert(in_handle, in_format, out_handle, out_format, alphabet=None):
+#Input formats which can be split into chunks of records by looking for the
+#line at the start of each record (FASTQ is handled separately, as "@" can
+#also start a quality line), and output formats which can be written in
+#chunks then simply concatenated (no header or footer, no record count):
+_SplitMarkers = {"embl" : "ID ",
+                 "fasta" : ">",
+                 "genbank" : "LOCUS ",
+                 "gb": "LOCUS ",
+                 "imgt" : "ID ",
+                 "qual": ">",
+                 "swiss" : "ID ",
+                 "tab" : "",
+                 }
+_ConcatenatedOutput = ["embl", "fasta", "fastq", "fastq-sanger",
+                       "fastq-solexa", "fastq-illumina", "genbank", "gb",
+                       "imgt", "qual", "tab"]
+
+#Approximate size of each chunk of records given to a worker process
+_CHUNK_SIZE = 2**20
+
+def _split_at_markers(handle, marker, chunk_size):
+    """Yield strings of whole records, each at least chunk_size long (PRIVATE).
+
+    The records must each start with a line beginning with the marker (with
+    any text before the first record included in the first chunk).
+    """
+    lines = []
+    size = 0
+    for line in handle:
+        if size >= chunk_size and line.startswith(marker):
+            yield "".join(lines)
+            lines = []
+            size = 0
+        lines.append(line)
+        size += len(line)
+    if lines:
+        yield "".join(lines)
+
+def _split_fastq(handle, chunk_size):
+    """Yield strings of whole FASTQ records, each at least chunk_size long (PRIVATE).
+
+    As an "@" can also start a quality line, this keeps track of the sequence
+    and quality lengths (as in FastqGeneralIterator) to find the title lines.
+    Any problems with the file are left for the parser to report.
+    """
+    lines = []
+    size = 0
+    seq_len = 0
+    qual_len = 0
+    in_seq = False
+    in_qual = False
+    for line in handle:
+        if in_qual:
+            qual_len += len(line.rstrip())
+            if qual_len >= seq_len:
+                in_qual = False
+        elif in_seq:
+            if line[0:1] == "+":
+                in_seq = False
+                in_qual = bool(seq_len)
+                qual_len = 0
+            else:
+                seq_len += len(line.rstrip())
+        elif line[0:1] == "@":
+            if size >= chunk_size:
+                yield "".join(lines)
+                lines = []
+                size = 0
+            in_seq = True
+            seq_len = 0
+        lines.append(line)
+        size += len(line)
+    if lines:
+        yield "".join(lines)
+
+def _convert_chunk(task):
+    """Convert a chunk of records, returns count and output (PRIVATE).
+
+    Intended to be called in a worker process, task is a tuple of the input
+    data (as a string), the input format, the output format and alphabet.
+    """
+    data, in_format, out_format, alphabet = task
+    out_handle = StringIO()
+    count = _handle_convert(StringIO(data), in_format, out_handle, out_format,
+                            alphabet)
+    return count, out_handle.getvalue()
+
+def _parallel_convert(in_handle, in_format, out_handle, out_format,
+                      alphabet, workers):
+    """SeqIO conversion using a pool of worker processes (PRIVATE).
+
+    The input is split into chunks of records which are converted in
+    parallel, with the output written in the original order. At most a
+    couple of chunks per worker are in progress (or waiting to be written)
+    at any one time, so the memory needed does not depend on the file size.
+    """
+    try:
+        import multiprocessing
+    except ImportError:
+        #Python 2.5
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Requires multiprocessing, "
+                                           "which is included Python 2.6+")
+    if in_format.startswith("fastq"):
+        chunks = _split_fastq(in_handle, _CHUNK_SIZE)
+    else:
+        chunks = _split_at_markers(in_handle, _SplitMarkers[in_format],
+                                   _CHUNK_SIZE)
+    count = 0
+    pending = deque()
+    pool = multiprocessing.Pool(workers)
+    try:
+        for data in chunks:
+            if len(pending) >= 2 * workers:
+                #Wait for the oldest chunk, keeping the output in order
+                chunk_count, output = pending.popleft().get()
+                out_handle.write(output)
+                count += chunk_count
+            pending.append(pool.apply_async(_convert_chunk,
+                           [(data, in_format, out_format, alphabet)]))
+        while pending:
+            chunk_count, output = pending.popleft().get()
+            out_handle.write(output)
+            count += chunk_count
+    finally:
+        pool.terminate()
+    return count
+
+def _handle_convert(in_handle, in_format, out_handle, out_format, alphabet=None,
+                    workers=1):
     """SeqIO conversion function (PRIVATE)."""
+    if workers > 1 and out_format in _ConcatenatedOutput \
+    and (in_format in _SplitMarkers or in_format.startswith("fastq")):
+        return _parallel_convert(in_handle, in_format, out_handle, out_format,
+                                 alphabet, workers)
     try:
         f = _converter[(in_format, out_format)]
     except KeyError:
@@ -19,18 +19,29 @@ record may not trigger an exception until it is accessed. This is by design.
 
 This means our dictionary like objects have in memory ALL the keys (all the
 record identifiers), which shouldn't be a problem even with second generation
-sequencing. If this is an issue later on, storing the keys and offsets in a
-temp lookup file might be one idea (e.g. using SQLite or an OBDA style index).
+sequencing. If this is an issue, the keys and offsets can be stored in an
+SQLite database (see Bio.SeqIO.index_db), or in a memory mapped offset cache
+file kept next to the indexed file (see the _SortedOffsets class).
 """
 
 import os
+import mmap
+import marshal
+import struct
+from array import array
 try:
     from collections import UserDict as _dict_base
 except ImportError:
     from UserDict import DictMixin as _dict_base
 import re
+import heapq
 import itertools
 from StringIO import StringIO
+try:
+    from hashlib import md5
+except ImportError:
+    #Python 2.4
+    from md5 import new as md5
 
 try:
     from sqlite3 import dbapi2 as _sqlite
@@ -42,10 +53,29 @@ except ImportError:
     _sqlite = None
     pass
 
+try:
+    import multiprocessing
+except ImportError:
+    #Not expected to be present on Python 2.5, only needed
+    #for building an index_db() using several processes
+    multiprocessing = None
+
 from Bio._py3k import _bytes_to_string, _as_bytes, _as_string
 
 from Bio import SeqIO
 from Bio import Alphabet
+from Bio import bgzf
+
+#Record offsets need 64 bit integers, but the array module only has the "q"
+#type code on Python 3.3 onwards. Fall back on longs if they are big enough,
+#or on doubles (which hold integers exactly up to 2**53) otherwise.
+try:
+    _INT64 = array("q").typecode
+except ValueError:
+    if array("l").itemsize == 8:
+        _INT64 = "l"
+    else:
+        _INT64 = "d"
 
 class _IndexedSeqFileDict(_dict_base):
     """Read only dictionary interface to a sequential sequence file.
@@ -68,20 +98,66 @@ class _IndexedSeqFileDict(_dict_base):
 
     Note that this dictionary is essentially read only. You cannot
     add or change values, pop values, nor clear the dictionary.
+
+    If use_mmap is True, the file is read via a read only memory map
+    rather than with seek/read calls on a file handle (see the
+    SeqFileRandomAccess class).
+
+    If cache_filename is given, the keys and offsets are kept in that file
+    (see the _SortedOffsets class) rather than in a Python dictionary. If
+    it already exists and matches the size and modification time of the
+    indexed file, it is reused without scanning the indexed file again.
+    Otherwise the file is scanned as usual and the cache file (re)written.
+    A digest of the key_function is recorded too, so a different function
+    also means the cache file is rebuilt.
+
+    If compact is True, the keys and offsets are kept in memory using the
+    same sorted layout (a single string of keys plus arrays of numbers),
+    which uses far less memory than a dictionary with millions of keys.
+    In both these cases the keys must be strings.
     """
-    def __init__(self, filename, format, alphabet, key_function):
+    def __init__(self, filename, format, alphabet, key_function,
+                 use_mmap=False, cache_filename=None, compact=False):
         #Use key_function=None for default value
         try:
             proxy_class = _FormatToRandomAccess[format]
         except KeyError:
             raise ValueError("Unsupported format '%s'" % format)
-        random_access_proxy = proxy_class(filename, format, alphabet)
+        random_access_proxy = proxy_class(filename, format, alphabet,
+                                          use_mmap)
         self._proxy = random_access_proxy
         self._key_function = key_function
+        self._use_mmap = use_mmap
+        self._cache_filename = cache_filename
+        self._compact = compact
+        if cache_filename:
+            offsets = _load_offsets_cache(cache_filename, filename, format,
+                                          key_function)
+            if offsets is not None:
+                self._offsets = offsets
+                return
         if key_function:
             offset_iter = ((key_function(k),o,l) for (k,o,l) in random_access_proxy)
         else:
             offset_iter = random_access_proxy
+        if cache_filename:
+            #Missing or out of date, so (re)build the cache file
+            try:
+                _write_offsets_cache(cache_filename, filename, format,
+                                     offset_iter, key_function)
+            except (ValueError, TypeError):
+                self._proxy._handle.close()
+                raise
+            self._offsets = _load_offsets_cache(cache_filename, filename,
+                                                format, key_function)
+            return
+        if compact:
+            try:
+                self._offsets = _SortedOffsets(*_sort_offsets(offset_iter))
+            except (ValueError, TypeError):
+                self._proxy._handle.close()
+                raise
+            return
         offsets = {}
         for key, offset, length in offset_iter:
             #Note - we don't store the length because I want to minimise the
@@ -95,9 +171,16 @@ class _IndexedSeqFileDict(_dict_base):
         self._offsets = offsets
     
     def __repr__(self):
-        return "SeqIO.index(%r, %r, alphabet=%r, key_function=%r)" \
+        options = ""
+        if self._use_mmap:
+            options += ", use_mmap=True"
+        if self._cache_filename:
+            options += ", cache_filename=%r" % self._cache_filename
+        if self._compact:
+            options += ", compact=True"
+        return "SeqIO.index(%r, %r, alphabet=%r, key_function=%r%s)" \
                % (self._proxy._handle.name, self._proxy._format,
-                  self._proxy._alphabet, self._key_function)
+                  self._proxy._alphabet, self._key_function, options)
 
     def __str__(self):
         if self:
@@ -206,8 +289,92 @@ class _IndexedSeqFileDict(_dict_base):
 
         NOTE - This functionality is not supported for every file format.
         """
+        offsets = self._offsets
+        if isinstance(offsets, _SortedOffsets):
+            offset, length = offsets.offset_and_length(key)
+            if length:
+                #Shortcut if we have the length
+                h = self._proxy._handle
+                h.seek(offset)
+                return h.read(length)
+            return self._proxy.get_raw(offset)
         #Pass the offset to the proxy
-        return self._proxy.get_raw(self._offsets[key])
+        return self._proxy.get_raw(offsets[key])
+
+    def get_many(self, keys):
+        """Iterate over the SeqRecord objects for the given keys.
+
+        The records are returned in the same order as the keys, but are
+        read from the file in batches sorted by their file offset (with
+        nearby records read together where possible). This is much faster
+        than looking up each key in turn if you want lots of records.
+
+        If any key is not found, a KeyError exception is raised.
+        """
+        return self._get_many(keys, True)
+
+    def get_raw_many(self, keys):
+        """Iterate over the raw records for the given keys (as strings).
+
+        The raw records are returned in the same order as the keys, but are
+        read from the file in batches sorted by their file offset (see the
+        get_many method).
+
+        If any key is not found, a KeyError exception is raised.
+
+        NOTE - This functionality is not supported for every file format.
+        """
+        return self._get_many(keys, False)
+
+    def _get_many(self, keys, parse):
+        """Iterate over records or raw records for the keys (PRIVATE)."""
+        keys = iter(keys)
+        while True:
+            batch = list(itertools.islice(keys, _MANY_BATCH_SIZE))
+            if not batch:
+                break
+            #Find each (file_number, offset, length) then read from the
+            #file(s) in that order, and return in the order requested.
+            located = self._locate_many(batch)
+            order = sorted(range(len(batch)), key=located.__getitem__)
+            values = [None] * len(batch)
+            for file_number, group in itertools.groupby(order,
+                                        key=lambda i: located[i][0]):
+                group = list(group)
+                proxy = self._get_proxy(file_number)
+                entries = [located[i][1:] for i in group]
+                if parse:
+                    results = proxy.get_many(entries)
+                else:
+                    results = proxy.get_raw_many(entries)
+                for i, value in zip(group, results):
+                    values[i] = value
+            if parse:
+                key_function = self._key_function
+                for key, record in zip(batch, values):
+                    if key_function:
+                        key2 = key_function(record.id)
+                    else:
+                        key2 = record.id
+                    if key != key2:
+                        raise ValueError("Key did not match (%s vs %s)" \
+                                         % (key, key2))
+            for value in values:
+                yield value
+
+    def _locate_many(self, keys):
+        """Return list of (file_number, offset, length) for the keys (PRIVATE).
+
+        The length is zero if not known.
+        """
+        offsets = self._offsets
+        if isinstance(offsets, _SortedOffsets):
+            return [(0,) + offsets.offset_and_length(key) for key in keys]
+        return [(0, offsets[key], 0) for key in keys]
+
+    def _get_proxy(self, file_number):
+        """Return the random access proxy for the file (PRIVATE)."""
+        return self._proxy
 
     def __setitem__(self, key, value):
         """Would allow setting or replacing records, but not implemented."""
@@ -252,9 +419,17 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
     There are OS limits on the number of files that can be open at once,
     so a pool are kept. If a record is required from a closed file, then
     one of the open handles is closed first.
+
+    If use_mmap is True, each file is read via a read only memory map
+    rather than with seek/read calls on a file handle.
+
+    When building a new index, workers gives the number of processes to use
+    to scan the files. Large files in simple line based formats (e.g. FASTA,
+    FASTQ, GenBank) are split into chunks starting at record boundaries and
+    scanned in parallel.
     """
     def __init__(self, index_filename, filenames, format, alphabet,
-                 key_function, max_open=10):
+                 key_function, max_open=10, use_mmap=False, workers=1):
         random_access_proxies = {}
         #TODO? - Don't keep filename list in memory (just in DB)?
         #Should save a chunk of memory if dealing with 1000s of files.
@@ -265,6 +440,10 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             from Bio import MissingPythonDependencyError
             raise MissingPythonDependencyError("Requires sqlite3, which is "
                                                "included Python 2.5+")
+        if workers > 1 and not multiprocessing:
+            from Bio import MissingPythonDependencyError
+            raise MissingPythonDependencyError("Requires multiprocessing, "
+                                               "which is included Python 2.6+")
         if filenames is not None:
             filenames = list(filenames) #In case it was a generator
         if os.path.isfile(index_filename):
@@ -338,27 +517,49 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             con.execute("CREATE TABLE file_data (file_number INTEGER, name TEXT);")
             con.execute("CREATE TABLE offset_data (key TEXT, file_number INTEGER, offset INTEGER, length INTEGER);")
             count = 0
-            for i, filename in enumerate(filenames):
-                con.execute("INSERT INTO file_data (file_number, name) VALUES (?,?);",
-                            (i, filename))
-                random_access_proxy = proxy_class(filename, format, alphabet)
-                if key_function:
-                    offset_iter = ((key_function(k),i,o,l) for (k,o,l) in random_access_proxy)
-                else:
-                    offset_iter = ((k,i,o,l) for (k,o,l) in random_access_proxy)
-                while True:
-                    batch = list(itertools.islice(offset_iter, 100))
-                    if not batch: break
-                    #print "Inserting batch of %i offsets, %s ... %s" \
-                    # % (len(batch), batch[0][0], batch[-1][0])
-                    con.executemany("INSERT INTO offset_data (key,file_number,offset,length) VALUES (?,?,?,?);",
-                                    batch)
-                    con.commit()
-                    count += len(batch)
-                if len(random_access_proxies) < max_open:
-                    random_access_proxies[i] = random_access_proxy
-                else:
-                    random_access_proxy._handle.close()
+            if workers > 1:
+                #Scan the files (split into chunks where possible) in a
+                #pool of processes, taking the results back in order.
+                chunk_starts = [_chunk_starts(filename, format, workers)
+                                for filename in filenames]
+                tasks = [(filename, format, start, end)
+                         for filename, starts in zip(filenames, chunk_starts)
+                         for start, end in zip(starts[:-1], starts[1:])]
+                pool = multiprocessing.Pool(workers)
+                chunk_results = pool.imap(_scan_chunk, tasks)
+            try:
+                for i, filename in enumerate(filenames):
+                    con.execute("INSERT INTO file_data (file_number, name) VALUES (?,?);",
+                                (i, filename))
+                    random_access_proxy = proxy_class(filename, format, alphabet,
+                                                      use_mmap)
+                    if workers > 1:
+                        file_chunks = itertools.islice(chunk_results,
+                                                       len(chunk_starts[i]) - 1)
+                        try:
+                            file_count = _insert_offsets(con, i, key_function,
+                                    _offsets_from_chunks(file_chunks,
+                                                         chunk_starts[i]))
+                        except _ChunkMismatch:
+                            #Chunk boundary was not a record start after all,
+                            #(e.g. line wrapped FASTQ), so do this file serially.
+                            for result in file_chunks:
+                                pass
+                            con.execute("DELETE FROM offset_data WHERE file_number=?;",
+                                        (i,))
+                            file_count = _insert_offsets(con, i, key_function,
+                                                         random_access_proxy)
+                    else:
+                        file_count = _insert_offsets(con, i, key_function,
+                                                     random_access_proxy)
+                    count += file_count
+                    if len(random_access_proxies) < max_open:
+                        random_access_proxies[i] = random_access_proxy
+                    else:
+                        random_access_proxy._handle.close()
+            finally:
+                if workers > 1:
+                    pool.terminate()
             self._length = count
             #print "About to index %i entries" % count
             try:
@@ -379,11 +580,15 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
         self._index_filename = index_filename
         self._alphabet = alphabet
         self._key_function = key_function
+        self._use_mmap = use_mmap
     
     def __repr__(self):
-        return "SeqIO.index_db(%r, filenames=%r, format=%r, alphabet=%r, key_function=%r)" \
+        options = ""
+        if self._use_mmap:
+            options += ", use_mmap=True"
+        return "SeqIO.index_db(%r, filenames=%r, format=%r, alphabet=%r, key_function=%r%s)" \
                % (self._index_filename, self._filenames, self._format,
-                  self._alphabet, self._key_function)
+                  self._alphabet, self._key_function, options)
 
     def __contains__(self, key):
         return bool(self._con.execute("SELECT key FROM offset_data WHERE key=?;",
@@ -424,7 +629,7 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             #Open a new handle...
             proxy = _FormatToRandomAccess[self._format]( \
                         self._filenames[file_number],
-                        self._format, self._alphabet)
+                        self._format, self._alphabet, self._use_mmap)
             record = proxy.get(offset)
             proxies[file_number] = proxy
         if self._key_function:
@@ -474,7 +679,7 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             #Open a new handle...
             proxy = _FormatToRandomAccess[self._format]( \
                         self._filenames[file_number],
-                        self._format, self._alphabet)
+                        self._format, self._alphabet, self._use_mmap)
             proxies[file_number] = proxy
             if length:
                 #Shortcut if we have the length
@@ -484,6 +689,40 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             else:
                 return proxy.get_raw(offset)
 
+    def _locate_many(self, keys):
+        """Return list of (file_number, offset, length) for the keys (PRIVATE).
+
+        Looks up the keys with a few large SELECT ... WHERE key IN (...)
+        queries rather than one query per key.
+        """
+        rows = {}
+        #SQLite allows at most 999 parameters by default
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            sql = "SELECT key, file_number, offset, length FROM offset_data " \
+                  "WHERE key IN (%s);" % ",".join("?" * len(chunk))
+            for key, file_number, offset, length in self._con.execute(sql,
+                                                                      chunk):
+                rows[key] = (file_number, offset, length)
+        return [rows[key] for key in keys]
+
+    def _get_proxy(self, file_number):
+        """Return the random access proxy for the file, opening it if need be (PRIVATE)."""
+        proxies = self._proxies
+        try:
+            return proxies[file_number]
+        except KeyError:
+            pass
+        if len(proxies) >= self._max_open:
+            #Close an old handle...
+            proxies.popitem()[1]._handle.close()
+        #Open a new handle...
+        proxy = _FormatToRandomAccess[self._format]( \
+                    self._filenames[file_number],
+                    self._format, self._alphabet, self._use_mmap)
+        proxies[file_number] = proxy
+        return proxy
+
     def close(self):
         """Close any open file handles."""
         proxies = self._proxies
@@ -491,11 +730,527 @@ class _SQLiteManySeqFilesDict(_IndexedSeqFileDict):
             proxies.popitem()[1]._handle.close()
         
 
+#When fetching many records at once (e.g. get_many), how many keys to look up
+#and sort by offset at a time, and how far apart records can be (and how much
+#to read in one go) for nearby records to be read together:
+_MANY_BATCH_SIZE = 10000
+_MAX_READ_GAP = 2**16
+_MAX_READ_SPAN = 2**22
+
 ##############################################################################
 
+def _insert_offsets(con, file_number, key_function, offset_iter):
+    """Insert (key, offset, length) tuples into the SQLite index (PRIVATE).
+
+    Returns the number of rows inserted. The rows are added in batches
+    with executemany, and committed once at the end.
+    """
+    if key_function:
+        offset_iter = ((key_function(k),file_number,o,l) for (k,o,l) in offset_iter)
+    else:
+        offset_iter = ((k,file_number,o,l) for (k,o,l) in offset_iter)
+    count = 0
+    while True:
+        batch = list(itertools.islice(offset_iter, 1000))
+        if not batch: break
+        #print "Inserting batch of %i offsets, %s ... %s" \
+        # % (len(batch), batch[0][0], batch[-1][0])
+        con.executemany("INSERT INTO offset_data (key,file_number,offset,length) VALUES (?,?,?,?);",
+                        batch)
+        count += len(batch)
+    con.commit()
+    return count
+
+
+#Formats where the index can be built by scanning a file in chunks, each
+#starting at a line beginning with the record marker (FASTQ needs some
+#extra checks as the quality lines can also start with an "@"):
+_ChunkMarkers = {"embl" : "ID ",
+                 "embl-lazy" : "ID ",
+                 "fasta" : ">",
+                 "fastq" : "@",
+                 "fastq-sanger" : "@",
+                 "fastq-solexa" : "@",
+                 "fastq-illumina" : "@",
+                 "genbank" : "LOCUS ",
+                 "genbank-lazy" : "LOCUS ",
+                 "gb": "LOCUS ",
+                 "imgt" : "ID ",
+                 "qual": ">",
+                 "swiss" : "ID ",
+                 }
+
+#Smallest chunk worth scanning in a separate process
+_MIN_CHUNK_SIZE = 2**24
+
+class _ChunkMismatch(Exception):
+    """Scanning a file in chunks did not match up with the records (PRIVATE)."""
+    pass
+
+def _find_record_start(handle, offset, format):
+    """Return offset of the first record starting at or after offset (PRIVATE).
+
+    Returns the end of file offset if there are no more records.
+    """
+    marker = _as_bytes(_ChunkMarkers[format])
+    fastq = format.startswith("fastq")
+    plus_char = _as_bytes("+")
+    #Move to the start of the next line (at or after offset)
+    handle.seek(offset - 1)
+    handle.readline()
+    while True:
+        start = handle.tell()
+        line = handle.readline()
+        if not line:
+            return start
+        if line.startswith(marker):
+            if not fastq:
+                return start
+            #A quality line can start with "@", but if this is the title
+            #line, the line after the next should start with "+". This is
+            #not always true for line wrapped FASTQ (checked later).
+            handle.readline()
+            if handle.readline().startswith(plus_char):
+                return start
+            handle.seek(start)
+            handle.readline()
+
+def _chunk_starts(filename, format, workers):
+    """Return offsets splitting a file into chunks for scanning (PRIVATE).
+
+    The file is split into chunks starting at record boundaries, or if this
+    isn't possible (or worth while), into a single chunk. Returns a list of
+    the chunk start offsets, plus the file size as a final entry (or None
+    if the file is not being split).
+
+    BGZF compressed files are never split, as their (virtual) offsets do
+    not map onto the file size.
+    """
+    size = os.path.getsize(filename)
+    if format not in _ChunkMarkers:
+        return [0, None]
+    handle = open(filename, "rb")
+    if handle.read(2) == _as_bytes("\x1f\x8b"):
+        handle.close()
+        return [0, None]
+    #Aim for a few chunks per process, to even out the load
+    chunk_size = max(_MIN_CHUNK_SIZE, size // (4 * workers))
+    starts = [0]
+    for offset in range(chunk_size, size, chunk_size):
+        start = _find_record_start(handle, offset, format)
+        if starts[-1] < start < size:
+            starts.append(start)
+    handle.close()
+    starts.append(size)
+    return starts
+
+
+class _FileRegion(object):
+    """File like view of part of a file, for scanning a chunk (PRIVATE).
+
+    Offsets are relative to the start of the region, and reading stops at
+    the end of the region (which must be at the start of a line).
+    """
+    def __init__(self, handle, start, end):
+        self._handle = handle
+        self._start = start
+        self._end = end
+        self.name = handle.name
+        handle.seek(start)
+
+    def seek(self, offset):
+        self._handle.seek(self._start + offset)
+
+    def tell(self):
+        return self._handle.tell() - self._start
+
+    def readline(self):
+        if self._handle.tell() >= self._end:
+            return _as_bytes("")
+        return self._handle.readline()
+
+    def close(self):
+        self._handle.close()
+
+def _scan_chunk(task):
+    """Return a list of (key, offset, length) tuples for a chunk (PRIVATE).
+
+    Intended to be called in a worker process, task is a tuple of the
+    filename, format, and the chunk start and end offsets (with an end of
+    None meaning the whole file). Returns None if the chunk could not be
+    scanned.
+    """
+    filename, format, start, end = task
+    proxy = _FormatToRandomAccess[format](filename, format, None)
+    if end is not None:
+        proxy._handle = _FileRegion(proxy._handle, start, end)
+    try:
+        try:
+            return [(key, start + offset, length)
+                    for key, offset, length in proxy]
+        except (ValueError, AssertionError):
+            return None
+    finally:
+        proxy._handle.close()
+
+def _offsets_from_chunks(results, starts):
+    """Yield (key, offset, length) tuples from the scanned chunks (PRIVATE).
+
+    Checks each chunk's records follow on from those in the previous chunk,
+    raising a _ChunkMismatch exception if not.
+    """
+    expected = None
+    for result, start in zip(results, starts):
+        if result is None:
+            raise _ChunkMismatch("Could not scan chunk at %i" % start)
+        if expected is not None:
+            #Every chunk after the first should start with a record,
+            #which should follow on from the end of the previous record
+            if not result or result[0][1] != start or start != expected:
+                raise _ChunkMismatch("Chunk at %i does not follow on" % start)
+        if result:
+            key, offset, length = result[-1]
+            expected = offset + length
+        for entry in result:
+            yield entry
+
+
+class _PackedInt64s(object):
+    """Read only view of little endian 64 bit integers in a buffer (PRIVATE).
+
+    Used to look up values in a memory mapped offset cache file without
+    first loading the whole array into memory.
+    """
+    def __init__(self, data, start, count):
+        self._data = data
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return struct.unpack_from("<q", self._data, self._start + 8 * i)[0]
+
+
+class _SortedOffsets(object):
+    """Read only mapping of record keys to file offsets (PRIVATE).
+
+    Rather than a Python dictionary, the keys are held sorted and
+    concatenated as a single bytes string, with parallel arrays giving
+    the end of each key in that string, and the offset and length of each
+    record. Looking up a key is done with a binary search.
+
+    The key string and arrays can be in memory, or (via the _PackedInt64s
+    class) views into a memory mapped offset cache file. In the later case
+    base gives where the keys start in the buffer.
+    """
+    def __init__(self, keys, ends, offsets, lengths, base=0):
+        assert len(ends) == len(offsets) == len(lengths)
+        self._keys = keys
+        self._ends = ends
+        self._offsets = offsets
+        self._lengths = lengths
+        self._base = base
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _key(self, i):
+        """Return the i-th key as a bytes string (PRIVATE)."""
+        if i:
+            start = self._base + self._ends[i - 1]
+        else:
+            start = self._base
+        return self._keys[start:self._base + self._ends[i]]
+
+    def _find(self, key):
+        """Return the index of the key, or -1 if not present (PRIVATE)."""
+        if not isinstance(key, basestring):
+            return -1
+        key = _as_bytes(key)
+        lo = 0
+        hi = len(self._offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._offsets) and self._key(lo) == key:
+            return lo
+        return -1
+
+    def __contains__(self, key):
+        return self._find(key) != -1
+
+    def __getitem__(self, key):
+        """Return the offset of the record with this key."""
+        i = self._find(key)
+        if i == -1:
+            raise KeyError(key)
+        return int(self._offsets[i])
+
+    def offset_and_length(self, key):
+        """Return the offset and length (or zero) of the record with this key."""
+        i = self._find(key)
+        if i == -1:
+            raise KeyError(key)
+        return int(self._offsets[i]), int(self._lengths[i])
+
+    def __iter__(self):
+        """Iterate over the keys (in sorted order)."""
+        for i in xrange(len(self._offsets)):
+            yield _bytes_to_string(self._key(i))
+
+    def keys(self):
+        """Return a list of all the keys (in sorted order)."""
+        return list(self)
+
+
+def _pack_offsets(entries):
+    """Pack sorted (key, offset, length) tuples into strings and arrays (PRIVATE).
+
+    Returns the keys as a single bytes string, and arrays of the key ends,
+    offsets and lengths (the arguments for a _SortedOffsets object). Raises
+    a ValueError for any duplicate key.
+    """
+    ends = array(_INT64)
+    offsets = array(_INT64)
+    lengths = array(_INT64)
+    blocks = []
+    block = []
+    end = 0
+    previous = None
+    for key, offset, length in entries:
+        if key == previous:
+            raise ValueError("Duplicate key '%s'" % _bytes_to_string(key))
+        previous = key
+        end += len(key)
+        ends.append(end)
+        offsets.append(offset)
+        lengths.append(length)
+        block.append(key)
+        if len(block) == 65536:
+            #Avoid holding a list of all the keys as separate strings
+            blocks.append(_as_bytes("").join(block))
+            block = []
+    blocks.append(_as_bytes("").join(block))
+    return _as_bytes("").join(blocks), ends, offsets, lengths
+
+def _unpack_offsets(keys, ends, offsets, lengths):
+    """Iterate over packed keys and arrays as (key, offset, length) tuples (PRIVATE)."""
+    start = 0
+    for i in xrange(len(ends)):
+        end = ends[i]
+        yield keys[start:end], offsets[i], lengths[i]
+        start = end
+
+def _merge_offsets(runs):
+    """Merge sorted iterators of (key, offset, length) tuples (PRIVATE)."""
+    heap = []
+    for run in runs:
+        for entry in run:
+            heap.append((entry, run))
+            break
+    heapq.heapify(heap)
+    while heap:
+        entry, run = heap[0]
+        yield entry
+        for entry in run:
+            heapq.heapreplace(heap, (entry, run))
+            break
+        else:
+            heapq.heappop(heap)
+
+def _sort_offsets(offset_iter, run_size=2**20):
+    """Sort (key, offset, length) tuples for a _SortedOffsets (PRIVATE).
+
+    Returns the keys as a single bytes string, and arrays of the key ends,
+    offsets and lengths. Raises a ValueError for any duplicate key, or a
+    TypeError if any key is not a string.
+
+    To keep the memory overhead down with millions of records, the tuples
+    are sorted in runs which are packed into strings and arrays, and then
+    merged.
+    """
+    entries = ((_as_bytes(_check_string_key(key)), offset, length)
+               for key, offset, length in offset_iter)
+    runs = []
+    while True:
+        run = list(itertools.islice(entries, run_size))
+        if not run:
+            break
+        run.sort()
+        runs.append(_pack_offsets(run))
+        del run
+    if not runs:
+        return _pack_offsets([])
+    elif len(runs) == 1:
+        return runs[0]
+    return _pack_offsets(_merge_offsets([_unpack_offsets(*run)
+                                         for run in runs]))
+
+def _check_string_key(key):
+    """Return the key, or raise a TypeError if not a string (PRIVATE)."""
+    if not isinstance(key, basestring):
+        raise TypeError("Keys must be strings, not %r" % key)
+    return key
+
+
+#The offset cache file layout is a fixed size header (magic bytes, size and
+#modification time of the indexed file, record count, format name and a
+#digest of the key function), then the key ends, offsets and lengths as
+#arrays of little endian 64 bit integers, and finally the sorted keys
+#concatenated as a single string.
+_OFFSET_CACHE_MAGIC = _as_bytes("BioIdx\x00\x02")
+_OFFSET_CACHE_HEADER = struct.Struct("<8sqdq16s16s")
+
+def _key_function_digest(key_function):
+    """Return a 16 byte digest identifying the key function (PRIVATE).
+
+    Uses the function's name and compiled code, plus the repr of any default
+    argument values and closure variables, so a changed function gives a
+    different digest. Callables without code (e.g. built in functions) are
+    identified by their name and repr.
+    """
+    if key_function is None:
+        return md5().digest()
+    function = getattr(key_function, "im_func", key_function)
+    parts = [getattr(function, "__module__", None),
+             getattr(function, "__name__", None),
+             getattr(key_function, "im_self", None)]
+    code = getattr(function, "func_code", None)
+    if code is None:
+        parts.append(key_function)
+    else:
+        parts.append(function.func_defaults)
+        if function.func_closure:
+            parts.extend(cell.cell_contents for cell in function.func_closure)
+    digest = md5(marshal.dumps(code))
+    digest.update(_as_bytes(repr(parts)))
+    return digest.digest()
+
+def _write_offsets_cache(cache_filename, filename, format, offset_iter,
+                         key_function=None):
+    """Write an offset cache file for the (key, offset, length) tuples (PRIVATE).
+
+    The file is written under a temporary name and then renamed, so other
+    processes never see a partial cache file.
+    """
+    keys, ends, offsets, lengths = _sort_offsets(offset_iter)
+    stat = os.stat(filename)
+    tmp_filename = "%s.%i.tmp" % (cache_filename, os.getpid())
+    handle = open(tmp_filename, "wb")
+    try:
+        handle.write(_OFFSET_CACHE_HEADER.pack(_OFFSET_CACHE_MAGIC,
+                                               stat.st_size, stat.st_mtime,
+                                               len(offsets), _as_bytes(format),
+                                               _key_function_digest(key_function)))
+        for values in (ends, offsets, lengths):
+            for i in xrange(0, len(values), 8192):
+                chunk = [int(v) for v in values[i:i + 8192]]
+                handle.write(struct.pack("<%iq" % len(chunk), *chunk))
+        handle.write(keys)
+    finally:
+        handle.close()
+    if os.name == "nt" and os.path.isfile(cache_filename):
+        #Can't rename over an existing file on Windows
+        os.remove(cache_filename)
+    os.rename(tmp_filename, cache_filename)
+
+def _load_offsets_cache(cache_filename, filename, format, key_function=None):
+    """Return a _SortedOffsets from an offset cache file, or None (PRIVATE).
+
+    The cache file is memory mapped, so this does not depend on the number
+    of records. Returns None if the cache file is missing, or if it does not
+    match the size and modification time of the indexed file, the format or
+    the key function.
+    """
+    if not os.path.isfile(cache_filename):
+        return None
+    handle = open(cache_filename, "rb")
+    try:
+        if os.fstat(handle.fileno()).st_size < _OFFSET_CACHE_HEADER.size:
+            return None
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        handle.close()
+    magic, size, mtime, count, cache_format, key_digest \
+        = _OFFSET_CACHE_HEADER.unpack_from(data, 0)
+    stat = os.stat(filename)
+    if magic != _OFFSET_CACHE_MAGIC or size != stat.st_size \
+    or mtime != stat.st_mtime \
+    or _bytes_to_string(cache_format.rstrip(_as_bytes("\x00"))) != format \
+    or key_digest != _key_function_digest(key_function):
+        data.close()
+        return None
+    start = _OFFSET_CACHE_HEADER.size
+    ends = _PackedInt64s(data, start, count)
+    offsets = _PackedInt64s(data, start + 8 * count, count)
+    lengths = _PackedInt64s(data, start + 16 * count, count)
+    return _SortedOffsets(data, ends, offsets, lengths, start + 24 * count)
+
+
+##############################################################################
+
+class _MemoryMappedFile(mmap.mmap):
+    """Read only memory map of a file, used like a file handle (PRIVATE).
+
+    The mmap object already offers the seek, tell, read, readline and
+    close methods used by the random access proxies, so it can be used
+    in place of a normal handle. Reading from it avoids a system call
+    per record, and as the map is backed by the operating system's page
+    cache, it is shared between all the processes which have the same
+    file mapped. This subclass just adds the name attribute.
+    """
+    pass
+
+def _open_for_random_access(filename, use_mmap=False):
+    """Open a file for random access in binary mode (PRIVATE).
+
+    If use_mmap is True, returns a read only memory map of the file (except
+    for empty files, which cannot be mapped), otherwise a normal handle.
+
+    BGZF compressed files are detected automatically, and returned wrapped
+    in a bgzf.BgzfReader (so offsets are BGZF virtual offsets). Any other
+    GZIP compressed file is rejected with a ValueError, as random access
+    is not possible.
+    """
+    handle = open(filename, "rb")
+    magic = handle.read(4)
+    handle.seek(0)
+    if use_mmap and os.fstat(handle.fileno()).st_size:
+        try:
+            mapped = _MemoryMappedFile(handle.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+        finally:
+            #The memory map keeps its own (duplicated) file descriptor
+            handle.close()
+        mapped.name = filename
+        handle = mapped
+    if magic[:2] == _as_bytes("\x1f\x8b"):
+        if magic != bgzf._bgzf_magic:
+            handle.close()
+            raise ValueError("Only BGZF compressed files can be indexed, "
+                             "not plain GZIP files like %s" % filename)
+        handle = bgzf.BgzfReader(fileobj=handle, mode="rb")
+    return handle
+
+
 class SeqFileRandomAccess(object):
-    def __init__(self, filename, format, alphabet):
-        self._handle = open(filename, "rb")
+    """Base class for random access to records in a sequence file (PRIVATE).
+
+    If use_mmap is True, the file is accessed via a read only memory map
+    rather than a normal file handle. This means get_raw (and therefore
+    get) reads each record straight out of the mapped buffer, without a
+    system call per record, and with the memory pages shared with any other
+    process which has mapped the same file.
+    """
+    def __init__(self, filename, format, alphabet, use_mmap=False):
+        self._handle = _open_for_random_access(filename, use_mmap)
         self._alphabet = alphabet
         self._format = format
         #Load the parser class/function once an avoid the dict lookup in each
@@ -525,13 +1280,86 @@ class SeqFileRandomAccess(object):
     def get(self, offset):
         """Returns SeqRecord."""
         #Should be overriden for binary file formats etc:
-        return self._parse(StringIO(_bytes_to_string(self.get_raw(offset))))
+        return self._parse_raw(self.get_raw(offset))
 
     def get_raw(self, offset):
         """Returns bytes string (if implemented for this file format)."""
         #Should be done by each sub-class (if possible)
         raise NotImplementedError("Not available for this file format.")
 
+    def _parse_raw(self, raw):
+        """Returns SeqRecord parsed from a bytes string from get_raw (PRIVATE)."""
+        return self._parse(StringIO(_bytes_to_string(raw)))
+
+    def _read_many(self, entries):
+        """Yields (offset, raw) for (offset, length) tuples (PRIVATE).
+
+        The entries should be sorted by offset. Where the record length is
+        known, nearby records are read from the file together with a single
+        read, otherwise raw is None.
+        """
+        handle = self._handle
+        if isinstance(handle, bgzf.BgzfReader):
+            #Can't do arithmetic on BGZF virtual offsets, read one by one
+            for offset, length in entries:
+                if length:
+                    handle.seek(offset)
+                    yield offset, handle.read(length)
+                else:
+                    yield offset, None
+            return
+        i = 0
+        while i < len(entries):
+            offset, length = entries[i]
+            if not length:
+                yield offset, None
+                i += 1
+                continue
+            #How many of the following records can be read at the same time?
+            end = offset + length
+            j = i + 1
+            while j < len(entries):
+                next_offset, next_length = entries[j]
+                if not next_length or next_offset - end > _MAX_READ_GAP \
+                or next_offset + next_length - offset > _MAX_READ_SPAN:
+                    break
+                end = max(end, next_offset + next_length)
+                j += 1
+            handle.seek(offset)
+            data = handle.read(end - offset)
+            for next_offset, next_length in entries[i:j]:
+                start = next_offset - offset
+                yield next_offset, data[start:start + next_length]
+            i = j
+
+    def get_many(self, entries):
+        """Returns list of SeqRecords for (offset, length) tuples.
+
+        The entries should be sorted by offset, and the length can be zero
+        if not known.
+        """
+        records = []
+        for offset, raw in self._read_many(entries):
+            if raw is None:
+                records.append(self.get(offset))
+            else:
+                records.append(self._parse_raw(raw))
+        return records
+
+    def get_raw_many(self, entries):
+        """Returns list of bytes strings for (offset, length) tuples.
+
+        The entries should be sorted by offset, and the length can be zero
+        if not known.
+        """
+        raws = []
+        for offset, raw in self._read_many(entries):
+            if raw is None:
+                raws.append(self.get_raw(offset))
+            else:
+                raws.append(raw)
+        return raws
+
 
 
 
@@ -546,16 +1374,20 @@ class SeqFileRandomAccess(object):
 
 class SffRandomAccess(SeqFileRandomAccess):
     """Random access to a Standard Flowgram Format (SFF) file."""
-    def __init__(self, filename, format, alphabet):
-        SeqFileRandomAccess.__init__(self, filename, format, alphabet)
+    def __init__(self, filename, format, alphabet, use_mmap=False):
+        SeqFileRandomAccess.__init__(self, filename, format, alphabet,
+                                     use_mmap)
+        if isinstance(self._handle, bgzf.BgzfReader):
+            self._handle.close()
+            raise ValueError("SFF files cannot be indexed if BGZF compressed")
+        if self._alphabet is None:
+            self._alphabet = Alphabet.generic_dna
         header_length, index_offset, index_length, number_of_reads, \
         self._flows_per_read, self._flow_chars, self._key_sequence \
             = SeqIO.SffIO._sff_file_header(self._handle)
 
     def __iter__(self):
         """Load any index block in the file, or build it the slow way (PRIVATE)."""
-        if self._alphabet is None:
-            self._alphabet = Alphabet.generic_dna
         handle = self._handle
         handle.seek(0)
         #Alread did this in __init__ but need handle in right place
@@ -620,12 +1452,15 @@ class SffTrimedRandomAccess(SffRandomAccess) :
 ###################
 
 class SequentialSeqFileRandomAccess(SeqFileRandomAccess):
-    def __init__(self, filename, format, alphabet):
-        SeqFileRandomAccess.__init__(self, filename, format, alphabet)
+    def __init__(self, filename, format, alphabet, use_mmap=False):
+        SeqFileRandomAccess.__init__(self, filename, format, alphabet,
+                                     use_mmap)
         marker = {"ace" : "CO ",
                   "embl" : "ID ",
+                  "embl-lazy" : "ID ",
                   "fasta" : ">",
                   "genbank" : "LOCUS ",
+                  "genbank-lazy" : "LOCUS ",
                   "gb": "LOCUS ",
                   "imgt" : "ID ",
                   "phd" : "BEGIN_SEQUENCE",
@@ -655,13 +1490,17 @@ class SequentialSeqFileRandomAccess(SeqFileRandomAccess):
             #Here we can assume the record.id is the first word after the
             #marker. This is generally fine... but not for GenBank, EMBL, Swiss
             id = line[marker_offset:].strip().split(None, 1)[0]
+            #Add up the line lengths rather than subtracting offsets,
+            #as these may be BGZF virtual offsets
+            length = len(line)
             while True:
+                end_offset = handle.tell()
                 line = handle.readline()
                 if marker_re.match(line) or not line:
-                    end_offset = handle.tell() - len(line)
-                    yield _bytes_to_string(id), start_offset, end_offset - start_offset
+                    yield _bytes_to_string(id), start_offset, length
                     start_offset = end_offset
                     break
+                length += len(line)
         assert not line, repr(line)
 
     def get_raw(self, offset):
@@ -704,16 +1543,18 @@ class GenBankRandomAccess(SequentialSeqFileRandomAccess):
             #We cannot assume the record.id is the first word after LOCUS,
             #normally the first entry on the VERSION or ACCESSION line is used.
             key = None
+            length = len(line)
             while True:
+                end_offset = handle.tell()
                 line = handle.readline()
                 if marker_re.match(line) or not line:
                     if not key:
                         raise ValueError("Did not find ACCESSION/VERSION lines")
-                    end_offset = handle.tell() - len(line)
-                    yield _bytes_to_string(key), start_offset, end_offset - start_offset
+                    yield _bytes_to_string(key), start_offset, length
                     start_offset = end_offset
                     break
-                elif line.startswith(accession_marker):
+                length += len(line)
+                if line.startswith(accession_marker):
                     key = line.rstrip().split()[1]
                 elif line.startswith(version_marker):
                     version_id = line.rstrip().split()[1]
@@ -755,14 +1596,16 @@ class EmblRandomAccess(SequentialSeqFileRandomAccess):
                 key = line[3:].strip().split(None,1)[0]
             else:
                 raise ValueError('Did not recognise the ID line layout:\n' + line)
+            length = len(line)
             while True:
+                end_offset = handle.tell()
                 line = handle.readline()
                 if marker_re.match(line) or not line:
-                    end_offset = handle.tell() - len(line)
-                    yield _bytes_to_string(key), start_offset, end_offset - start_offset
+                    yield _bytes_to_string(key), start_offset, length
                     start_offset = end_offset
                     break
-                elif line.startswith(sv_marker):
+                length += len(line)
+                if line.startswith(sv_marker):
                     key = line.rstrip().split()[1]
         assert not line, repr(line)
 
@@ -784,16 +1627,19 @@ class SwissRandomAccess(SequentialSeqFileRandomAccess):
         while marker_re.match(line):
             #We cannot assume the record.id is the first word after ID,
             #normally the following AC line is used.
+            length = len(line)
             line = handle.readline()
+            length += len(line)
             assert line.startswith(_as_bytes("AC "))
             key = line[3:].strip().split(semi_char)[0].strip()
             while True:
+                end_offset = handle.tell()
                 line = handle.readline()
                 if marker_re.match(line) or not line:
-                    end_offset = handle.tell() - len(line)
-                    yield _bytes_to_string(key), start_offset, end_offset - start_offset
+                    yield _bytes_to_string(key), start_offset, length
                     start_offset = end_offset
                     break
+                length += len(line)
         assert not line, repr(line)
 
 
@@ -818,23 +1664,23 @@ class UniprotRandomAccess(SequentialSeqFileRandomAccess):
             #(possibly with leading spaces)
             #but allow it to be later on within the <entry>
             key = None
-            done = False
+            length = len(line)
             while True:
                 line = handle.readline()
                 if key is None and start_acc_marker in line:
                     assert end_acc_marker in line, line
                     key = line[line.find(start_acc_marker)+11:].split(_as_bytes("<"))[0]
                 elif end_entry_marker in line:
-                    end_offset = handle.tell() - len(line) \
-                               + line.find(end_entry_marker) + 8
+                    length += line.find(end_entry_marker) + 8
                     break
                 elif marker_re.match(line) or not line:
                     #Start of next record or end of file
                     raise ValueError("Didn't find end of record")
+                length += len(line)
             if not key:
-                raise ValueError("Did not find <accession> line in bytes %i to %i" \
-                                 % (start_offset, end_offset))
-            yield _bytes_to_string(key), start_offset, end_offset - start_offset
+                raise ValueError("Did not find <accession> line in record "
+                                 "starting at offset %i" % start_offset)
+            yield _bytes_to_string(key), start_offset, length
             #Find start of next record
             while not marker_re.match(line) and line:
                 start_offset = handle.tell()
@@ -861,6 +1707,9 @@ class UniprotRandomAccess(SequentialSeqFileRandomAccess):
         return _as_bytes("").join(data)
 
     def get(self, offset) :
+        return self._parse_raw(self.get_raw(offset))
+
+    def _parse_raw(self, raw):
         #TODO - Can we handle this directly in the parser?
         #This is a hack - use get_raw for <entry>...</entry> and wrap it with
         #the apparently required XML header and footer.
@@ -871,15 +1720,16 @@ class UniprotRandomAccess(SequentialSeqFileRandomAccess):
         http://www.uniprot.org/support/docs/uniprot.xsd">
         %s
         </uniprot>
-        """ % _bytes_to_string(self.get_raw(offset))
+        """ % _bytes_to_string(raw)
         #TODO - For consistency, this function should not accept a string:
         return SeqIO.UniprotIO.UniprotIterator(data).next()
 
 
 class IntelliGeneticsRandomAccess(SeqFileRandomAccess):
     """Random access to a IntelliGenetics file."""
-    def __init__(self, filename, format, alphabet):
-        SeqFileRandomAccess.__init__(self, filename, format, alphabet)
+    def __init__(self, filename, format, alphabet, use_mmap=False):
+        SeqFileRandomAccess.__init__(self, filename, format, alphabet,
+                                     use_mmap)
         self._marker_re = re.compile(_as_bytes("^;"))
 
     def __iter__(self):
@@ -941,7 +1791,7 @@ class TabRandomAccess(SeqFileRandomAccess):
                     raise err
             else:
                 end_offset = handle.tell()
-                yield _bytes_to_string(key), start_offset, end_offset - start_offset
+                yield _bytes_to_string(key), start_offset, len(line)
                 start_offset = end_offset
 
     def get_raw(self, offset):
@@ -978,10 +1828,14 @@ class FastqRandomAccess(SeqFileRandomAccess):
             #assert line[0]=="@"
             #This record seems OK (so far)
             id = line[1:].rstrip().split(None, 1)[0]
+            #Add up the line lengths rather than subtracting offsets,
+            #as these may be BGZF virtual offsets
+            length = len(line)
             #Find the seq line(s)
             seq_len = 0
             while line:
                 line = handle.readline()
+                length += len(line)
                 if line.startswith(plus_char) : break
                 seq_len += len(line.strip())
             if not line:
@@ -992,17 +1846,18 @@ class FastqRandomAccess(SeqFileRandomAccess):
             while line:
                 if seq_len == qual_len:
                     #Should be end of record...
+                    end_offset = handle.tell()
                     line = handle.readline()
                     if line and line[0:1] != at_char:
                         ValueError("Problem with line %s" % repr(line))
                     break
                 else:
                     line = handle.readline()
+                    length += len(line)
                     qual_len += len(line.strip())
             if seq_len != qual_len:
                 raise ValueError("Problem with quality section")
-            end_offset = handle.tell() - len(line)
-            yield _bytes_to_string(id), start_offset, end_offset - start_offset
+            yield _bytes_to_string(id), start_offset, length
             start_offset = end_offset
         #print "EOF"
 
@@ -1051,6 +1906,7 @@ class FastqRandomAccess(SeqFileRandomAccess):
 
 _FormatToRandomAccess = {"ace" : SequentialSeqFileRandomAccess,
                         "embl" : EmblRandomAccess,
+                        "embl-lazy" : EmblRandomAccess,
                         "fasta" : SequentialSeqFileRandomAccess,
                         "fastq" : FastqRandomAccess, #Class handles all three variants
                         "fastq-sanger" : FastqRandomAccess, #alias of the above
@@ -1058,6 +1914,7 @@ _FormatToRandomAccess = {"ace" : SequentialSeqFileRandomAccess,
                         "fastq-illumina" : FastqRandomAccess,
                         "genbank" : GenBankRandomAccess,
                         "gb" : GenBankRandomAccess, #alias of the above
+                        "genbank-lazy" : GenBankRandomAccess,
                         "ig" : IntelliGeneticsRandomAccess,
                         "imgt" : EmblRandomAccess,
                         "phd" : SequentialSeqFileRandomAccess,
@@ -835,7 +835,13 @@ class SeqRecord(object):
         #Can append matching per-letter-annotation
         for k,v in self.letter_annotations.iteritems():
             if k in other.letter_annotations:
-                answer.letter_annotations[k] = v + other.letter_annotations[k]
+                v2 = other.letter_annotations[k]
+                if hasattr(v, "dtype") or hasattr(v2, "dtype"):
+                    #NumPy arrays (e.g. FASTQ qualities) would add element-wise
+                    import numpy
+                    answer.letter_annotations[k] = numpy.concatenate((v, v2))
+                else:
+                    answer.letter_annotations[k] = v + v2
         return answer
         
     def __radd__(self, other):
@@ -0,0 +1,462 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Counting k-mers in nucleotide sequences (requires NumPy).
+
+Each k-mer of up to 31 letters is encoded as an integer using two bits per
+base (A=0, C=1, G=2, T=3), so the k-mers of a sequence can be found with a
+few array operations rather than by slicing out each one as a string.  The
+counts are held as a sorted NumPy array of these codes, plus an array of
+the number of times each was seen:
+
+>>> from Bio.SeqUtils.Kmers import KmerCounts
+>>> counts = KmerCounts(3)
+>>> counts.add("ACGTACGTNACG")
+>>> len(counts), counts.total()
+(4, 7)
+>>> counts["ACG"], counts["TTT"]
+(3, 0)
+>>> for kmer, count in counts.items():
+...     print kmer, count
+ACG 3
+CGT 2
+GTA 1
+TAC 1
+
+Letters are counted regardless of case, and any k-mer including another
+letter (such as N) is ignored.  With canonical=True a k-mer and its reverse
+complement are counted together (under whichever comes first in sorted
+order), so that the counts do not depend on the strand sequenced:
+
+>>> counts = KmerCounts(3, canonical=True)
+>>> counts.add("ACGTACGTNACG")
+>>> counts.items()
+[('ACG', 5), ('GTA', 2)]
+
+For counting the k-mers in (large) sequence files, use the count_kmers
+function, which can share out the work to several processes.  The counts
+can be saved to a file with the dump method, and read back with the load
+function.
+"""
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError("Please install NumPy if you want to "
+                                       "use Bio.SeqUtils.Kmers")
+
+from Bio._py3k import _as_bytes, _as_string
+
+MAX_K = 31
+
+#Two bit codes of each letter, with 4 for anything ambiguous
+_CODES = numpy.empty(256, numpy.uint8)
+_CODES.fill(4)
+for _i, _letter in enumerate("ACGT"):
+    _CODES[ord(_letter)] = _i
+    _CODES[ord(_letter.lower())] = _i
+del _i, _letter
+_LETTERS = numpy.frombuffer(_as_bytes("ACGT"), numpy.uint8)
+
+#Default number of letters to collect before counting their k-mers
+_BATCH_SIZE = 1 << 22
+
+
+def encode_kmer(kmer):
+    """Returns the integer code for a k-mer (as a string).
+
+    >>> encode_kmer("ACGT")
+    27
+    """
+    if not 1 <= len(kmer) <= MAX_K:
+        raise ValueError("k-mers must be between 1 and %i letters" % MAX_K)
+    code = 0
+    for value in _CODES[numpy.frombuffer(_as_bytes(str(kmer)), numpy.uint8)]:
+        if value > 3:
+            raise ValueError("k-mer %r is not unambiguous DNA" % kmer)
+        code = code * 4 + int(value)
+    return code
+
+
+def decode_kmer(code, k):
+    """Returns the k-mer (as a string) for an integer code.
+
+    >>> decode_kmer(27, 4)
+    'ACGT'
+    """
+    return _as_string(_tobytes(_decode_codes(numpy.array([code],
+                                                         numpy.uint64), k)))
+
+
+def _tobytes(array):
+    """Returns the data of a NumPy array as bytes (PRIVATE)."""
+    try:
+        return array.tobytes()
+    except AttributeError:
+        #NumPy older than 1.9
+        return array.tostring()
+
+
+def _decode_codes(codes, k):
+    """Returns a 2D array of letters (bytes) for an array of codes (PRIVATE)."""
+    letters = numpy.empty((len(codes), k), numpy.uint8)
+    codes = codes.astype(numpy.uint64)
+    for i in range(k - 1, -1, -1):
+        letters[:, i] = _LETTERS[(codes & numpy.uint64(3)).astype(numpy.intp)]
+        codes = codes >> numpy.uint64(2)
+    return letters
+
+
+def _reverse_complement_codes(codes, k):
+    """Returns the codes for the reverse complement of each k-mer (PRIVATE)."""
+    rc = numpy.zeros(len(codes), numpy.uint64)
+    codes = codes.astype(numpy.uint64)
+    for i in range(k):
+        rc = (rc << numpy.uint64(2)) | (numpy.uint64(3) - (codes & numpy.uint64(3)))
+        codes = codes >> numpy.uint64(2)
+    return rc
+
+
+def _kmer_codes(sequence, k, canonical):
+    """Returns an array of the codes of the unambiguous k-mers (PRIVATE).
+
+    The k-mer codes are updated one letter at a time along the sequence
+    (shifting in two bits for each letter), but for all the k-mers at once.
+    """
+    letters = _CODES[numpy.frombuffer(_as_bytes(sequence), numpy.uint8)]
+    n = len(letters) - k + 1
+    if n < 1:
+        return numpy.zeros(0, numpy.uint64)
+    codes = numpy.zeros(n, numpy.uint64)
+    two = numpy.uint64(2)
+    for i in range(k):
+        codes = (codes << two) | (letters[i:i + n] & 3)
+    if canonical:
+        rc = numpy.zeros(n, numpy.uint64)
+        for i in range(k):
+            rc |= (3 - (letters[i:i + n] & 3)).astype(numpy.uint64) \
+                  << numpy.uint64(2 * i)
+        codes = numpy.minimum(codes, rc)
+    #Drop any k-mers with ambiguous letters, using the running total of
+    #ambiguous letters to find the number in each k-mer.
+    ambiguous = numpy.zeros(len(letters) + 1, numpy.int64)
+    numpy.cumsum(letters > 3, out=ambiguous[1:])
+    return codes[ambiguous[k:] == ambiguous[:n]]
+
+
+def _unique_counts(codes, counts=None):
+    """Returns sorted unique codes, and the total count of each (PRIVATE).
+
+    If counts is None, each code counts once.
+    """
+    if counts is None:
+        codes = numpy.sort(codes)
+    else:
+        order = codes.argsort(kind="mergesort")
+        codes = codes[order]
+        counts = counts[order]
+    if not len(codes):
+        return codes, numpy.zeros(0, numpy.int64)
+    starts = numpy.concatenate(([0], numpy.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    if counts is None:
+        totals = numpy.diff(numpy.concatenate((starts, [len(codes)])))
+    else:
+        totals = numpy.add.reduceat(counts, starts)
+    return codes[starts], totals.astype(numpy.int64)
+
+
+def _split(sequence, k, size):
+    """Split a long sequence into pieces of about size letters (PRIVATE).
+
+    Neighbouring pieces overlap by k-1 letters, so that each k-mer is in
+    exactly one piece.
+    """
+    if len(sequence) <= size:
+        return [sequence]
+    return [sequence[start:start + size + k - 1]
+            for start in range(0, len(sequence) - k + 1, size)]
+
+
+def _count_batch(args):
+    """Count the k-mers in a list of sequences, for multiprocessing (PRIVATE)."""
+    sequences, k, canonical = args
+    #Joining with an N means no k-mers span two sequences
+    return _unique_counts(_kmer_codes("N".join(sequences), k, canonical))
+
+
+class KmerCounts(object):
+    """Counts of the k-mers in one or more nucleotide sequences.
+
+    Add sequences with the add method, or many at once with update.  The
+    counts are held as a list of tables of sorted unique k-mer codes with
+    their counts, which are merged together as they grow (so that adding
+    many sequences takes O(n log n) time).  The codes and counts can be
+    accessed as NumPy arrays via the codes and counts properties.
+    """
+
+    def __init__(self, k, canonical=False):
+        if not 1 <= k <= MAX_K:
+            raise ValueError("k should be between 1 and %i" % MAX_K)
+        self.k = k
+        self.canonical = bool(canonical)
+        self._tables = []
+        #Sequences not yet counted, and their total length
+        self._pending = []
+        self._pending_size = 0
+
+    def __repr__(self):
+        return "%s(%i, canonical=%r) with %i k-mers" \
+               % (self.__class__.__name__, self.k, self.canonical, len(self))
+
+    def add(self, sequence):
+        """Add the k-mers in a sequence (a string or Seq object)."""
+        for piece in _split(str(sequence), self.k, _BATCH_SIZE):
+            self._pending.append(piece)
+            self._pending_size += len(piece)
+            if self._pending_size >= _BATCH_SIZE:
+                self._flush()
+
+    def update(self, sequences):
+        """Add the k-mers in each of the sequences (or SeqRecord objects)."""
+        for sequence in sequences:
+            if hasattr(sequence, "seq"):
+                #A SeqRecord
+                sequence = sequence.seq
+            self.add(sequence)
+
+    def _flush(self):
+        if self._pending:
+            table = _count_batch((self._pending, self.k, self.canonical))
+            self._pending = []
+            self._pending_size = 0
+            self._add_table(*table)
+
+    def _add_table(self, codes, counts):
+        """Add a sorted table of unique codes and counts (PRIVATE)."""
+        tables = self._tables
+        tables.append((codes, counts))
+        #Merge tables of similar size, like adding one in binary
+        while len(tables) > 1 and len(tables[-2][0]) <= 2 * len(tables[-1][0]):
+            (codes1, counts1), (codes2, counts2) = tables[-2:]
+            tables[-2:] = [_unique_counts(numpy.concatenate((codes1, codes2)),
+                                          numpy.concatenate((counts1, counts2)))]
+
+    def _table(self):
+        """Merge everything into a single table, and return it (PRIVATE)."""
+        self._flush()
+        tables = self._tables
+        if not tables:
+            tables.append((numpy.zeros(0, numpy.uint64),
+                           numpy.zeros(0, numpy.int64)))
+        elif len(tables) > 1:
+            codes = numpy.concatenate([table[0] for table in tables])
+            counts = numpy.concatenate([table[1] for table in tables])
+            tables[:] = [_unique_counts(codes, counts)]
+        return tables[0]
+
+    @property
+    def codes(self):
+        """Sorted NumPy array of the (unsigned integer) codes of the k-mers."""
+        return self._table()[0]
+
+    @property
+    def counts(self):
+        """NumPy array of the count of each k-mer (in the same order as codes)."""
+        return self._table()[1]
+
+    def merge(self, other):
+        """Add the counts from another KmerCounts object (for the same k)."""
+        if other.k != self.k or other.canonical != self.canonical:
+            raise ValueError("Can only merge counts for the same k-mers")
+        self._add_table(*other._table())
+
+    def __len__(self):
+        """Returns the number of different k-mers."""
+        return len(self.codes)
+
+    def total(self):
+        """Returns the total number of k-mers counted."""
+        return int(self.counts.sum())
+
+    def _code(self, kmer):
+        if len(kmer) != self.k:
+            raise ValueError("Expected a k-mer of length %i, not %r"
+                             % (self.k, kmer))
+        code = numpy.uint64(encode_kmer(kmer))
+        if self.canonical:
+            code = min(code, _reverse_complement_codes(
+                numpy.array([code], numpy.uint64), self.k)[0])
+        return code
+
+    def __getitem__(self, kmer):
+        """Returns the count for a k-mer (string), zero if not seen."""
+        code = self._code(kmer)
+        codes, counts = self._table()
+        i = codes.searchsorted(code)
+        if i < len(codes) and codes[i] == code:
+            return int(counts[i])
+        return 0
+
+    def __contains__(self, kmer):
+        return self[kmer] > 0
+
+    def items(self):
+        """Returns a list of (k-mer, count) tuples, sorted by k-mer."""
+        codes, counts = self._table()
+        kmers = _decode_codes(codes, self.k).view("S%i" % self.k).ravel()
+        return zip([_as_string(kmer) for kmer in kmers], counts.tolist())
+
+    def most_common(self, n):
+        """Returns a list of the n most common (k-mer, count) tuples.
+
+        k-mers with the same count are in sorted order.
+        """
+        codes, counts = self._table()
+        order = (-counts).argsort(kind="mergesort")[:n]
+        kmers = _decode_codes(codes[order], self.k).view("S%i" % self.k).ravel()
+        return zip([_as_string(kmer) for kmer in kmers],
+                   counts[order].tolist())
+
+    def dump(self, handle):
+        """Save the counts to a binary file handle (read back with load)."""
+        codes, counts = self._table()
+        handle.write(_as_bytes("KMERS %i %i %i\n"
+                               % (self.k, self.canonical, len(codes))))
+        handle.write(_tobytes(codes.astype("<u8")))
+        handle.write(_tobytes(counts.astype("<i8")))
+
+
+def load(handle):
+    """Returns a KmerCounts object read from a binary file handle.
+
+    The file should have been written with the dump method.
+    """
+    header = _as_string(handle.readline()).split()
+    if len(header) != 4 or header[0] != "KMERS":
+        raise ValueError("Not a k-mer counts file")
+    k, canonical, n = [int(value) for value in header[1:]]
+    kmers = KmerCounts(k, canonical)
+    data = handle.read(16 * n)
+    if len(data) != 16 * n:
+        raise ValueError("Truncated k-mer counts file")
+    codes = numpy.frombuffer(data, "<u8", n)
+    counts = numpy.frombuffer(data, "<i8", n, 8 * n)
+    kmers._tables.append((codes.astype(numpy.uint64),
+                          counts.astype(numpy.int64)))
+    return kmers
+
+
+def _sequence_batches(sequences, k, batch_size):
+    """Group the sequences into lists of about batch_size letters (PRIVATE)."""
+    batch = []
+    size = 0
+    for sequence in sequences:
+        for piece in _split(sequence, k, batch_size):
+            batch.append(piece)
+            size += len(piece)
+            if size >= batch_size:
+                yield batch
+                batch = []
+                size = 0
+    if batch:
+        yield batch
+
+
+def _sequences(source, format):
+    """Iterate over the sequences as strings (PRIVATE)."""
+    if format is None:
+        for sequence in source:
+            if hasattr(sequence, "seq"):
+                #A SeqRecord
+                sequence = sequence.seq
+            yield str(sequence)
+    elif format.startswith("fastq"):
+        #Much faster than making SeqRecord objects with the qualities
+        from Bio.SeqIO.QualityIO import FastqGeneralIterator
+        if isinstance(source, basestring):
+            source = open(source, "rU")
+        for title, sequence, quality in FastqGeneralIterator(source):
+            yield sequence
+    else:
+        from Bio import SeqIO
+        for record in SeqIO.parse(source, format):
+            yield str(record.seq)
+
+
+def count_kmers(source, k, format=None, canonical=False, workers=1,
+                batch_size=_BATCH_SIZE):
+    """Count the k-mers in many sequences, returns a KmerCounts object.
+
+    source - A filename or handle for a sequence file (which needs the
+             format argument), or an iterable of sequences (strings or
+             Seq objects) or SeqRecord objects.
+    k - The length of the k-mers (up to 31).
+    format - A file format name, as used in Bio.SeqIO.  For FASTQ files
+             just the sequences are parsed (not the qualities).
+    canonical - Count each k-mer together with its reverse complement.
+    workers - Number of worker processes (default 1, no pool).  The
+              sequences are sent to the workers in batches, and the
+              partial counts are merged together.
+    batch_size - Approximate number of letters to count at once.
+
+    >>> counts = count_kmers("Quality/example.fastq", 5, "fastq")
+    >>> counts.most_common(3)
+    [('GGGGG', 3), ('AGGCC', 2), ('CTTCT', 2)]
+    """
+    if workers < 1:
+        raise ValueError("Number of workers must be at least one")
+    kmers = KmerCounts(k, canonical)
+    batches = _sequence_batches(_sequences(source, format), k, batch_size)
+    if workers == 1:
+        for batch in batches:
+            kmers._add_table(*_count_batch((batch, k, canonical)))
+        return kmers
+    try:
+        import multiprocessing
+    except ImportError:
+        #Python 2.5
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Requires multiprocessing, "
+                                           "which is included Python 2.6+")
+    from collections import deque
+    pending = deque()
+    pool = multiprocessing.Pool(workers)
+    try:
+        for batch in batches:
+            if len(pending) >= 2 * workers:
+                kmers._add_table(*pending.popleft().get())
+            pending.append(pool.apply_async(_count_batch,
+                                            [(batch, k, canonical)]))
+        while pending:
+            kmers._add_table(*pending.popleft().get())
+    finally:
+        pool.terminate()
+    return kmers
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import os
+    import doctest
+    if os.path.isdir(os.path.join("..", "..", "Tests")):
+        print "Running doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("..", "..", "Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+    elif os.path.isdir(os.path.join("Tests")):
+        print "Running doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,278 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Find open reading frames (ORFs) in nucleotide sequences.
+
+The main function is find_orfs, which looks for ORFs on both strands of
+a single (possibly circular) sequence, for example:
+
+>>> from Bio.SeqUtils.ORF import find_orfs
+>>> seq = "CCATGAAACCCTAGGGCTATTTCATGG"
+>>> for start, end, strand in find_orfs(seq, min_length=9):
+...     print start, end, strand
+2 14 1
+16 25 -1
+
+Each ORF is given as a tuple of the start and end in the usual Python
+slicing style (counting from zero, so seq[start:end] is the ORF including
+the stop codon) and the strand (+1 or -1).
+
+>>> print seq[2:14]
+ATGAAACCCTAG
+>>> from Bio.Seq import reverse_complement
+>>> print reverse_complement(seq[16:25])
+ATGAAATAG
+
+The start and stop codons are taken from the chosen genetic code (NCBI
+table 1 by default), and all six frames are scanned in a single pass over
+the sequence. There is also a function find_orfs_in_records for finding
+the ORFs in many sequences (e.g. from a multi-FASTA file read with
+Bio.SeqIO), which can use several worker processes.
+"""
+
+import re
+from collections import deque
+
+from Bio.Data import CodonTable
+from Bio.Seq import reverse_complement
+
+#Bit flags for what a codon means:
+_FORWARD_START = 1
+_FORWARD_STOP = 2
+_REVERSE_START = 4
+_REVERSE_STOP = 8
+
+
+def _get_table(table):
+    """Returns an unambiguous DNA CodonTable object (PRIVATE).
+
+    The table can be an NCBI identifier (integer), name (string) or
+    CodonTable object.
+    """
+    if isinstance(table, CodonTable.CodonTable):
+        return table
+    try:
+        return CodonTable.unambiguous_dna_by_id[int(table)]
+    except ValueError:
+        return CodonTable.unambiguous_dna_by_name[table]
+
+
+def _codon_flags(table, start_codons=None):
+    """Returns a dictionary mapping codons to bit flags (PRIVATE).
+
+    Each start and stop codon (and their reverse complements) are given
+    bit flags for what they mean on each strand.
+    """
+    if start_codons is None:
+        start_codons = table.start_codons
+    flags = {}
+    for codons, forward, reverse in [(start_codons, _FORWARD_START,
+                                      _REVERSE_START),
+                                     (table.stop_codons, _FORWARD_STOP,
+                                      _REVERSE_STOP)]:
+        for codon in codons:
+            codon = codon.upper().replace("U", "T")
+            flags[codon] = flags.get(codon, 0) | forward
+            codon = reverse_complement(codon)
+            flags[codon] = flags.get(codon, 0) | reverse
+    return flags
+
+
+def _add_reverse_orf(orfs, stop, start, min_length, circular, length):
+    """Add a reverse strand ORF to the list, if long enough (PRIVATE).
+
+    The stop and start are the positions of the ORF's stop codon and (last)
+    start codon on the forward strand, either may be None.
+    """
+    if stop is None or start is None:
+        return
+    end = start + 3
+    if end - stop >= min_length \
+    and (not circular or (stop < length and end - stop <= length)):
+        orfs.append((stop, end, -1))
+
+
+def find_orfs(sequence, table=1, min_length=75, circular=False,
+              start_codons=None):
+    """Find the open reading frames (ORFs) on both strands of a sequence.
+
+    Arguments:
+     - sequence     - The nucleotide sequence (string, Seq or MutableSeq).
+     - table        - Genetic code to use, an NCBI table identifier (default
+                      1, the standard code), table name or CodonTable object.
+     - min_length   - Minimum length of the ORFs to return in nucleotides,
+                      including the stop codon (default 75, meaning at least
+                      24 amino acids).
+     - circular     - Boolean, is the sequence circular (e.g. a plasmid or
+                      a bacterial chromosome)? If so, ORFs can span the
+                      origin.
+     - start_codons - Optional list of start codons to use instead of the
+                      table's start codons (e.g. just ["ATG"]).
+
+    Yields tuples of (start, end, strand) where the start and end are in
+    Python counting, so for the forward strand sequence[start:end] is the
+    ORF (starting with a start codon and ending with the stop codon). For
+    the reverse strand this is the reverse complement of the ORF. Each ORF
+    runs from the first start codon after the previous stop codon in the
+    same frame. Partial ORFs at the ends of a linear sequence (without a
+    start or stop codon) are ignored. The forward strand ORFs are given
+    first (sorted by their end), then the reverse strand (sorted by their
+    start).
+
+    Both strands are scanned in a single pass, keeping track of just the
+    last few start and stop codons in each frame, but the reverse strand
+    ORFs found are held in a list until the end of the sequence in order
+    to sort them. The sequence itself is also held in memory (twice over
+    for a circular sequence), so this is not suited to streaming a whole
+    chromosome in pieces.
+
+    For a circular sequence, an ORF spanning the origin will have an end
+    larger than the length of the sequence:
+
+    >>> seq = "AAACCCTAGGGCTACTTGGATGAAA"
+    >>> list(find_orfs(seq, min_length=6))
+    []
+    >>> list(find_orfs(seq, min_length=6, circular=True))
+    [(19, 34, 1)]
+
+    Note that only unambiguous codons (using A, C, G and T or U in either
+    case) are used as start or stop codons, anything else (e.g. N) counts
+    as part of an ORF.
+    """
+    table = _get_table(table)
+    flags = _codon_flags(table, start_codons)
+    pattern = re.compile("(?=(%s))" % "|".join(sorted(flags)))
+    seq = str(sequence).upper().replace("U", "T")
+    length = len(seq)
+    if circular:
+        #Scan two copies, so each ORF has a whole genome of context
+        seq += seq
+    #For the forward strand, track the first start codon in each frame:
+    open_starts = [None, None, None]
+    #The reverse strand is read backwards, so an ORF there runs from a stop
+    #codon up to the last start codon before the next stop codon. Track the
+    #last stop codon in each frame, and the last start codon since then:
+    reverse_stops = [None, None, None]
+    reverse_starts = [None, None, None]
+    reverse_orfs = []
+    for match in pattern.finditer(seq):
+        pos = match.start()
+        frame = pos % 3
+        codon_flags = flags[match.group(1)]
+        if codon_flags & _FORWARD_STOP:
+            start = open_starts[frame]
+            if start is not None:
+                open_starts[frame] = None
+                end = pos + 3
+                if end - start < min_length:
+                    pass
+                elif not circular:
+                    yield (start, end, 1)
+                elif length < end <= 2 * length and end - start <= length:
+                    if start >= length:
+                        #Entirely within the second copy
+                        yield (start - length, end - length, 1)
+                    else:
+                        yield (start, end, 1)
+        elif codon_flags & _FORWARD_START and open_starts[frame] is None:
+            open_starts[frame] = pos
+        if codon_flags & _REVERSE_STOP:
+            _add_reverse_orf(reverse_orfs, reverse_stops[frame],
+                             reverse_starts[frame], min_length, circular,
+                             length)
+            reverse_stops[frame] = pos
+            reverse_starts[frame] = None
+        elif codon_flags & _REVERSE_START \
+        and reverse_stops[frame] is not None:
+            reverse_starts[frame] = pos
+    for frame in range(3):
+        _add_reverse_orf(reverse_orfs, reverse_stops[frame],
+                         reverse_starts[frame], min_length, circular, length)
+    reverse_orfs.sort()
+    for orf in reverse_orfs:
+        yield orf
+
+
+def _find_orfs_list(args):
+    """Returns a list of ORFs, for use with multiprocessing (PRIVATE)."""
+    return list(find_orfs(*args))
+
+
+def find_orfs_in_records(records, table=1, min_length=75, circular=False,
+                         start_codons=None, workers=1):
+    """Find the ORFs in each of many SeqRecord objects.
+
+    Takes an iterator of SeqRecord objects (e.g. from Bio.SeqIO.parse) and
+    the same arguments as find_orfs, and yields tuples of each SeqRecord
+    and a list of its ORFs as (start, end, strand) tuples.
+
+    >>> from Bio import SeqIO
+    >>> records = SeqIO.parse("Fasta/f002", "fasta")
+    >>> for record, orfs in find_orfs_in_records(records, min_length=150,
+    ...                                          start_codons=["ATG"]):
+    ...     print record.id, orfs
+    gi|1348912|gb|G26680|G26680 [(51, 210, 1), (230, 587, -1)]
+    gi|1348917|gb|G26685|G26685 []
+    gi|1592936|gb|G29385|G29385 [(174, 330, 1), (209, 428, 1)]
+
+    With workers=2 or more, the sequences are sent to a pool of worker
+    processes (using the multiprocessing library in Python 2.6 or later),
+    with the results still returned in the original order.
+    """
+    if workers < 1:
+        raise ValueError("Number of workers must be at least one")
+    if workers == 1:
+        for record in records:
+            yield record, list(find_orfs(record.seq, table, min_length,
+                                         circular, start_codons))
+        return
+    try:
+        import multiprocessing
+    except ImportError:
+        #Python 2.5
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Requires multiprocessing, "
+                                           "which is included Python 2.6+")
+    pending = deque()
+    pool = multiprocessing.Pool(workers)
+    try:
+        for record in records:
+            if len(pending) >= 2 * workers:
+                #Wait for the oldest record, keeping the output in order
+                old_record, result = pending.popleft()
+                yield old_record, result.get()
+            result = pool.apply_async(_find_orfs_list,
+                                      [(str(record.seq), table, min_length,
+                                        circular, start_codons)])
+            pending.append((record, result))
+        while pending:
+            old_record, result = pending.popleft()
+            yield old_record, result.get()
+    finally:
+        pool.terminate()
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import os
+    import doctest
+    if os.path.isdir(os.path.join("..", "..", "Tests")):
+        print "Running doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("..", "..", "Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+    elif os.path.isdir(os.path.join("Tests")):
+        print "Running doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+
+if __name__ == "__main__":
+    _test()
@@ -15,6 +15,10 @@ print X.flexibility()
 print X.isoelectric_point()
 print X.secondary_structure_fraction()
 print X.protein_scale(ProtParamData.kd, 9, 0.4)
+
+To calculate these properties for many proteins at once, use the function
+protein_properties (which requires NumPy) rather than a ProteinAnalysis
+object for each protein.
 """
 
 import sys
@@ -23,8 +27,15 @@ from ProtParamData import kd  # Added by Iddo to enable the gravy method
 from Bio.Seq import Seq
 from Bio.Alphabet import IUPAC
 from Bio.Data import IUPACData
+from Bio._py3k import _as_bytes
 #from BioModule import 
 
+try:
+    import numpy
+except ImportError:
+    #Only needed for the protein_properties and protein_scales functions
+    numpy = None
+
 class ProteinAnalysis(object):
     """Class containing methods for protein analysis.
 
@@ -245,3 +256,260 @@ class ProteinAnalysis(object):
         Sheet = self.amino_acids_percent['E'] + self.amino_acids_percent['M'] + self.amino_acids_percent['A'] + self.amino_acids_percent['L']
         return Helix, Turn, Sheet
 
+
+#Properties which protein_properties can calculate, in the default order
+PROPERTIES = ("length", "molecular_weight", "aromaticity",
+              "instability_index", "gravy", "isoelectric_point",
+              "helix_fraction", "turn_fraction", "sheet_fraction")
+
+
+def _encode_proteins(sequences):
+    """Encode many proteins as one array of amino acid indexes (PRIVATE).
+
+    Returns the array of indexes (into IUPACData.protein_letters, with 20
+    for anything else), and an array of the sequence lengths.
+    """
+    if numpy is None:
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Please install NumPy to analyse "
+                                           "many proteins at once")
+    letters = IUPACData.protein_letters
+    table = numpy.empty(256, numpy.uint8)
+    table.fill(len(letters))
+    for i, letter in enumerate(letters):
+        table[ord(letter)] = i
+        table[ord(letter.lower())] = i
+    strings = []
+    for sequence in sequences:
+        if hasattr(sequence, "seq"):
+            #A SeqRecord
+            sequence = sequence.seq
+        strings.append(str(sequence))
+    lengths = numpy.array([len(string) for string in strings], numpy.intp)
+    codes = table[numpy.frombuffer(_as_bytes("".join(strings)), numpy.uint8)]
+    return codes, lengths
+
+
+def _scale_array(param_dict, missing=None):
+    """Returns an array of the scale value of each amino acid index (PRIVATE).
+
+    Letters missing from the scale get the given value (default NaN).
+    """
+    if missing is None:
+        missing = numpy.nan
+    return numpy.array([param_dict.get(letter, missing)
+                        for letter in IUPACData.protein_letters] + [missing])
+
+
+def _isoelectric_points(counts, nterm, cterm):
+    """Vectorised version of IsoelectricPoint.pi for many proteins (PRIVATE).
+
+    Follows exactly the same steps as IsoelectricPoint.pi, but evaluates
+    the charge of all the proteins still being bisected in one go.
+    """
+    letters = IUPACData.protein_letters
+    index = dict((letter, i) for i, letter in enumerate(letters))
+    n = len(counts)
+    pos_aas = [aa for aa in IsoelectricPoint.positive_pKs if aa != "Nterm"]
+    neg_aas = [aa for aa in IsoelectricPoint.negative_pKs if aa != "Cterm"]
+    pos_counts = counts[:, [index[aa] for aa in pos_aas]].astype(float)
+    neg_counts = counts[:, [index[aa] for aa in neg_aas]].astype(float)
+    pos_pKs = numpy.array([IsoelectricPoint.positive_pKs[aa] for aa in pos_aas])
+    neg_pKs = numpy.array([IsoelectricPoint.negative_pKs[aa] for aa in neg_aas])
+    #The terminal pKs depend on the terminal residues
+    nterm_pKs = _scale_array(IsoelectricPoint.pKnterminal,
+                             IsoelectricPoint.positive_pKs["Nterm"])[nterm]
+    cterm_pKs = _scale_array(IsoelectricPoint.pKcterminal,
+                             IsoelectricPoint.negative_pKs["Cterm"])[cterm]
+
+    def charge(pH, rows):
+        pH = pH[:, numpy.newaxis]
+        cr = 10 ** (pos_pKs - pH)
+        positive = (pos_counts[rows] * cr / (cr + 1.0)).sum(axis=1)
+        cr = 10 ** (nterm_pKs[rows] - pH[:, 0])
+        positive += cr / (cr + 1.0)
+        cr = 10 ** (pH - neg_pKs)
+        negative = (neg_counts[rows] * cr / (cr + 1.0)).sum(axis=1)
+        cr = 10 ** (pH[:, 0] - cterm_pKs[rows])
+        negative += cr / (cr + 1.0)
+        return positive - negative
+
+    all_rows = numpy.arange(n)
+    pH = numpy.empty(n)
+    pH.fill(7.0)
+    last = charge(pH, all_rows)
+    #Bracket the pI between pH1 and pH2, moving in steps of one
+    up = last > 0.0
+    pH1 = numpy.where(up, 7.0, numpy.nan)
+    pH2 = numpy.where(up, numpy.nan, 7.0)
+    rows = all_rows[up | (last < 0.0)]
+    while len(rows):
+        step = numpy.where(up[rows], 1.0, -1.0)
+        pH[rows] += step
+        last[rows] = charge(pH[rows], rows)
+        positive = last[rows] > 0.0
+        pH1[rows[positive]] = pH[rows[positive]]
+        pH2[rows[~positive]] = pH[rows[~positive]]
+        #Stop when the charge changes sign
+        rows = rows[numpy.where(up[rows], positive, last[rows] < 0.0)]
+    #Then bisect
+    rows = all_rows[(pH2 - pH1 > 0.0001) & (last != 0.0)]
+    while len(rows):
+        pH[rows] = (pH1[rows] + pH2[rows]) / 2.0
+        last[rows] = charge(pH[rows], rows)
+        positive = last[rows] > 0.0
+        pH1[rows[positive]] = pH[rows[positive]]
+        pH2[rows[~positive]] = pH[rows[~positive]]
+        rows = rows[(pH2[rows] - pH1[rows] > 0.0001) & (last[rows] != 0.0)]
+    return pH
+
+
+def protein_properties(sequences, properties=PROPERTIES):
+    """Calculate properties of many proteins at once (requires NumPy).
+
+    sequences - An iterable of protein sequences (strings, Seq objects,
+                or SeqRecord objects).
+    properties - Names of the properties wanted (default all of them):
+                 length, molecular_weight, aromaticity, instability_index,
+                 gravy, isoelectric_point, helix_fraction, turn_fraction,
+                 sheet_fraction, composition and flexibility.
+
+    Returns a dictionary of NumPy arrays with one entry per protein (a
+    column table), with the same values as the ProteinAnalysis methods.
+    The composition is a 2D array of the count of each amino acid (in the
+    order of IUPACData.protein_letters), and flexibility is a list with a
+    NumPy array for each protein.
+
+    The amino acid composition is counted once for all the proteins, and
+    reused for each property.  Proteins with non-standard amino acids get
+    NaN for the molecular weight, instability index, GRAVY and (for
+    windows including them) flexibility, rather than an exception.
+
+    >>> table = protein_properties(["MAEGEITTFTALTEK", "AKKRPW"],
+    ...                            ["length", "gravy", "isoelectric_point"])
+    >>> table["length"].tolist()
+    [15, 6]
+    >>> print ["%0.3f" % value for value in table["gravy"]]
+    ['-0.067', '-2.167']
+    >>> print ["%0.2f" % value for value in table["isoelectric_point"]]
+    ['4.25', '11.17']
+    """
+    for name in properties:
+        if name not in PROPERTIES + ("composition", "flexibility"):
+            raise ValueError("Unknown property %r" % name)
+    codes, lengths = _encode_proteins(sequences)
+    n = len(lengths)
+    nletters = len(IUPACData.protein_letters)
+    #Which protein each residue belongs to, and where each protein starts
+    protein = numpy.repeat(numpy.arange(n), lengths)
+    starts = numpy.concatenate(([0], numpy.cumsum(lengths)[:-1])).astype(numpy.intp)
+    counts = numpy.bincount(protein * (nletters + 1) + codes,
+                            minlength=n * (nletters + 1))
+    counts = counts.reshape((n, nletters + 1))
+    standard = counts[:, nletters] == 0
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        fractions = counts[:, :nletters] / lengths[:, numpy.newaxis].astype(float)
+    index = dict((letter, i) for i, letter
+                 in enumerate(IUPACData.protein_letters))
+
+    def fraction(aas):
+        return fractions[:, [index[aa] for aa in aas]].sum(axis=1)
+
+    table = {}
+    for name in properties:
+        if name == "length":
+            table[name] = lengths
+        elif name == "composition":
+            table[name] = counts[:, :nletters]
+        elif name == "molecular_weight":
+            weights = numpy.array([IUPACData.protein_weights[letter] - 18.02
+                                   for letter in IUPACData.protein_letters])
+            values = numpy.dot(counts[:, :nletters], weights) + 18.02
+            table[name] = numpy.where(standard, values, numpy.nan)
+        elif name == "aromaticity":
+            table[name] = fraction("YWF")
+        elif name == "gravy":
+            values = numpy.dot(counts[:, :nletters],
+                               _scale_array(ProtParamData.kd)[:nletters])
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                values = values / lengths
+            table[name] = numpy.where(standard, values, numpy.nan)
+        elif name == "instability_index":
+            #Look up all the dipeptides (within each protein) at once
+            diwv = numpy.empty((nletters + 1, nletters + 1))
+            diwv.fill(numpy.nan)
+            for i, first in enumerate(IUPACData.protein_letters):
+                for j, second in enumerate(IUPACData.protein_letters):
+                    diwv[i, j] = ProtParamData.DIWV[first][second]
+            within = protein[1:] == protein[:-1]
+            scores = diwv[codes[:-1][within], codes[1:][within]]
+            scores = numpy.bincount(protein[1:][within], scores, minlength=n)
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                table[name] = (10.0 / lengths) * scores
+        elif name == "isoelectric_point":
+            values = numpy.empty(n)
+            values.fill(numpy.nan)
+            rows = lengths > 0
+            values[rows] = _isoelectric_points(
+                counts[rows], codes[starts[rows]],
+                codes[starts[rows] + lengths[rows] - 1])
+            table[name] = values
+        elif name == "helix_fraction":
+            table[name] = fraction("VIYFWL")
+        elif name == "turn_fraction":
+            table[name] = fraction("NPGS")
+        elif name == "sheet_fraction":
+            table[name] = fraction("EMAL")
+        elif name == "flexibility":
+            table[name] = _flexibility(codes, starts, lengths)
+    return table
+
+
+def _flexibility(codes, starts, lengths):
+    """Vectorised version of ProteinAnalysis.flexibility (PRIVATE)."""
+    #Weight of each position in the window of nine, as used in the method
+    #ProteinAnalysis.flexibility (which adds the residue after the middle).
+    window = 9
+    weights = numpy.zeros(window)
+    for j, weight in enumerate([0.25, 0.4375, 0.625, 0.8125]):
+        weights[j] += weight
+        weights[window - j - 1] += weight
+    weights[window // 2 + 1] += 1
+    values = _scale_array(ProtParamData.Flex)[codes]
+    scores = numpy.zeros(max(len(values) - window + 1, 0))
+    for i, weight in enumerate(weights):
+        if weight:
+            scores += weight * values[i:i + len(scores)]
+    scores /= 5.25
+    return [scores[start:start + max(length - window, 0)]
+            for start, length in zip(starts, lengths)]
+
+
+def protein_scales(sequences, param_dict, window, edge=1.0):
+    """Calculate an amino acid scale profile for many proteins (requires NumPy).
+
+    Takes an iterable of protein sequences and the same arguments as the
+    ProteinAnalysis protein_scale method, and returns a list of NumPy arrays
+    of the profile for each protein.  Each profile is calculated as a
+    weighted sum of the scale values, for all the windows of all the
+    proteins in one go.  Unlike the protein_scale method, residues without
+    a scale value simply count as zero (rather than printing a warning).
+    """
+    codes, lengths = _encode_proteins(sequences)
+    starts = numpy.concatenate(([0], numpy.cumsum(lengths)[:-1])).astype(numpy.intp)
+    #Full list of weights, as used in the protein_scale method
+    unit = ((1.0 - edge) / (window - 1)) * 2
+    edge_weights = [edge + unit * i for i in range(window // 2)]
+    weights = numpy.zeros(window)
+    for j, weight in enumerate(edge_weights):
+        weights[j] += weight
+        weights[window - j - 1] += weight
+    weights[window // 2] += 1
+    sum_of_weights = sum(edge_weights) * 2 + 1
+    values = numpy.nan_to_num(_scale_array(param_dict)[codes])
+    scores = numpy.zeros(max(len(values) - window + 1, 0))
+    for i, weight in enumerate(weights):
+        scores += weight * values[i:i + len(scores)]
+    scores /= sum_of_weights
+    return [scores[start:start + max(length - window + 1, 0)]
+            for start, length in zip(starts, lengths)]
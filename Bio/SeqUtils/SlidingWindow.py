@@ -0,0 +1,272 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Sliding window statistics along nucleotide sequences (requires NumPy).
+
+This module calculates GC content, GC skew, local composition complexity
+(LCC) and Shannon entropy for windows along a sequence, giving each track
+as a NumPy array with one value per window:
+
+>>> from Bio.SeqUtils.SlidingWindow import gc_content, gc_skew, lcc
+>>> gc_content("AAAAGGGGCCCCTTTT", window=8, step=4).tolist()
+[50.0, 100.0, 50.0]
+>>> gc_skew("AAAAGGGGCCCCTTTT", window=8, step=4).tolist()
+[1.0, 0.0, -1.0]
+>>> lcc("AAAAGGGGCCCCTTTT", window=8, step=4).tolist()
+[1.0, 1.0, 1.0]
+
+Only complete windows are used, starting at the beginning of the sequence
+and moving along by the given step (default one letter).  Letters are
+counted regardless of case, and as in the GC function in Bio.SeqUtils the
+ambiguous letter S (G or C) counts towards the GC content.
+
+Rather than counting the letters in each window from scratch, the counts
+are updated as the window moves along (using running totals of each
+letter), so the time taken does not depend on the window size.  Each
+function takes either a single sequence (a string or Seq object) or an
+iterator of chunks of a sequence, so that whole chromosomes do not need to
+be held in memory:
+
+>>> chunks = iter(["AAAAGG", "GGCCCCT", "TTT"])
+>>> gc_skew(chunks, window=8, step=4).tolist()
+[1.0, 0.0, -1.0]
+
+To calculate several tracks in one pass use the window_stats function, or
+for complete control the WindowCounter class.
+"""
+
+from __future__ import with_statement
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError("Please install NumPy if you want to "
+                                       "use Bio.SeqUtils.SlidingWindow")
+
+from Bio._py3k import _as_bytes
+
+#Letters are coded as A=0, C=1, G=2, T=3 (the same order as k-mers are
+#numbered, so ACGT is 0*64 + 1*16 + 2*4 + 3), S=4 and anything else 5.
+_CODES = numpy.empty(256, numpy.uint8)
+_CODES.fill(5)
+for _i, _letter in enumerate("ACGTS"):
+    _CODES[ord(_letter)] = _i
+    _CODES[ord(_letter.lower())] = _i
+del _i, _letter
+_A, _C, _G, _T, _S = range(5)
+
+TRACKS = ("gc", "gc_skew", "lcc", "entropy")
+
+
+def _chunks(sequence):
+    """Returns an iterator of chunks for a sequence or chunk iterator (PRIVATE)."""
+    if isinstance(sequence, basestring) or hasattr(sequence, "alphabet"):
+        #A single string or Seq-like object
+        return iter([sequence])
+    return iter(sequence)
+
+
+def _entropy(counts):
+    """Shannon entropy in bits of each row of a 2D array of counts (PRIVATE).
+
+    Gives NaN for rows with no counts.
+    """
+    totals = counts.sum(axis=1)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        freqs = counts / totals[:, numpy.newaxis].astype(float)
+        terms = numpy.where(counts > 0, freqs * numpy.log2(freqs), 0.0)
+        return numpy.where(totals > 0, -terms.sum(axis=1), numpy.nan)
+
+
+class WindowCounter(object):
+    """Incrementally count letters in a sliding window along a sequence.
+
+    Feed the sequence in chunks (of any size) to the update method, which
+    returns the statistics for each window completed by that chunk:
+
+    >>> counter = WindowCounter(window=4, step=2)
+    >>> stats = counter.update("ACGTGG")
+    >>> stats["start"].tolist(), stats["gc"].tolist()
+    ([0, 2], [50.0, 75.0])
+    >>> stats = counter.update("AT")
+    >>> stats["start"].tolist(), stats["gc"].tolist()
+    ([4], [50.0])
+
+    Only the last few letters (less than the window size) are kept between
+    chunks.  The entropy track is for k-mers of length k (default 1, single
+    letters) which are unambiguous (only A, C, G and T).  The time taken
+    grows with the number of possible k-mers (4**k), so k should be small.
+    """
+
+    def __init__(self, window, step=1, k=1, tracks=TRACKS):
+        if window < 1:
+            raise ValueError("The window size should be at least one")
+        if step < 1:
+            raise ValueError("The step size should be at least one")
+        if not 1 <= k <= window:
+            raise ValueError("k should be between one and the window size")
+        for track in tracks:
+            if track not in TRACKS:
+                raise ValueError("Unknown track %r, should be one of %s"
+                                 % (track, ", ".join(TRACKS)))
+        self.window = window
+        self.step = step
+        self.k = k
+        self.tracks = tuple(tracks)
+        #Letters carried over from the previous chunk(s), starting at
+        #position self._offset of the sequence.
+        self._tail = numpy.zeros(0, numpy.uint8)
+        self._offset = 0
+        #Start position of the next window
+        self._next = 0
+
+    def _window_counts(self, symbols, starts, length, nbins):
+        """Counts of each symbol in the given windows (PRIVATE).
+
+        Uses the running total of each symbol, so each window count is the
+        difference of two totals.  Returns an array with one row per
+        window, and one column per symbol.
+        """
+        counts = numpy.empty((len(starts), nbins), numpy.int64)
+        ends = starts + length
+        totals = numpy.empty(len(symbols) + 1, numpy.int64)
+        totals[0] = 0
+        for i in range(nbins):
+            numpy.cumsum(symbols == i, out=totals[1:])
+            counts[:, i] = totals[ends] - totals[starts]
+        return counts
+
+    def _kmer_counts(self, letters, starts):
+        """Counts of each unambiguous k-mer in the given windows (PRIVATE)."""
+        k = self.k
+        if not len(starts):
+            #May not even have k letters yet
+            return numpy.zeros((0, 4 ** k), numpy.int64)
+        n = len(letters) - k + 1
+        codes = numpy.zeros(n, numpy.int64)
+        ambiguous = numpy.zeros(n, bool)
+        for i in range(k):
+            part = letters[i:i + n]
+            codes = codes * 4 + numpy.minimum(part, 3)
+            ambiguous |= part > _T
+        #Ambiguous k-mers are put in an extra bin which is not counted
+        codes[ambiguous] = 4 ** k
+        return self._window_counts(codes, starts, self.window - k + 1, 4 ** k)
+
+    def update(self, chunk):
+        """Add the next chunk of the sequence, returns the new windows.
+
+        Returns a dictionary of NumPy arrays with one entry per window
+        completed by this chunk (which may be none), for the start position
+        of each window ("start") and each of the requested tracks.
+        """
+        codes = _CODES[numpy.frombuffer(_as_bytes(str(chunk)), numpy.uint8)]
+        letters = numpy.concatenate([self._tail, codes])
+        #Start positions of the new windows, relative to the letters array
+        first = self._next - self._offset
+        last = len(letters) - self.window
+        if first <= last:
+            starts = numpy.arange(first, last + 1, self.step)
+            self._next = self._offset + starts[-1] + self.step
+        else:
+            starts = numpy.zeros(0, numpy.int64)
+        stats = {"start": starts + self._offset}
+        #Keep any letters which may be in future windows
+        cut = min(self._next - self._offset, len(letters))
+        self._tail = letters[cut:].copy()
+        self._offset += cut
+
+        counts = self._window_counts(letters, starts, self.window, 5)
+        a, c, g, t, s = [counts[:, i].astype(float) for i in range(5)]
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            if "gc" in self.tracks:
+                stats["gc"] = (g + c + s) * 100.0 / self.window
+            if "gc_skew" in self.tracks:
+                stats["gc_skew"] = (g - c) / (g + c)
+            if "lcc" in self.tracks:
+                #As in Bio.SeqUtils.lcc, the frequencies are relative to the
+                #window size (including any ambiguous letters).
+                freqs = counts[:, :4] / float(self.window)
+                terms = numpy.where(freqs > 0, freqs * numpy.log2(freqs), 0.0)
+                stats["lcc"] = -terms.sum(axis=1)
+        if "entropy" in self.tracks:
+            if self.k == 1:
+                stats["entropy"] = _entropy(counts[:, :4])
+            else:
+                stats["entropy"] = _entropy(self._kmer_counts(letters, starts))
+        return stats
+
+
+def window_stats(sequence, window, step=1, k=1, tracks=TRACKS):
+    """Calculate several sliding window tracks in a single pass.
+
+    sequence - A string or Seq object, or an iterator of chunks of the
+               sequence (e.g. strings read from a large file).
+    window - The window size.
+    step - How far to move the window each time (default 1).
+    k - k-mer length for the entropy track (default 1).
+    tracks - The tracks wanted (default all of gc, gc_skew, lcc and
+             entropy).
+
+    Returns a dictionary of NumPy arrays, with one value per window, for
+    the start position of each window ("start") and each track.
+
+    >>> stats = window_stats("AAAAGGGGCCCCTTTT", window=8, step=4)
+    >>> stats["start"].tolist()
+    [0, 4, 8]
+    >>> stats["entropy"].tolist()
+    [1.0, 1.0, 1.0]
+    """
+    counter = WindowCounter(window, step, k, tracks)
+    parts = [counter.update(chunk) for chunk in _chunks(sequence)]
+    if not parts:
+        parts = [counter.update("")]
+    stats = {}
+    for name in parts[0]:
+        stats[name] = numpy.concatenate([part[name] for part in parts])
+    return stats
+
+
+def gc_content(sequence, window, step=1):
+    """Returns a NumPy array of the GC percentage in each window."""
+    return window_stats(sequence, window, step, tracks=["gc"])["gc"]
+
+
+def gc_skew(sequence, window, step=1):
+    """Returns a NumPy array of the GC skew (G-C)/(G+C) for each window.
+
+    Windows without any G or C give NaN.
+    """
+    return window_stats(sequence, window, step, tracks=["gc_skew"])["gc_skew"]
+
+
+def lcc(sequence, window, step=1):
+    """Returns a NumPy array of the local composition complexity of each window.
+
+    This is the same value as the lcc_simp function in Bio.SeqUtils.lcc
+    would give for each window.
+    """
+    return window_stats(sequence, window, step, tracks=["lcc"])["lcc"]
+
+
+def entropy(sequence, window, step=1, k=1):
+    """Returns a NumPy array of the Shannon entropy (in bits) of each window.
+
+    The entropy is for the frequencies of the unambiguous k-mers (default
+    single letters) in the window.  Windows without any give NaN.
+    """
+    return window_stats(sequence, window, step, k, ["entropy"])["entropy"]
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    print "Running doctests..."
+    import doctest
+    doctest.testmod()
+    print "Done"
+
+if __name__ == "__main__":
+    _test()
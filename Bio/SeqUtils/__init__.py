@@ -90,6 +90,9 @@ def GC_skew(seq, window = 100):
     and the size of the window.
 
     Does NOT look at any ambiguous nucleotides.
+
+    See also the gc_skew function in Bio.SeqUtils.SlidingWindow, which
+    gives a NumPy array for overlapping or non-overlapping windows.
     """
     # 8/19/03: Iddo: added lowercase 
     values = []
@@ -243,6 +246,38 @@ def seq3(seq):
 # {{{ 
 
 
+def six_frames(seq, genetic_code = 1, stop_symbol = "*"):
+    """Translate a nucleotide sequence in all six reading frames.
+
+    Returns a dictionary of protein strings keyed by frame, 1, 2 and 3 for
+    the forward strand (starting at the first, second and third letter),
+    and -1, -2 and -3 for the reverse complement strand. The overlapping
+    codons on each strand are all translated in one pass using the codon
+    lookup table held for the genetic code, which is much faster than
+    translating each frame separately.
+
+    >>> frames = six_frames("ATGGCCATTGTAATGGGCCGCTGA")
+    >>> frames[1]
+    'MAIVMGR*'
+    >>> frames[2]
+    'WPL*WAA'
+    >>> frames[-1]
+    'SAAHYNGH'
+
+    The genetic_code can be an NCBI table identifier, a table name or a
+    CodonTable object, as in the translate function in Bio.Seq.
+    """
+    from Bio.Seq import reverse_complement, _get_str_codon_table, \
+                        _translate_str_frames
+    table = _get_str_codon_table(genetic_code)
+    seq = str(seq)
+    frames = {}
+    for strand, nuc in [(+1, seq), (-1, reverse_complement(seq))]:
+        for i, protein in enumerate(_translate_str_frames(nuc, table,
+                                                          stop_symbol)):
+            frames[strand * (i + 1)] = protein
+    return frames
+
 def six_frame_translations(seq, genetic_code = 1):
     """Formatted string showing the 6 frame translations and GC content.
 
@@ -252,15 +287,17 @@ def six_frame_translations(seq, genetic_code = 1):
     e.g.
     from Bio.SeqUtils import six_frame_translations
     print six_frame_translations("AUGGCCAUUGUAAUGGGCCGCUGA")
+
+    The three frames on each strand are translated together in one batch,
+    see also the six_frames function.
     """
-    from Bio.Seq import reverse_complement, translate
+    from Bio.Seq import reverse_complement
     anti = reverse_complement(seq)
     comp = anti[::-1]
     length = len(seq)
-    frames = {}
+    frames = six_frames(seq, genetic_code)
     for i in range(0,3):
-        frames[i+1]  = translate(seq[i:], genetic_code)
-        frames[-(i+1)] = reverse(translate(anti[i:], genetic_code))
+        frames[-(i+1)] = frames[-(i+1)][::-1]
 
     # create header
     if length > 20:
@@ -17,7 +17,10 @@ def lcc_mult(seq,wsize):
 
     The result is the same as applying lcc_simp multiple times, but this
     version is optimized for speed. The optimization works by using the
-    value of previous window as a base to compute the next one."""
+    value of previous window as a base to compute the next one.
+
+    See also the lcc function in Bio.SeqUtils.SlidingWindow, which gives
+    a NumPy array (without the leading zero) and can take sequence chunks."""
     l2 = math.log(2)
     tamseq = len(seq)
     try:
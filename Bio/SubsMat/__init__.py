@@ -119,6 +119,13 @@ import warnings
 import Bio
 from Bio import Alphabet
 from Bio.SubsMat import FreqTable
+from Bio._py3k import _as_bytes
+
+try:
+    import numpy
+except ImportError:
+    #Only needed for the IndexedMatrix class
+    numpy = None
 
 log = math.log
 # Matrix types
@@ -392,6 +399,204 @@ class LogOddsMatrix(SeqMat):
         return relative_entropy
 
 
+class IndexedMatrix(object):
+    """A substitution matrix held as a dense NumPy array (requires NumPy).
+
+    This is built from any dictionary keyed by tuples of pairs of letters,
+    such as a SeqMat or one of the matrices in Bio.SubsMat.MatrixInfo.  As
+    in those, a pair only given in one order is used for both orders:
+
+    >>> from Bio.SubsMat import MatrixInfo
+    >>> blosum62 = IndexedMatrix(MatrixInfo.blosum62)
+    >>> blosum62.letters
+    'ABCDEFGHIKLMNPQRSTVWXYZ'
+    >>> blosum62["W", "A"], blosum62["A", "W"]
+    (-3, -3)
+
+    The scores are held in a square array (with rows and columns in the
+    order of the letters), with a lookup table from the byte value of
+    each letter to its index.  Whole sequences can be encoded as arrays
+    of indexes, and then scored against each other in one go:
+
+    >>> blosum62.score("HEAGAWGHEE", "HEAGAWGHEE")
+    62
+    >>> print blosum62.score_pairs("PAWHEAE", "HEAGAWG")
+    [-2 -1 -3 -2 -1 -3 -2]
+    >>> print blosum62.pair_scores("HEA", "PAWHE")
+    [[-2 -2 -2  8  0]
+     [-1 -1 -3  0  5]
+     [-1  4 -3 -2 -1]]
+
+    The object can also be called with two letters to get their score,
+    so it can be used directly as the match function or dictionary for
+    Bio.pairwise2 (where it is faster than a dictionary). The score is an
+    integer or a float depending on whether the compiled alignment code is
+    used, so here it is converted to an integer:
+
+    >>> from Bio import pairwise2
+    >>> int(pairwise2.align.globaldx("KEVLA", "EVL", blosum62, score_only=1))
+    13
+    """
+    def __init__(self, data, letters=None):
+        """Create an IndexedMatrix from a dictionary of scores.
+
+        data - A dictionary (e.g. a SeqMat) where the keys are tuples of
+               pairs of single letters and the values are the scores.
+        letters - Optional string giving the order of the letters (default
+                  is all the letters used in data, sorted).
+        """
+        if numpy is None:
+            from Bio import MissingPythonDependencyError
+            raise MissingPythonDependencyError("Please install NumPy if you "
+                                               "want to use IndexedMatrix")
+        if letters is None:
+            used = set()
+            for letter1, letter2 in data:
+                used.add(letter1)
+                used.add(letter2)
+            letters = "".join(sorted(used))
+        self.letters = letters
+        n = len(letters)
+        index = dict((letter, i) for i, letter in enumerate(letters))
+        if len(index) != n:
+            raise ValueError("Repeated letters in %r" % letters)
+        for letter in letters:
+            if len(letter) != 1 or ord(letter) > 255:
+                raise ValueError("Letter %r is not a single byte" % letter)
+        if [v for v in data.itervalues() if not isinstance(v, (int, long))]:
+            dtype = float
+        else:
+            dtype = int
+        self.array = numpy.zeros((n, n), dtype)
+        known = numpy.zeros((n, n), bool)
+        for (letter1, letter2), value in data.iteritems():
+            try:
+                i, j = index[letter1], index[letter2]
+            except KeyError:
+                #Not in the requested letters
+                continue
+            self.array[i, j] = value
+            known[i, j] = True
+            if (letter2, letter1) not in data:
+                self.array[j, i] = value
+                known[j, i] = True
+        if not known.all():
+            i, j = numpy.argwhere(~known)[0]
+            raise ValueError("No score for (%r, %r)"
+                             % (letters[i], letters[j]))
+        #Lookup table from byte value to index, -1 for unknown letters
+        self.index = numpy.empty(256, numpy.int16)
+        self.index.fill(-1)
+        for i, letter in enumerate(letters):
+            self.index[ord(letter)] = i
+        #Nested dictionaries of plain Python numbers, for the fastest
+        #lookups of a single pair of letters.
+        values = self.array.tolist()
+        self._scores = dict((letter, dict(zip(letters, values[i])))
+                            for i, letter in enumerate(letters))
+
+    def __repr__(self):
+        return "%s(<%i letters %r>)" % (self.__class__.__name__,
+                                        len(self.letters), self.letters)
+
+    def __len__(self):
+        return len(self.letters)
+
+    def __getitem__(self, pair):
+        letter1, letter2 = pair
+        return self._scores[letter1][letter2]
+
+    def __call__(self, letter1, letter2):
+        """Returns the score for a pair of letters."""
+        return self._scores[letter1][letter2]
+
+    def __contains__(self, pair):
+        letter1, letter2 = pair
+        return letter1 in self._scores and letter2 in self._scores
+
+    def encode(self, sequence):
+        """Returns a NumPy array of the index of each letter in a sequence.
+
+        The sequence can be a string, Seq object or anything else which
+        can be converted to a string.  Unknown letters give a ValueError.
+        """
+        codes = numpy.frombuffer(_as_bytes(str(sequence)), numpy.uint8)
+        indexes = self.index[codes]
+        if len(indexes) and indexes.min() < 0:
+            bad = codes[indexes < 0][0]
+            raise ValueError("Letter %r is not in the matrix" % chr(bad))
+        return indexes
+
+    def _encoded(self, sequence):
+        if isinstance(sequence, numpy.ndarray):
+            #Already encoded
+            return sequence
+        return self.encode(sequence)
+
+    def score_pairs(self, seq1, seq2):
+        """Returns an array of the scores for each pair of aligned letters.
+
+        The two sequences (as strings, Seq objects, or arrays from the
+        encode method) should be the same length, as in an ungapped
+        alignment.
+        """
+        seq1, seq2 = self._encoded(seq1), self._encoded(seq2)
+        if len(seq1) != len(seq2):
+            raise ValueError("Sequences must be the same length")
+        return self.array[seq1, seq2]
+
+    def score(self, seq1, seq2):
+        """Returns the total score for two ungapped aligned sequences."""
+        return self.score_pairs(seq1, seq2).sum()
+
+    def pair_scores(self, seq1, seq2):
+        """Returns a 2D array of the scores of every letter in seq1 (rows)
+        against every letter in seq2 (columns)."""
+        seq1, seq2 = self._encoded(seq1), self._encoded(seq2)
+        return self.array[seq1[:, numpy.newaxis], seq2]
+
+    def _half(self):
+        #Values of the half matrix (the diagonal and one triangle), as in
+        #the SeqMat objects
+        return self.array[numpy.triu_indices(len(self.letters))]
+
+    def entropy(self):
+        """Returns the entropy (in bits) of a frequency matrix.
+
+        As for the make_entropy method of SeqMat, this is calculated from
+        the half matrix, ignoring values too small to be frequencies.
+        """
+        values = self._half().astype(float)
+        values = values[values > EPSILON]
+        return - (values * numpy.log2(values)).sum()
+
+    def relative_entropy(self, obs_freq_mat, log_odds=True):
+        """Returns the relative entropy with respect to an observed
+        frequency matrix (a SeqMat or IndexedMatrix with the same letters).
+
+        With log_odds=True (default) this matrix is treated as a log odds
+        matrix (as in LogOddsMatrix), otherwise as a substitution matrix
+        of odds ratios (as in SubstitutionMatrix).
+        """
+        if not isinstance(obs_freq_mat, IndexedMatrix):
+            obs_freq_mat = IndexedMatrix(obs_freq_mat, self.letters)
+        elif obs_freq_mat.letters != self.letters:
+            obs_freq_mat = IndexedMatrix(dict(obs_freq_mat._pairs()),
+                                         self.letters)
+        values = self._half().astype(float)
+        obs_freq = obs_freq_mat._half()
+        if log_odds:
+            return (obs_freq * values).sum() / log(2)
+        wanted = values > EPSILON
+        return (obs_freq[wanted] * numpy.log2(values[wanted])).sum()
+
+    def _pairs(self):
+        #Iterate over the ((letter1, letter2), score) pairs
+        for letter1 in self.letters:
+            for letter2, value in self._scores[letter1].iteritems():
+                yield (letter1, letter2), value
+
+
 def _build_obs_freq_mat(acc_rep_mat):
    """
    build_obs_freq_mat(acc_rep_mat):
@@ -0,0 +1,506 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Read and write BGZF compressed files (the GZIP variant used in BAM).
+
+BGZF (Blocked GNU Zip Format) is a variant of GZIP developed for the BAM
+file format (part of the SAM/BAM tools). A BGZF file is a series of GZIP
+blocks (each at most 64kb uncompressed), with an extra field in each GZIP
+header recording the compressed block size. This means any BGZF file is
+also a valid GZIP file, and can be decompressed with the standard gzip
+tools. However, unlike a normal GZIP file, it allows efficient random
+access to the uncompressed data.
+
+Positions in a BGZF file are given as 64 bit "virtual offsets", made up
+of the offset of the start of a compressed block in the file (shifted up
+by 16 bits), plus the offset within the decompressed block:
+
+>>> from Bio import bgzf
+>>> bgzf.make_virtual_offset(100, 50)
+6553650
+>>> bgzf.split_virtual_offset(6553650)
+(100, 50)
+
+You can use virtual offsets with the seek and tell methods of the reader
+class, and then read data as if from a normal uncompressed file:
+
+>>> handle = bgzf.BgzfReader("Quality/example.fastq.bgz", "rb")
+>>> print handle.readline().rstrip()
+@EAS54_6_R1_2_1_413_324
+>>> offset = handle.tell()
+>>> print handle.readline().rstrip()
+CCCTTCTTGTCTTCAGCGTTTCTCC
+>>> handle.seek(offset) == offset
+True
+>>> print handle.readline().rstrip()
+CCCTTCTTGTCTTCAGCGTTTCTCC
+>>> handle.close()
+
+Note that you cannot do arithmetic with virtual offsets (e.g. subtract
+two offsets to get a length), since they are not continuous across the
+block boundaries.
+
+The Bio.SeqIO.index() and index_db() functions detect BGZF compressed
+files automatically, and record the virtual offset of each record in
+their index. To create a BGZF file, use the BgzfWriter class, or the
+bgzip tool from samtools/tabix.
+"""
+
+import __builtin__ #Python 2.x, will become builtins on Python 3
+import zlib
+import struct
+
+from Bio._py3k import _as_bytes, _as_string
+
+#For Python 2 can just use: _bgzf_magic = '\x1f\x8b\x08\x04'
+#but need to use bytes on Python 3
+_bgzf_magic = _as_bytes("\x1f\x8b\x08\x04")
+_bgzf_header = _as_bytes("\x1f\x8b\x08\x04\x00\x00\x00\x00"
+                         "\x00\xff\x06\x00\x42\x43\x02\x00")
+_bgzf_eof = _as_bytes("\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00"
+                      "BC\x02\x00\x1b\x00\x03\x00\x00\x00\x00\x00\x00"
+                      "\x00\x00\x00")
+_bytes_BC = _as_bytes("BC")
+_empty_bytes_string = _as_bytes("")
+_bytes_newline = _as_bytes("\n")
+
+#Largest amount of uncompressed data we put in a block, small enough that
+#even incompressible data will fit in the 64kb compressed block size limit.
+_BLOCK_DATA_SIZE = 65280
+
+def open(filename, mode="rb"):
+    """Open a BGZF file for reading or writing."""
+    if "r" in mode.lower():
+        return BgzfReader(filename, mode)
+    elif "w" in mode.lower() or "a" in mode.lower():
+        return BgzfWriter(filename, mode)
+    else:
+        raise ValueError("Bad mode %r" % mode)
+
+def make_virtual_offset(block_start_offset, within_block_offset):
+    """Compute a BGZF virtual offset from block start and within block offsets.
+
+    The BAM indexing scheme records read positions using a 64 bit
+    'virtual offset', comprising the start of the compressed block (as
+    a 48 bit integer) and the offset within the uncompressed data of
+    that block (as an unsigned 16 bit integer).
+
+    >>> make_virtual_offset(0, 0)
+    0
+    >>> make_virtual_offset(0, 1)
+    1
+    >>> make_virtual_offset(1, 0)
+    65536
+    >>> make_virtual_offset(0, 2**16)
+    Traceback (most recent call last):
+    ...
+    ValueError: Require 0 <= within_block_offset < 2**16, got 65536
+    """
+    if within_block_offset < 0 or within_block_offset >= 65536:
+        raise ValueError("Require 0 <= within_block_offset < 2**16, got %i" \
+                         % within_block_offset)
+    if block_start_offset < 0 or block_start_offset >= 281474976710656:
+        raise ValueError("Require 0 <= block_start_offset < 2**48, got %i" \
+                         % block_start_offset)
+    return (block_start_offset << 16) | within_block_offset
+
+def split_virtual_offset(virtual_offset):
+    """Divides a 64-bit BGZF virtual offset into block start & within block offsets.
+
+    >>> split_virtual_offset(65536)
+    (1, 0)
+    >>> split_virtual_offset(100000)
+    (1, 34464)
+    """
+    start = virtual_offset >> 16
+    return start, virtual_offset ^ (start << 16)
+
+def BgzfBlocks(handle):
+    """Low level debugging function to inspect BGZF blocks.
+
+    Returns the block start offset (see virtual offsets), the block
+    length (add these for the start of the next block), and the
+    decompressed length of the blocks contents (limited to 65536 in
+    BGZF).
+
+    >>> from __builtin__ import open
+    >>> handle = open("Quality/example.fastq.bgz", "rb")
+    >>> for values in BgzfBlocks(handle):
+    ...     print "Raw start %i, raw length %i; data start %i, data length %i" % values
+    Raw start 0, raw length 147; data start 0, data length 234
+    Raw start 147, raw length 28; data start 234, data length 0
+    >>> handle.close()
+    """
+    data_start = 0
+    while True:
+        start_offset = handle.tell()
+        block_length, data = _load_bgzf_block(handle)
+        if not block_length:
+            #End of file
+            break
+        data_len = len(data)
+        yield start_offset, block_length, data_start, data_len
+        data_start += data_len
+
+def _load_bgzf_block(handle):
+    """Load the next BGZF block of compressed data (PRIVATE).
+
+    Returns the (compressed) block length and the decompressed data, or
+    zero and an empty string at the end of the file.
+    """
+    magic = handle.read(4)
+    if not magic:
+        #End of file
+        return 0, _empty_bytes_string
+    if magic != _bgzf_magic:
+        raise ValueError(r"A BGZF (e.g. a BAM file) block should start with "
+                         r"%r, not %r; handle.tell() now says %r"
+                         % (_bgzf_magic, magic, handle.tell()))
+    gzip_mod_time, gzip_extra_flags, gzip_os, extra_len = \
+        struct.unpack("<LBBH", handle.read(8))
+    block_size = None
+    x_len = 0
+    while x_len < extra_len:
+        subfield_id = handle.read(2)
+        subfield_len = struct.unpack("<H", handle.read(2))[0] #uint16_t
+        subfield_data = handle.read(subfield_len)
+        x_len += subfield_len + 4
+        if subfield_id == _bytes_BC:
+            assert subfield_len == 2, "Wrong BC payload length"
+            assert block_size is None, "Two BC subfields?"
+            block_size = struct.unpack("<H", subfield_data)[0] + 1 #uint16_t
+    assert x_len == extra_len, (x_len, extra_len)
+    if block_size is None:
+        raise ValueError("Missing BSIZE in BGZF block")
+    #Now comes the compressed data, CRC, and length of uncompressed data.
+    deflate_size = block_size - 1 - extra_len - 19
+    d = zlib.decompressobj(-15) #Negative window size means no headers
+    data = d.decompress(handle.read(deflate_size)) + d.flush()
+    expected_crc = handle.read(4)
+    expected_size = struct.unpack("<I", handle.read(4))[0]
+    if expected_size != len(data):
+        raise RuntimeError("Decompressed to %i, not %i" \
+                           % (len(data), expected_size))
+    #Should cope with a mix of Python platforms...
+    crc = zlib.crc32(data) & 0xffffffff
+    if expected_crc != struct.pack("<I", crc):
+        raise RuntimeError("CRC is %s, not %s" % (crc, expected_crc))
+    return block_size, data
+
+
+class BgzfReader(object):
+    """BGZF reader, acts like a read only handle but seek/tell differ.
+
+    Let's use the BgzfBlocks function to have a peak at the BGZF blocks
+    in an example BGZF file,
+
+    >>> from __builtin__ import open
+    >>> handle = open("GenBank/NC_000932.gb.bgz", "rb")
+    >>> for values in BgzfBlocks(handle):
+    ...     print "Raw start %i, raw length %i; data start %i, data length %i" % values
+    Raw start 0, raw length 15063; data start 0, data length 65280
+    Raw start 15063, raw length 17690; data start 65280, data length 65280
+    Raw start 32753, raw length 22051; data start 130560, data length 65280
+    Raw start 54804, raw length 22161; data start 195840, data length 65280
+    Raw start 76965, raw length 15261; data start 261120, data length 44502
+    Raw start 92226, raw length 28; data start 305622, data length 0
+    >>> handle.close()
+
+    Now let's see how to use this block information to jump to
+    specific parts of the decompressed BGZF file:
+
+    >>> handle = BgzfReader("GenBank/NC_000932.gb.bgz", "rb")
+    >>> handle.tell()
+    0
+    >>> handle.seek(make_virtual_offset(54804, 126)) == 3591635070
+    True
+    >>> handle.read(7)
+    'attatga'
+    >>> handle.close()
+
+    Decompressed blocks are kept in a small cache (by default the 100 most
+    recently used blocks), so jumping back and forth between nearby records
+    does not keep decompressing the same blocks.
+    """
+
+    def __init__(self, filename=None, mode="r", fileobj=None, max_cache=100):
+        if max_cache < 1:
+            raise ValueError("Use max_cache with a minimum of 1")
+        #Must open the BGZF file in binary mode, but we may want to
+        #treat the contents as either text or binary (unicode or
+        #bytes under Python 3)
+        if fileobj:
+            assert filename is None
+            handle = fileobj
+        else:
+            if "w" in mode.lower() or "a" in mode.lower():
+                raise ValueError("Must use read mode (default), not write or append mode")
+            handle = __builtin__.open(filename, "rb")
+        self._text = "b" not in mode.lower()
+        self._handle = handle
+        self.name = getattr(handle, "name", None)
+        self.max_cache = max_cache
+        self._buffers = {}
+        self._cache_order = []
+        self._block_start_offset = None
+        self._block_raw_length = None
+        self._load_block(handle.tell())
+
+    def _load_block(self, start_offset=None):
+        """Make the block at this offset (or the next block) current (PRIVATE)."""
+        if start_offset is None:
+            #If the file is being read sequentially, then _handle.tell()
+            #should be pointing at the start of the next block.
+            #However, if seek has been used, we can't assume that.
+            start_offset = self._block_start_offset + self._block_raw_length
+        if start_offset == self._block_start_offset:
+            self._within_block_offset = 0
+            return
+        elif start_offset in self._buffers:
+            #Already in cache, mark as most recently used
+            self._buffer, self._block_raw_length = self._buffers[start_offset]
+            self._cache_order.remove(start_offset)
+            self._cache_order.append(start_offset)
+            self._within_block_offset = 0
+            self._block_start_offset = start_offset
+            return
+        #Now load the block
+        handle = self._handle
+        handle.seek(start_offset)
+        self._block_start_offset = start_offset
+        self._within_block_offset = 0
+        self._block_raw_length, self._buffer = _load_bgzf_block(handle)
+        if self._text:
+            self._buffer = _as_string(self._buffer)
+        if not self._block_raw_length:
+            #End of file, don't cache this
+            return
+        #Free up some memory by dropping the least recently used block
+        while len(self._buffers) >= self.max_cache:
+            del self._buffers[self._cache_order.pop(0)]
+        self._buffers[start_offset] = self._buffer, self._block_raw_length
+        self._cache_order.append(start_offset)
+
+    def tell(self):
+        """Returns a 64-bit unsigned BGZF virtual offset."""
+        if 0 < self._within_block_offset == len(self._buffer):
+            #Special case where we're right at the end of a (non empty) block.
+            #For non-maximal blocks could give two possible virtual offsets,
+            #but for a maximal block can't use 65536 as the within block
+            #offset. Therefore for consistency, use the next block and a
+            #within block offset of zero.
+            return (self._block_start_offset + self._block_raw_length) << 16
+        else:
+            #As make_virtual_offset, without the bounds checking (the
+            #offsets come from the blocks loaded, so are already valid)
+            return (self._block_start_offset << 16) | self._within_block_offset
+
+    def seek(self, virtual_offset):
+        """Seek to a 64-bit unsigned BGZF virtual offset."""
+        #Do this inline to avoid a function call,
+        #start_offset, within_block = split_virtual_offset(virtual_offset)
+        start_offset = virtual_offset >> 16
+        within_block = virtual_offset ^ (start_offset << 16)
+        if start_offset != self._block_start_offset:
+            #Don't need to load the block if already there
+            #(this avoids a function call since _load_block would do nothing)
+            self._load_block(start_offset)
+            assert start_offset == self._block_start_offset
+        if within_block > len(self._buffer):
+            raise ValueError("Within offset %i but block size only %i" \
+                             % (within_block, len(self._buffer)))
+        self._within_block_offset = within_block
+        return virtual_offset
+
+    def read(self, size=-1):
+        """Read up to size bytes (or to the end of the file if negative)."""
+        data = []
+        while size:
+            if self._within_block_offset == len(self._buffer):
+                if not self._block_raw_length:
+                    #End of file
+                    break
+                self._load_block() #will reset offsets
+                continue
+            start = self._within_block_offset
+            if size < 0:
+                end = len(self._buffer)
+            else:
+                end = min(len(self._buffer), start + size)
+                size -= end - start
+            data.append(self._buffer[start:end])
+            self._within_block_offset = end
+        if self._text:
+            return "".join(data)
+        return _empty_bytes_string.join(data)
+
+    def readline(self):
+        """Read a single line, which may span several BGZF blocks."""
+        data = []
+        while True:
+            if self._within_block_offset == len(self._buffer):
+                if not self._block_raw_length:
+                    #End of file
+                    break
+                self._load_block() #will reset offsets
+                continue
+            start = self._within_block_offset
+            if self._text:
+                i = self._buffer.find("\n", start)
+            else:
+                i = self._buffer.find(_bytes_newline, start)
+            if i == -1:
+                #No newline, need to read more data
+                end = len(self._buffer)
+            else:
+                end = i + 1
+            data.append(self._buffer[start:end])
+            self._within_block_offset = end
+            if i != -1:
+                break
+        if self._text:
+            return "".join(data)
+        return _empty_bytes_string.join(data)
+
+    def next(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def __iter__(self):
+        return self
+
+    def close(self):
+        self._handle.close()
+        self._buffer = None
+        self._block_start_offset = None
+        self._buffers = None
+        self._cache_order = None
+
+    def seekable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        return self._handle.fileno()
+
+
+class BgzfWriter(object):
+    """BGZF writer, acts like a write only handle but tell differs.
+
+    Data is compressed and written in blocks of at most 65280 bytes of
+    uncompressed data (each as a separate GZIP member with the BGZF extra
+    field), followed by the empty BGZF end of file marker block when the
+    handle is closed.
+    """
+
+    def __init__(self, filename=None, mode="w", fileobj=None, compresslevel=6):
+        if fileobj:
+            assert filename is None
+            handle = fileobj
+        else:
+            if "w" not in mode.lower() and "a" not in mode.lower():
+                raise ValueError("Must use write or append mode, not %r" % mode)
+            if "a" in mode.lower():
+                handle = __builtin__.open(filename, "ab")
+            else:
+                handle = __builtin__.open(filename, "wb")
+        self._text = "b" not in mode.lower()
+        self._handle = handle
+        self._buffer = _empty_bytes_string
+        self.compresslevel = compresslevel
+
+    def _write_block(self, block):
+        """Compress and write a block of data (PRIVATE)."""
+        assert len(block) <= _BLOCK_DATA_SIZE
+        #Giving a negative window bits means no gzip/zlib headers, -15 used in samtools
+        c = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15,
+                             zlib.DEF_MEM_LEVEL, 0)
+        compressed = c.compress(block) + c.flush()
+        del c
+        #With at most _BLOCK_DATA_SIZE bytes of input, even incompressible
+        #data (stored with a few bytes overhead) fits within a block.
+        crc = zlib.crc32(block) & 0xffffffff
+        #The BSIZE field is the block size minus one, and the block is the
+        #compressed data plus 18 bytes of header and 8 bytes of trailer
+        bsize = struct.pack("<H", len(compressed) + 25) #uint16_t
+        crc = struct.pack("<I", crc) #uint32_t
+        uncompressed_length = struct.pack("<I", len(block)) #uint32_t
+        data = _bgzf_header + bsize + compressed + crc + uncompressed_length
+        self._handle.write(data)
+
+    def write(self, data):
+        data = _as_bytes(data)
+        #block_size = 2**16 = 65536
+        data_len = len(data)
+        if len(self._buffer) + data_len < _BLOCK_DATA_SIZE:
+            self._buffer += data
+            return
+        else:
+            self._buffer += data
+            while len(self._buffer) >= _BLOCK_DATA_SIZE:
+                self._write_block(self._buffer[:_BLOCK_DATA_SIZE])
+                self._buffer = self._buffer[_BLOCK_DATA_SIZE:]
+
+    def flush(self):
+        while len(self._buffer) >= _BLOCK_DATA_SIZE:
+            self._write_block(self._buffer[:_BLOCK_DATA_SIZE])
+            self._buffer = self._buffer[_BLOCK_DATA_SIZE:]
+        if self._buffer:
+            self._write_block(self._buffer)
+            self._buffer = _empty_bytes_string
+        self._handle.flush()
+
+    def close(self):
+        """Flush data, write 28 bytes empty BGZF EOF marker, and close the BGZF file."""
+        if self._buffer:
+            self.flush()
+        #samtools will look for a magic EOF marker, just a 28 byte empty BGZF block,
+        #and if it is missing warns the BAM file may be truncated. In addition to
+        #samtools writing this block, so too does bgzip - so we should too.
+        self._handle.write(_bgzf_eof)
+        self._handle.flush()
+        self._handle.close()
+
+    def tell(self):
+        """Returns a BGZF 64-bit virtual offset."""
+        return make_virtual_offset(self._handle.tell(), len(self._buffer))
+
+    def seekable(self):
+        #Not seekable, but we do support tell...
+        return False
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        return self._handle.fileno()
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import doctest
+    import os
+    if os.path.isdir(os.path.join("..", "Tests")):
+        print "Runing doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("..", "Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+    elif os.path.isdir(os.path.join("Tests")):
+        print "Runing doctests..."
+        cur_dir = os.path.abspath(os.curdir)
+        os.chdir(os.path.join("Tests"))
+        doctest.testmod()
+        os.chdir(cur_dir)
+        del cur_dir
+        print "Done"
+
+if __name__ == "__main__":
+    _test()
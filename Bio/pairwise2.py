@@ -148,6 +148,19 @@ type help(pairwise2.align.localds) at the Python prompt.
 #   value of the function is the score.
 # - one_alignment_only: boolean
 #   Only recover one alignment.
+# - band_width: integer
+#   Only consider alignments within this many diagonals of the main
+#   diagonal (allowing for the difference in sequence lengths).  Much
+#   faster for similar sequences.  Implies linear_memory.  Requires
+#   affine gap penalties.
+# - linear_memory: boolean
+#   Find a single best alignment using memory proportional to the
+#   sequence lengths, rather than their product, so long sequences
+#   can be aligned.  Requires affine gap penalties.  Global alignments
+#   get the same best score as without this option, but for local
+#   alignments the score may be higher, as the default local alignment
+#   code does not always find the best scoring local alignment (e.g.
+#   a lone match can score less than the match score).
 
 MAX_ALIGNMENTS = 1000   # maximum alignments recovered in traceback
 
@@ -169,7 +182,8 @@ class align(object):
 the score given to non-identical ones."""),
             'd' : (['match_dict'],
 """match_dict is a dictionary where the keys are tuples of pairs of
-characters and the values are the scores, e.g. ("A", "C") : 2.5."""),
+characters and the values are the scores, e.g. ("A", "C") : 2.5.
+This can also be a Bio.SubsMat.IndexedMatrix (which is faster)."""),
             'c' : (['match_fn'],
 """match_fn is a callback function that takes two characters and
 returns the score between them."""),
@@ -257,7 +271,12 @@ alignment occurs.
                     keywds['match_fn'] = identity_match(match, mismatch)
                     i += 2
                 elif self.param_names[i] == 'match_dict':
-                    keywds['match_fn'] = dictionary_match(args[i])
+                    if callable(args[i]):
+                        # e.g. a Bio.SubsMat.IndexedMatrix, which is
+                        # faster than a dictionary lookup.
+                        keywds['match_fn'] = args[i]
+                    else:
+                        keywds['match_fn'] = dictionary_match(args[i])
                     i += 1
                 elif self.param_names[i] == 'open':
                     assert self.param_names[i+1] == 'extend'
@@ -290,7 +309,9 @@ alignment occurs.
                 ('gap_char', '-'),
                 ('force_generic', 0),
                 ('score_only', 0),
-                ('one_alignment_only', 0)
+                ('one_alignment_only', 0),
+                ('band_width', None),
+                ('linear_memory', 0),
                 ]
             for name, default in default_params:
                 keywds[name] = keywds.get(name, default)
@@ -299,6 +320,48 @@ alignment occurs.
         def __call__(self, *args, **keywds):
             keywds = self.decode(*args, **keywds)
             return _align(**keywds)
+
+        def batch(self, sequenceA, targets, *args, **keywds):
+            """Align one sequence against many, yielding (id, score, alignments).
+
+            Takes the query sequence, an iterable of targets, and then the
+            same scoring parameters (and keyword arguments) as the alignment
+            function itself, e.g. align.localds.batch(query, targets, matrix,
+            -10, -1).  The targets are (identifier, sequence) tuples, or
+            SeqRecord objects (using their id and the sequence as a string).
+
+            The arguments are only decoded once, and the scores from a
+            substitution matrix (or callback function) are cached.  Yields
+            tuples of the target identifier, best score, and the list of
+            alignments (or None with score_only).  The score is None if
+            there is no alignment.
+
+            Additional keyword arguments:
+            workers - Number of worker processes (default 1, no pool).  The
+                      match function must be picklable to use this (so not
+                      a lambda).  Results are still in the original order.
+            top     - Only return the top scoring targets (best first, in
+                      the original order for equal scores), once all of the
+                      targets have been aligned.  This still returns an
+                      iterator, as without top.
+            """
+            workers = keywds.pop('workers', 1)
+            top = keywds.pop('top', None)
+            if workers < 1:
+                raise ValueError("Number of workers must be at least one")
+            # Decode the arguments once, using the query in place of the
+            # target sequences.
+            keywds = self.decode(*((sequenceA, sequenceA) + args), **keywds)
+            if isinstance(keywds['match_fn'], dictionary_match) \
+            or 'match_fn' in self.param_names:
+                keywds['match_fn'] = _cached_match(keywds['match_fn'])
+            if workers == 1:
+                results = _batch_align_serial(keywds, targets)
+            else:
+                results = _batch_align_pool(keywds, targets, workers)
+            if top is None:
+                return results
+            return iter(_batch_top(results, top))
         
     def __getattr__(self, attr):
         return self.alignment_function(attr)
@@ -308,10 +371,18 @@ align = align()
 def _align(sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
            penalize_extend_when_opening, penalize_end_gaps,
            align_globally, gap_char, force_generic, score_only,
-           one_alignment_only):
+           one_alignment_only, band_width, linear_memory):
     if not sequenceA or not sequenceB:
         return []
 
+    if band_width is not None or linear_memory:
+        aligner = _LinearAligner(
+            sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
+            penalize_end_gaps, align_globally, band_width)
+        if score_only:
+            return aligner.score()
+        return aligner.alignment(gap_char)
+
     if (not force_generic) and isinstance(gap_A_fn, affine_penalty) \
     and isinstance(gap_B_fn, affine_penalty):
         open_A, extend_A = gap_A_fn.open, gap_A_fn.extend
@@ -359,6 +430,92 @@ def _align(sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
         align_globally, penalize_end_gaps, gap_char, one_alignment_only)
     return x
 
+def _batch_targets(targets):
+    # Turn the targets into (identifier, sequence) tuples.
+    for target in targets:
+        if hasattr(target, "seq"):
+            # SeqRecord
+            yield target.id, str(target.seq)
+        else:
+            yield target
+
+def _batch_align_target(keywds, target_id, sequenceB):
+    # Align the query to one target, returns (id, score, alignments).
+    keywds = keywds.copy()
+    keywds['sequenceB'] = sequenceB
+    result = _align(**keywds)
+    if keywds['score_only']:
+        if result == []:
+            # Empty sequence
+            return target_id, None, None
+        return target_id, result, None
+    if result:
+        return target_id, max([a[2] for a in result]), result
+    return target_id, None, result
+
+def _batch_align_serial(keywds, targets):
+    for target_id, sequenceB in _batch_targets(targets):
+        yield _batch_align_target(keywds, target_id, sequenceB)
+
+# Decoded alignment arguments for the worker processes, which are only
+# sent once to each worker.
+_batch_keywds = None
+
+def _batch_init_worker(keywds):
+    global _batch_keywds
+    _batch_keywds = keywds
+
+def _batch_align_chunk(chunk):
+    """Align the query to a list of targets, for multiprocessing (PRIVATE)."""
+    return [_batch_align_target(_batch_keywds, target_id, sequenceB)
+            for target_id, sequenceB in chunk]
+
+def _batch_align_pool(keywds, targets, workers, chunk_size=20):
+    try:
+        import multiprocessing
+    except ImportError:
+        #Python 2.5
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError("Requires multiprocessing, "
+                                           "which is included Python 2.6+")
+    from collections import deque
+    pending = deque()
+    pool = multiprocessing.Pool(workers, _batch_init_worker, (keywds,))
+    try:
+        chunk = []
+        for target in _batch_targets(targets):
+            chunk.append(target)
+            if len(chunk) < chunk_size:
+                continue
+            if len(pending) >= 2 * workers:
+                #Wait for the oldest chunk, keeping the output in order
+                for result in pending.popleft().get():
+                    yield result
+            pending.append(pool.apply_async(_batch_align_chunk, [chunk]))
+            chunk = []
+        if chunk:
+            pending.append(pool.apply_async(_batch_align_chunk, [chunk]))
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+
+def _batch_top(results, top):
+    # Keep the best scoring results, using a heap of the top ones so far.
+    import heapq
+    heap = []
+    for index, result in enumerate(results):
+        if result[1] is None:
+            continue
+        item = (result[1], -index, result)
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    heap.sort(reverse=True)
+    return [item[2] for item in heap]
+
 def _make_score_matrix_generic(
     sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn, 
     penalize_extend_when_opening, penalize_end_gaps, align_globally,
@@ -577,7 +734,382 @@ def _make_score_matrix_fast(
                                              [(row-1, col-1)]
                     
     return score_matrix, trace_matrix
-    
+
+# States for the linear memory alignments, given by the last step of
+# a path through the dynamic programming matrix:
+_MATCH, _GAP_B, _GAP_A, _ANY = 0, 1, 2, 3
+_NEG = -1e300   # minus infinity, for impossible states
+
+class _LinearAligner:
+    """Find a single best alignment using linear memory (PRIVATE).
+
+    Rather than filling in a full score matrix and traceback matrix, this
+    uses the divide and conquer approach of Hirschberg (extended to affine
+    gap penalties by Myers and Miller).  The best path through the middle
+    row is found from the scores of the forward and backward passes, and
+    then the two halves are aligned recursively, so only a few rows of
+    scores are held in memory at once.  Optionally the paths are restricted
+    to a band of diagonals, which is much faster for similar sequences.
+
+    This uses the same scoring scheme as the rest of this module, where a
+    gap in one sequence may not be directly followed by a gap in the other
+    sequence.  Global alignments get the same best score as the default
+    code, but local alignments may score higher, since this finds the best
+    local alignment which the default code does not always do.  Each step
+    along a path is a match (consuming a character from both sequences), a
+    gap in sequence B (consuming a character from sequence A), or a gap in
+    sequence A (consuming one from sequence B).
+
+    Positions in the matrix are given as (i, j), meaning the first i
+    characters of sequence A and j characters of sequence B have been
+    aligned.
+    """
+    # Base case for the recursion, a block this small (or with at most
+    # two rows) is aligned directly with a full traceback matrix.
+    block_size = 2500
+
+    def __init__(self, sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
+                 penalize_end_gaps, align_globally, band_width=None):
+        for gap_fn in [gap_A_fn, gap_B_fn]:
+            if not isinstance(gap_fn, affine_penalty):
+                raise ValueError("Banded or linear memory alignments "
+                                 "require affine gap penalties")
+        self.sequenceA, self.sequenceB = sequenceA, sequenceB
+        self.lenA, self.lenB = len(sequenceA), len(sequenceB)
+        self.match_fn = match_fn
+        # Gaps in sequence A are along a row, gaps in B down a column.
+        self.open_A = calc_affine_penalty(
+            1, gap_A_fn.open, gap_A_fn.extend,
+            gap_A_fn.penalize_extend_when_opening)
+        self.extend_A = gap_A_fn.extend
+        self.open_B = calc_affine_penalty(
+            1, gap_B_fn.open, gap_B_fn.extend,
+            gap_B_fn.penalize_extend_when_opening)
+        self.extend_B = gap_B_fn.extend
+        self.align_globally = align_globally
+        self.free_end_gaps = align_globally and not penalize_end_gaps
+        # Allowed diagonals, j - i, always including those needed to
+        # reach the bottom right corner of the matrix.
+        if band_width is None:
+            self.low, self.high = -self.lenA, self.lenB
+        else:
+            if band_width < 0:
+                raise ValueError("The band width should be non-negative.")
+            diff = self.lenB - self.lenA
+            self.low = min(0, diff) - band_width
+            self.high = max(0, diff) + band_width
+
+    def _row_gap(self, i):
+        # Open and extend penalties for a gap in A along row i.
+        if self.free_end_gaps and (i == 0 or i == self.lenA):
+            return 0, 0
+        return self.open_A, self.extend_A
+
+    def _col_gaps(self, j0, j1):
+        # Open and extend penalties for gaps in B down each column.
+        opens = [self.open_B] * (j1 - j0 + 1)
+        extends = [self.extend_B] * (j1 - j0 + 1)
+        if self.free_end_gaps:
+            for j in [0, self.lenB]:
+                if j0 <= j <= j1:
+                    opens[j - j0] = extends[j - j0] = 0
+        return opens, extends
+
+    def _band(self, i, j0, j1):
+        # Range of columns in row i within the band, and the block.
+        return max(j0, i + self.low), min(j1, i + self.high)
+
+    def score(self):
+        """Returns the best score."""
+        if not self.align_globally:
+            # An empty local alignment scores zero
+            return max(self._best_local()[0], 0)
+        scores = self._forward(0, self.lenA, 0, self.lenB, _MATCH)
+        return max([s[-1] for s in scores])
+
+    def alignment(self, gap_char):
+        """Returns a list of the best alignment, as (seqA, seqB, score, begin, end).
+        """
+        if self.align_globally:
+            score = self.score()
+            if score <= _NEG:
+                return []
+            starts, ends = (0, 0), (self.lenA, self.lenB)
+            steps = self._align(0, self.lenA, 0, self.lenB, _MATCH, _ANY)
+        else:
+            score, starts, ends = self._best_local()
+            if score <= 0:
+                return []
+            steps = self._align(starts[0], ends[0], starts[1], ends[1],
+                                _MATCH, _MATCH)
+        sequenceA, sequenceB = self.sequenceA, self.sequenceB
+        # Build up the aligned region from the steps, keeping the type of
+        # the sequences by using slices rather than indexes.
+        piecesA, piecesB = [], []
+        i, j = starts
+        for step in steps:
+            if step == _MATCH:
+                piecesA.append(sequenceA[i:i+1])
+                piecesB.append(sequenceB[j:j+1])
+                i += 1
+                j += 1
+            elif step == _GAP_B:
+                piecesA.append(sequenceA[i:i+1])
+                piecesB.append(gap_char)
+                i += 1
+            else:
+                piecesA.append(gap_char)
+                piecesB.append(sequenceB[j:j+1])
+                j += 1
+        assert (i, j) == ends
+        seqA, seqB = _lpad_until_equal(sequenceA[:starts[0]],
+                                       sequenceB[:starts[1]], gap_char)
+        begin = len(seqA)
+        for piece in piecesA:
+            seqA += piece
+        for piece in piecesB:
+            seqB += piece
+        end = len(seqA)
+        tailA, tailB = _pad_until_equal(sequenceA[ends[0]:],
+                                        sequenceB[ends[1]:], gap_char)
+        seqA += tailA
+        seqB += tailB
+        if self.align_globally:
+            begin, end = 0, len(seqA)
+        return [(seqA, seqB, score, begin, end)]
+
+    def _best_local(self):
+        # Smith-Waterman forward pass, returning the best score, and the
+        # positions of the start and end of the best local alignment.
+        # This tracks where each path started.
+        sequenceA, sequenceB, match_fn = \
+                   self.sequenceA, self.sequenceB, self.match_fn
+        lenB = self.lenB
+        open_A, extend_A = self.open_A, self.extend_A
+        opens, extends = self._col_gaps(0, lenB)
+        width = lenB + 1
+        prevM, prevV, prevH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        curM, curV, curH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        prev_starts = [[None]*width, [None]*width, [None]*width]
+        cur_starts = [[None]*width, [None]*width, [None]*width]
+        best, best_start, best_end = _NEG, None, None
+        for i in range(1, self.lenA + 1):
+            prevM, prevV, prevH, curM, curV, curH = \
+                   curM, curV, curH, prevM, prevV, prevH
+            prev_starts, cur_starts = cur_starts, prev_starts
+            startM, startV, startH = cur_starts
+            lo, hi = self._band(i, 0, lenB)
+            if lo > 0:
+                curM[lo-1] = curV[lo-1] = curH[lo-1] = _NEG
+            if hi < lenB:
+                curM[hi+1] = curV[hi+1] = curH[hi+1] = _NEG
+            if lo == 0:
+                # A local alignment can't start or end with a gap
+                curM[0] = curV[0] = curH[0] = _NEG
+                lo = 1
+            charA = sequenceA[i-1]
+            for j in range(lo, hi + 1):
+                # Match, either extending a path or starting afresh
+                score, start = 0, (i-1, j-1)
+                if prevM[j-1] > score:
+                    score, start = prevM[j-1], prev_starts[0][j-1]
+                if prevV[j-1] > score:
+                    score, start = prevV[j-1], prev_starts[1][j-1]
+                if prevH[j-1] > score:
+                    score, start = prevH[j-1], prev_starts[2][j-1]
+                score += match_fn(charA, sequenceB[j-1])
+                curM[j], startM[j] = score, start
+                if score > best:
+                    best, best_start, best_end = score, start, (i, j)
+                # Gap in sequence B
+                open_score = prevM[j] + opens[j]
+                extend_score = prevV[j] + extends[j]
+                if open_score >= extend_score:
+                    curV[j], startV[j] = open_score, prev_starts[0][j]
+                else:
+                    curV[j], startV[j] = extend_score, prev_starts[1][j]
+                # Gap in sequence A
+                open_score = curM[j-1] + open_A
+                extend_score = curH[j-1] + extend_A
+                if open_score >= extend_score:
+                    curH[j], startH[j] = open_score, startM[j-1]
+                else:
+                    curH[j], startH[j] = extend_score, startH[j-1]
+        return best, best_start, best_end
+
+    def _forward(self, i0, i1, j0, j1, start):
+        # Scores of the best paths from (i0, j0), where the previous step
+        # was of the given type, to (i1, j) for each column j in the block.
+        # Returns three lists of scores, for paths ending with a match, a
+        # gap in B, or a gap in A.
+        sequenceA, sequenceB, match_fn = \
+                   self.sequenceA, self.sequenceB, self.match_fn
+        opens, extends = self._col_gaps(j0, j1)
+        width = j1 - j0 + 1
+        prevM, prevV, prevH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        curM, curV, curH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        # The first row can only have gaps in A
+        [curM, curV, curH][start][0] = 0
+        open_A, extend_A = self._row_gap(i0)
+        lo, hi = self._band(i0, j0, j1)
+        for j in range(j0 + 1, hi + 1):
+            k = j - j0
+            curH[k] = max(curM[k-1] + open_A, curH[k-1] + extend_A)
+        for i in range(i0 + 1, i1 + 1):
+            prevM, prevV, prevH, curM, curV, curH = \
+                   curM, curV, curH, prevM, prevV, prevH
+            open_A, extend_A = self._row_gap(i)
+            lo, hi = self._band(i, j0, j1)
+            charA = sequenceA[i-1]
+            # Values left in these lists from two rows ago are not used,
+            # except just outside the band.
+            if lo > j0:
+                curM[lo-j0-1] = curV[lo-j0-1] = curH[lo-j0-1] = _NEG
+            if hi < j1:
+                curM[hi-j0+1] = curV[hi-j0+1] = curH[hi-j0+1] = _NEG
+            if lo == j0:
+                curM[0] = _NEG
+                curV[0] = max(prevM[0] + opens[0], prevV[0] + extends[0])
+                curH[0] = _NEG
+                lo += 1
+            for k in range(lo - j0, hi - j0 + 1):
+                curM[k] = max(prevM[k-1], prevV[k-1], prevH[k-1]) \
+                          + match_fn(charA, sequenceB[j0+k-1])
+                curV[k] = max(prevM[k] + opens[k], prevV[k] + extends[k])
+                curH[k] = max(curM[k-1] + open_A, curH[k-1] + extend_A)
+        return curM, curV, curH
+
+    def _backward(self, i0, i1, j0, j1, end):
+        # Scores of the best paths from (i0, j) to (i1, j1) ending with a
+        # step of the given type (or any), for each column j in the block.
+        # Returns three lists of scores, where the step before (i0, j) was
+        # a match, a gap in B, or a gap in A.
+        sequenceA, sequenceB, match_fn = \
+                   self.sequenceA, self.sequenceB, self.match_fn
+        opens, extends = self._col_gaps(j0, j1)
+        width = j1 - j0 + 1
+        nextM, nextV, nextH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        curM, curV, curH = [_NEG]*width, [_NEG]*width, [_NEG]*width
+        # The last row can only have gaps in A
+        if end == _ANY:
+            curM[-1] = curV[-1] = curH[-1] = 0
+        else:
+            [curM, curV, curH][end][-1] = 0
+        open_A, extend_A = self._row_gap(i1)
+        lo, hi = self._band(i1, j0, j1)
+        for k in range(j1 - j0 - 1, lo - j0 - 1, -1):
+            curM[k] = curH[k+1] + open_A
+            curH[k] = curH[k+1] + extend_A
+        for i in range(i1 - 1, i0 - 1, -1):
+            nextM, nextV, nextH, curM, curV, curH = \
+                   curM, curV, curH, nextM, nextV, nextH
+            open_A, extend_A = self._row_gap(i)
+            lo, hi = self._band(i, j0, j1)
+            charA = sequenceA[i]
+            if lo > j0:
+                curM[lo-j0-1] = curV[lo-j0-1] = curH[lo-j0-1] = _NEG
+            if hi < j1:
+                curM[hi-j0+1] = curV[hi-j0+1] = curH[hi-j0+1] = _NEG
+            if hi == j1:
+                k = j1 - j0
+                curM[k] = nextV[k] + opens[k]
+                curV[k] = nextV[k] + extends[k]
+                curH[k] = _NEG
+                hi -= 1
+            for k in range(hi - j0, lo - j0 - 1, -1):
+                match = nextM[k+1] + match_fn(charA, sequenceB[j0+k])
+                curM[k] = max(match, nextV[k] + opens[k],
+                              curH[k+1] + open_A)
+                curV[k] = max(match, nextV[k] + extends[k])
+                curH[k] = max(match, curH[k+1] + extend_A)
+        return curM, curV, curH
+
+    def _align(self, i0, i1, j0, j1, start, end):
+        # Returns a list of the steps for the best path from (i0, j0) to
+        # (i1, j1), where the step before (i0, j0) was of type start, and
+        # the last step is of type end (or any).
+        if i1 - i0 < 2 or (i1 - i0 + 1) * (j1 - j0 + 1) <= self.block_size:
+            return self._align_block(i0, i1, j0, j1, start, end)
+        middle = (i0 + i1) // 2
+        forward = self._forward(i0, middle, j0, j1, start)
+        backward = self._backward(middle, i1, j0, j1, end)
+        lo, hi = self._band(middle, j0, j1)
+        best, best_j, best_state = _NEG, None, None
+        for k in range(lo - j0, hi - j0 + 1):
+            for state in [_MATCH, _GAP_B, _GAP_A]:
+                score = forward[state][k] + backward[state][k]
+                if score > best:
+                    best, best_j, best_state = score, j0 + k, state
+        assert best_j is not None, "No path through the band"
+        return self._align(i0, middle, j0, best_j, start, best_state) + \
+               self._align(middle, i1, best_j, j1, best_state, end)
+
+    def _align_block(self, i0, i1, j0, j1, start, end):
+        # Align a small block using a full traceback matrix.
+        sequenceA, sequenceB, match_fn = \
+                   self.sequenceA, self.sequenceB, self.match_fn
+        opens, extends = self._col_gaps(j0, j1)
+        width = j1 - j0 + 1
+        # Each cell has the scores for the three states, followed by the
+        # state of the previous step for each.
+        rows = []
+        for i in range(i0, i1 + 1):
+            open_A, extend_A = self._row_gap(i)
+            lo, hi = self._band(i, j0, j1)
+            row = [None] * width
+            for j in range(j0, j1 + 1):
+                k = j - j0
+                if (i, j) == (i0, j0):
+                    cell = [_NEG, _NEG, _NEG, None, None, None]
+                    cell[start] = 0
+                    row[k] = cell
+                    continue
+                cell = [_NEG, _NEG, _NEG, None, None, None]
+                row[k] = cell
+                if j < lo or j > hi:
+                    continue
+                if i > i0 and k > 0:
+                    prev = rows[-1][k-1]
+                    for state in [_MATCH, _GAP_B, _GAP_A]:
+                        if prev[state] > cell[_MATCH]:
+                            cell[_MATCH], cell[3] = prev[state], state
+                    cell[_MATCH] += match_fn(sequenceA[i-1], sequenceB[j-1])
+                if i > i0:
+                    prev = rows[-1][k]
+                    if prev[_MATCH] + opens[k] >= prev[_GAP_B] + extends[k]:
+                        cell[_GAP_B], cell[4] = prev[_MATCH] + opens[k], _MATCH
+                    else:
+                        cell[_GAP_B], cell[4] = prev[_GAP_B] + extends[k], _GAP_B
+                if k > 0:
+                    prev = row[k-1]
+                    if prev[_MATCH] + open_A >= prev[_GAP_A] + extend_A:
+                        cell[_GAP_A], cell[5] = prev[_MATCH] + open_A, _MATCH
+                    else:
+                        cell[_GAP_A], cell[5] = prev[_GAP_A] + extend_A, _GAP_A
+            rows.append(row)
+        # Now follow the traceback from the end
+        cell = rows[-1][-1]
+        if end == _ANY:
+            state = max([_MATCH, _GAP_B, _GAP_A], key=cell.__getitem__)
+        else:
+            state = end
+        assert cell[state] > _NEG, "No path through the block"
+        steps = []
+        i, j = i1, j1
+        while (i, j) != (i0, j0):
+            steps.append(state)
+            state = rows[i-i0][j-j0][3 + state]
+            if steps[-1] == _MATCH:
+                i -= 1
+                j -= 1
+            elif steps[-1] == _GAP_B:
+                i -= 1
+            else:
+                j -= 1
+        assert state == start
+        steps.reverse()
+        return steps
+
 def _recover_alignments(sequenceA, sequenceB, starts,
                         score_matrix, trace_matrix, align_globally,
                         penalize_end_gaps, gap_char, one_alignment_only):
@@ -791,6 +1323,24 @@ class dictionary_match:
             charB, charA = charA, charB
         return self.score_dict[(charA, charB)]
 
+class _cached_match:
+    """Wrap a match function, remembering the score of each pair (PRIVATE).
+
+    Used when aligning one sequence against many, where looking up the
+    same pairs of residues over and over again in a dictionary_match (with
+    tuple keys, and trying both orders) is relatively slow.
+    """
+    def __init__(self, match_fn):
+        self.match_fn = match_fn
+        self.scores = {}
+    def __call__(self, charA, charB):
+        try:
+            return self.scores[charA][charB]
+        except KeyError:
+            score = self.match_fn(charA, charB)
+            self.scores.setdefault(charA, {})[charB] = score
+            return score
+
 class affine_penalty:
     """affine_penalty(open, extend[, penalize_extend_when_opening]) -> gap_fn
 
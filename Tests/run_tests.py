@@ -76,6 +76,7 @@ DOCTEST_MODULES = [
                    "Bio.AlignIO.StockholmIO",
                    "Bio.Alphabet",
                    "Bio.Application",
+                   "Bio.bgzf",
                    "Bio.Blast.Applications",
                    "Bio.Emboss.Applications",
                    "Bio.GenBank",
@@ -93,6 +94,7 @@ DOCTEST_MODULES = [
                    "Bio.SeqRecord",
                    "Bio.SeqUtils",
                    "Bio.SeqUtils.MeltingTemp",
+                   "Bio.SeqUtils.ORF",
                    "Bio.Sequencing.Applications._Novoalign",
                    "Bio.Wise",
                    "Bio.Wise.psw",
@@ -100,8 +102,14 @@ DOCTEST_MODULES = [
 #Silently ignore any doctests for modules requiring numpy!
 if is_numpy():
     DOCTEST_MODULES.extend(["Bio.Statistics.lowess",
+                            "Bio.PDB.CoordinateStore",
                             "Bio.PDB.Polypeptide",
-                            "Bio.PDB.Selection"
+                            "Bio.PDB.Selection",
+                            "Bio.PDB.StructureLoader",
+                            "Bio.SeqUtils.Kmers",
+                            "Bio.SeqUtils.ProtParam",
+                            "Bio.SeqUtils.SlidingWindow",
+                            "Bio.SubsMat",
                             ])
 
 
@@ -0,0 +1,134 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for the ORF finder in Bio.SeqUtils.ORF."""
+
+import random
+import unittest
+
+from Bio import SeqIO
+from Bio.Seq import Seq, reverse_complement
+from Bio.Alphabet import generic_dna
+from Bio.Data import CodonTable
+from Bio.SeqUtils.ORF import find_orfs, find_orfs_in_records
+
+
+def simple_orfs(seq, table=1, min_length=75, start_codons=None):
+    """Slow but simple reference implementation for a linear sequence."""
+    table = CodonTable.unambiguous_dna_by_id[table]
+    if start_codons is None:
+        start_codons = table.start_codons
+    seq = seq.upper()
+    length = len(seq)
+    answer = []
+    for strand, nuc in [(+1, seq), (-1, reverse_complement(seq))]:
+        for frame in range(3):
+            start = None
+            for i in range(frame, length - 2, 3):
+                codon = nuc[i:i+3]
+                if codon in table.stop_codons:
+                    if start is not None and i + 3 - start >= min_length:
+                        if strand == 1:
+                            answer.append((start, i + 3, strand))
+                        else:
+                            answer.append((length - i - 3, length - start,
+                                           strand))
+                    start = None
+                elif codon in start_codons and start is None:
+                    start = i
+    return sorted(answer)
+
+
+class TestFindOrfs(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(12345)
+
+    def random_seq(self, length):
+        return "".join(random.choice("ACGT") for i in range(length))
+
+    def test_random(self):
+        """Compare find_orfs to a simple implementation."""
+        for length in [0, 1, 2, 3, 10, 100, 1000, 2001]:
+            seq = self.random_seq(length)
+            for table in [1, 2, 11]:
+                for min_length in [0, 30, 75]:
+                    for starts in [None, ["ATG"]]:
+                        expected = simple_orfs(seq, table, min_length, starts)
+                        orfs = list(find_orfs(seq, table, min_length,
+                                              start_codons=starts))
+                        self.assertEqual(sorted(orfs), expected)
+
+    def test_circular(self):
+        """Check ORFs spanning the origin of a circular sequence."""
+        for length in [100, 1000, 1001, 1002]:
+            seq = self.random_seq(length)
+            linear = set(find_orfs(seq, min_length=30))
+            orfs = set(find_orfs(seq, min_length=30, circular=True))
+            #Should find all the stop codons of the linear sequence ORFs,
+            #(but the ORF can start earlier, before the origin):
+            stops = set()
+            for start, end, strand in orfs:
+                if strand == 1:
+                    stops.add((end % length or length, strand))
+                else:
+                    stops.add((start, strand))
+            for start, end, strand in linear:
+                if strand == 1:
+                    self.assertTrue((end, strand) in stops)
+                else:
+                    self.assertTrue((start, strand) in stops)
+            for shift in [1, 57, length // 2]:
+                #Rotating the sequence should give the same ORFs
+                shifted = seq[shift:] + seq[:shift]
+                rotated = set()
+                for start, end, strand in find_orfs(shifted, min_length=30,
+                                                    circular=True):
+                    new_start = (start + shift) % length
+                    rotated.add((new_start, new_start + end - start, strand))
+                self.assertEqual(orfs, rotated)
+            for start, end, strand in orfs:
+                self.assertTrue(0 <= start < length)
+                self.assertTrue(start < end <= start + length)
+                orf = (seq + seq)[start:end]
+                if strand == -1:
+                    orf = reverse_complement(orf)
+                protein = str(Seq(orf, generic_dna).translate())
+                self.assertEqual(protein.find("*"), len(protein) - 1)
+
+    def test_rna_and_case(self):
+        """ORFs in RNA or lower case sequences."""
+        seq = self.random_seq(500)
+        expected = list(find_orfs(seq, min_length=30))
+        self.assertTrue(expected)
+        self.assertEqual(expected, list(find_orfs(seq.lower(), min_length=30)))
+        self.assertEqual(expected, list(find_orfs(seq.replace("T", "U"),
+                                                  min_length=30)))
+        self.assertEqual(expected, list(find_orfs(Seq(seq, generic_dna),
+                                                  min_length=30)))
+
+    def test_records(self):
+        """Find ORFs in several records, with and without workers."""
+        filename = "GenBank/NC_005816.fna"
+        record = SeqIO.read(filename, "fasta")
+        expected = list(find_orfs(record.seq, table=11, circular=True))
+        records = list(SeqIO.parse("Fasta/f002", "fasta")) + [record]
+        results = list(find_orfs_in_records(records, table=11, min_length=60))
+        self.assertEqual(len(results), len(records))
+        for workers in [2, 3]:
+            answer = list(find_orfs_in_records(iter(records), table=11,
+                                               min_length=60, workers=workers))
+            self.assertEqual(results, answer)
+        answer = list(find_orfs_in_records([record],
+                                           CodonTable.unambiguous_dna_by_id[11],
+                                           circular=True, workers=2))
+        self.assertEqual(answer, [(record, expected)])
+        self.assertRaises(ValueError, list,
+                          find_orfs_in_records(records, workers=0))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity = 2)
+    unittest.main(testRunner=runner)
@@ -9,7 +9,10 @@
 # as part of this package.
 
 """Unit tests for the Bio.PDB module."""
+import gzip
 import os
+import pickle
+import shutil
 import tempfile
 import unittest
 import warnings
@@ -29,7 +32,13 @@ from Bio.Alphabet import generic_protein
 from Bio.PDB import PDBParser, PPBuilder, CaPPBuilder, PDBIO
 from Bio.PDB import HSExposureCA, HSExposureCB, ExposureCN
 from Bio.PDB.PDBExceptions import PDBConstructionException, PDBConstructionWarning
-from Bio.PDB import rotmat, Vector
+from Bio.PDB import rotmat, Vector, Superimposer
+from Bio.PDB.Atom import Atom
+from Bio.PDB.CoordinateStore import get_coords
+from Bio.PDB.StructureBuilder import StructureBuilder
+from Bio.PDB.PDBList import PDBList
+from Bio.PDB.StructureLoader import CompactStructure, StructureCache, \
+        StructureLoader
 
 # NB: the 'A_' prefix ensures this test case is run first
 class A_ExceptionTest(unittest.TestCase):
@@ -888,6 +897,354 @@ class CopyTests(unittest.TestCase):
             self.assertFalse(e.get_list()[0] is ee.get_list()[0])
 
 
+class FastParseTests(unittest.TestCase):
+    """Bulk parsing of the coordinates gives the same as line by line."""
+
+    def parse(self, handle, fast):
+        parser = PDBParser(PERMISSIVE=True)
+        if not fast:
+            parser._parse_coordinates_fast = lambda coords_trailer: None
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            structure = parser.get_structure("X", handle)
+        atoms = []
+        for model in structure:
+            for chain in model:
+                for residue in chain.get_list():
+                    for atom in residue.get_unpacked_list():
+                        atoms.append((atom.get_full_id(), atom.get_fullname(),
+                                      list(atom.get_coord()),
+                                      atom.get_bfactor(), atom.get_occupancy(),
+                                      atom.element, atom.get_serial_number(),
+                                      atom.is_disordered(),
+                                      residue.get_resname(),
+                                      residue.get_segid(),
+                                      str(atom.get_anisou())))
+        return (atoms, [str(w.message) for w in caught],
+                parser.line_counter, parser.get_trailer())
+
+    def compare(self, filename=None, data=None):
+        if data is not None:
+            fast = self.parse(StringIO(data), True)
+            slow = self.parse(StringIO(data), False)
+        else:
+            fast = self.parse(filename, True)
+            slow = self.parse(filename, False)
+        self.assertEqual(fast, slow)
+        self.assertTrue(fast[0])
+
+    def test_files(self):
+        """Parse the test PDB files both ways."""
+        for filename in ["PDB/1A8O.pdb", "PDB/1MOT.pdb", "PDB/2BEG.pdb",
+                         "PDB/a_structure.pdb", "PDB/ions.pdb"]:
+            self.compare(filename)
+
+    def test_records(self):
+        """Models, ANISOU records, altlocs and invalid fields."""
+        atom = "ATOM      1  N   MET A   1      11.104   6.134  -6.504  1.00  0.00           N\n"
+        other = "ATOM      2  CA  MET A   1      11.639   6.071  -5.147  1.00  0.00           C\n"
+        anisou = "ANISOU    2  CA  MET A   1     1140   1214   1072     -9    167     19       C\n"
+        water = "HETATM    3  O   HOH A 101      1.000   2.000   3.000  1.00 20.00           O\n"
+        data = ("MODEL        1\n" + atom + other + anisou + "ENDMDL\n"
+                "MODEL        2\nENDMDL\n"
+                + atom.replace(" N   MET", " N  AMET")
+                + atom.replace(" N   MET", " N  BMET")
+                + water + "END\nJUNK\n")
+        self.compare(data=data)
+        # Missing B factor, only handled line by line
+        self.compare(data=atom + other.replace("1.00  0.00", "1.00      "))
+
+    def test_builder_subclass(self):
+        """Subclasses overriding only init_atom still get every atom."""
+        class CAOnlyBuilder(StructureBuilder):
+            def init_atom(self, name, *args):
+                if name == "CA":
+                    StructureBuilder.init_atom(self, name, *args)
+
+        class BulkBuilder(CAOnlyBuilder):
+            def init_atoms(self, names, *args):
+                self.bulk_calls = getattr(self, "bulk_calls", 0) + 1
+                return StructureBuilder.init_atoms(self, names, *args)
+
+        self.assertTrue(StructureBuilder()._init_atoms_supported())
+        self.assertFalse(CAOnlyBuilder()._init_atoms_supported())
+        self.assertTrue(BulkBuilder()._init_atoms_supported())
+        builder = CAOnlyBuilder()
+        parser = PDBParser(structure_builder=builder)
+        structure = parser.get_structure("X", "PDB/1A8O.pdb")
+        atoms = list(structure.get_atoms())
+        self.assertEqual(len(atoms), 70)
+        self.assertEqual(set(a.get_id() for a in atoms), set(["CA"]))
+        # Also when rebuilding a CompactStructure
+        compact = CompactStructure.from_structure(
+            PDBParser().get_structure("X", "PDB/1A8O.pdb"))
+        structure = compact.to_structure(CAOnlyBuilder())
+        self.assertEqual(len(list(structure.get_atoms())), 70)
+        # Overriding init_atoms too keeps the bulk parsing
+        builder = BulkBuilder()
+        structure = PDBParser(structure_builder=builder).get_structure(
+            "X", "PDB/1A8O.pdb")
+        self.assertTrue(builder.bulk_calls > 0)
+        self.assertEqual(len(list(structure.get_atoms())), 644)
+
+
+class CoordinateStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', PDBConstructionWarning)
+        try:
+            self.s = PDBParser(PERMISSIVE=True).get_structure(
+                'X', "PDB/a_structure.pdb")
+        finally:
+            warnings.filters.pop()
+        self.store = self.s.coordinate_store
+        self.atoms = self.store.atoms
+
+    def test_columns(self):
+        """Atoms are views of the rows of the store."""
+        store = self.store
+        self.assertEqual(store.coord.shape, (len(self.atoms), 3))
+        for i, atom in enumerate(self.atoms):
+            self.assertEqual(atom._index, i)
+            self.assertEqual(list(atom.get_coord()), list(store.coord[i]))
+            self.assertEqual(atom.get_bfactor(), store.bfactor[i])
+            self.assertEqual(atom.get_occupancy(), store.occupancy[i])
+            self.assertEqual(atom.element, store.element[i])
+            self.assertEqual(atom.get_serial_number(), store.serial_number[i])
+        atom = self.atoms[3]
+        atom.get_coord()[0] = 99.0
+        atom.set_bfactor(12.5)
+        self.assertEqual(store.coord[3, 0], 99.0)
+        self.assertEqual(store.bfactor[3], 12.5)
+        store.coord[3] = (1, 2, 3)
+        self.assertEqual(list(atom.get_coord()), [1, 2, 3])
+        atom.set_serial_number(None)
+        self.assertEqual(atom.get_serial_number(), None)
+        self.assertEqual(store.serial_number[3], -1)
+
+    def test_coord_stays_linked(self):
+        """Coordinates taken from an atom stay linked to the store."""
+        store = self.store
+        atom = self.atoms[3]
+        coord = atom.get_coord()
+        coord[0] = 99.0
+        self.assertEqual(store.coord[3, 0], 99.0)
+        atom.set_coord((1, 2, 3))
+        self.assertEqual(list(coord), [1, 2, 3])
+        atom.transform(numpy.identity(3), numpy.array((1.0, 0.0, 0.0)))
+        self.assertEqual(list(store.coord[3]), [2, 2, 3])
+        # Growing the store moves the atoms to the new array
+        store.trim()
+        extra = Atom("CA", numpy.array((4.0, 5.0, 6.0)), 1.0, 1.0, " ",
+                     " CA ", 1, "C")
+        store.add(extra)
+        self.assertEqual(list(atom.get_coord()), [2, 2, 3])
+        self.assertEqual(list(store.coord[-1]), [4, 5, 6])
+        atom.get_coord()[0] = 7.0
+        extra.get_coord()[0] = 8.0
+        self.assertEqual(list(store.coord[3]), [7, 2, 3])
+        self.assertEqual(list(store.coord[-1]), [8, 5, 6])
+        # An atom given another array no longer uses the store
+        atom.coord = numpy.zeros(3)
+        self.assertEqual(store._indices([atom]), None)
+        self.s.transform(numpy.identity(3), numpy.array((1.0, 0.0, 0.0)))
+        self.assertEqual(list(atom.get_coord()), [1, 0, 0])
+        self.assertEqual(list(store.coord[3]), [7, 2, 3])
+
+    def test_select(self):
+        """Select atoms with masks on the arrays."""
+        store = self.store
+        carbons = store.select(store.element == "C")
+        self.assertEqual(carbons,
+                         [a for a in self.atoms if a.element == "C"])
+        center = self.atoms[0].get_coord()
+        near = store.search(center, 5.0)
+        self.assertEqual(near,
+                         [a for a in self.atoms if a - self.atoms[0] <= 5.0])
+        self.assertEqual(store.select([2, 0]), [self.atoms[2], self.atoms[0]])
+
+    def test_transform(self):
+        """Structure transform moves every atom, including altlocs."""
+        rotation = rotmat(Vector(1,3,5), Vector(1,0,0))
+        translation = numpy.array((2.4,0,1), 'f')
+        old = self.store.coord.copy()
+        self.s.transform(rotation, translation)
+        expected = numpy.dot(old, rotation) + translation
+        # Rows of atoms which were rejected (e.g. duplicates) do not move
+        used = numpy.zeros(len(self.store), bool)
+        for chain in self.s.get_chains():
+            for residue in chain.get_unpacked_list():
+                for atom in residue.get_unpacked_list():
+                    used[atom._index] = True
+        self.assertTrue(used[:2].all() and not used.all())
+        expected[~used] = old[~used]
+        self.assertTrue(numpy.allclose(self.store.coord, expected))
+        # Only some of the atoms
+        self.store.transform(rotation, translation, [0, 1])
+        self.assertTrue(numpy.allclose(self.store.coord[2:], expected[2:]))
+        self.assertFalse(numpy.allclose(self.store.coord[:2], expected[:2]))
+
+    def test_transform_moved_chain(self):
+        """Transforming only moves the atoms in the structure."""
+        s1 = PDBParser(PERMISSIVE=True).get_structure("X", "PDB/1A8O.pdb")
+        s2 = PDBParser(PERMISSIVE=True).get_structure("Y", "PDB/1A8O.pdb")
+        chain = s2[0]["A"]
+        s2[0].detach_child("A")
+        chain.id = "B"
+        s1[0].add(chain)
+        old1 = [a.get_coord().copy() for a in s1.get_atoms()]
+        old2 = chain.get_atoms().next().get_coord().copy()
+        tran = numpy.array((10.0, 0.0, 0.0))
+        s2.transform(numpy.identity(3), tran)
+        self.assertTrue(numpy.all(chain.get_atoms().next().get_coord()
+                                  == old2))
+        s1.transform(numpy.identity(3), tran)
+        new1 = [a.get_coord() for a in s1.get_atoms()]
+        self.assertEqual(len(new1), 2 * 644)
+        for old, new in zip(old1, new1):
+            self.assertTrue(numpy.allclose(new, old + tran))
+
+    def test_superimposer(self):
+        """Superimposer using the store's arrays."""
+        moving = list(self.s.get_atoms())
+        fixed = [a.copy() for a in moving]
+        rotation = rotmat(Vector(1,3,5), Vector(1,0,0))
+        self.s.transform(rotation, numpy.array((1.0, 2.0, 3.0)))
+        self.assertTrue(numpy.allclose(get_coords(fixed),
+                                       [a.get_coord() for a in fixed]))
+        sup = Superimposer()
+        sup.set_atoms(fixed, moving)
+        sup.apply(moving)
+        self.assertAlmostEqual(sup.rms, 0.0, places=3)
+        for a, b in zip(fixed, moving):
+            self.assertTrue(a - b < 0.001)
+
+    def test_copy_and_pickle(self):
+        """Copies are independent of the store, pickles keep it."""
+        atom = self.atoms[0]
+        other = atom.copy()
+        self.assertEqual(other._store, None)
+        other.get_coord()[0] += 1.0
+        other.set_bfactor(-1.0)
+        self.assertNotEqual(atom.get_coord()[0], other.get_coord()[0])
+        self.assertNotEqual(atom.get_bfactor(), -1.0)
+        self.assertEqual(self.s.copy().coordinate_store, None)
+        s = pickle.loads(pickle.dumps(self.s, pickle.HIGHEST_PROTOCOL))
+        store = s.coordinate_store
+        self.assertTrue(numpy.all(store.coord == self.store.coord))
+        atoms = list(s.get_atoms())
+        self.assertTrue(atoms[0]._store is store)
+        atoms[0].set_coord(numpy.zeros(3))
+        self.assertEqual(list(store.coord[atoms[0]._index]), [0, 0, 0])
+        atoms[1].get_coord()[:] = 1.0
+        self.assertEqual(list(store.coord[atoms[1]._index]), [1, 1, 1])
+        self.assertFalse(store._indices(atoms) is None)
+
+
+class StructureLoaderTests(unittest.TestCase):
+    """Loading structures in bulk as CompactStructure objects."""
+
+    def setUp(self):
+        self.tree = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tree, "a8"))
+        handle = gzip.open(os.path.join(self.tree, "a8", "pdb1a8o.ent.gz"),
+                           "wb")
+        handle.write(open("PDB/1A8O.pdb", "rb").read())
+        handle.close()
+        shutil.copy("PDB/2BEG.pdb", os.path.join(self.tree, "pdb2beg.ent"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tree)
+
+    def unpacked_atoms(self, structure):
+        return [a for c in structure.get_chains()
+                for r in c.get_unpacked_list()
+                for a in r.get_unpacked_list()]
+
+    def assertSameStructure(self, s1, s2):
+        atoms1 = self.unpacked_atoms(s1)
+        atoms2 = self.unpacked_atoms(s2)
+        self.assertEqual(len(atoms1), len(atoms2))
+        for a, b in zip(atoms1, atoms2):
+            self.assertEqual(a.get_full_id(), b.get_full_id())
+            self.assertEqual(a.get_parent().get_resname(),
+                             b.get_parent().get_resname())
+            self.assertEqual(a.get_fullname(), b.get_fullname())
+            self.assertEqual(a.get_altloc(), b.get_altloc())
+            self.assertTrue(numpy.all(a.get_coord() == b.get_coord()))
+            self.assertEqual(a.get_bfactor(), b.get_bfactor())
+            self.assertEqual(a.get_occupancy(), b.get_occupancy())
+            self.assertEqual(a.element, b.element)
+            self.assertEqual(a.get_serial_number(), b.get_serial_number())
+            for name in ("anisou", "siguij", "sigatm"):
+                x = getattr(a, name + "_array")
+                y = getattr(b, name + "_array")
+                self.assertEqual(x is None, y is None)
+                if x is not None:
+                    self.assertTrue(numpy.all(x == y))
+        self.assertEqual(s1.header, s2.header)
+
+    def test_round_trip(self):
+        """CompactStructure rebuilds the same structure, also pickled."""
+        warnings.simplefilter("ignore", PDBConstructionWarning)
+        try:
+            for filename in ("PDB/1A8O.pdb", "PDB/2BEG.pdb",
+                             "PDB/a_structure.pdb"):
+                s = PDBParser(PERMISSIVE=True).get_structure("x", filename)
+                compact = CompactStructure.from_structure(s)
+                self.assertEqual(len(compact), len(self.unpacked_atoms(s)))
+                compact = pickle.loads(pickle.dumps(compact,
+                                                    pickle.HIGHEST_PROTOCOL))
+                self.assertSameStructure(s, compact.to_structure())
+        finally:
+            warnings.filters.pop()
+
+    def test_resolve(self):
+        """Finding files for PDB codes in a local PDB tree."""
+        loader = StructureLoader(pdb_list=PDBList(pdb=self.tree))
+        self.assertEqual(loader.resolve("1A8O"),
+                         ("1a8o", os.path.join(self.tree, "a8",
+                                               "pdb1a8o.ent.gz")))
+        self.assertEqual(loader.resolve("2beg"),
+                         ("2beg", os.path.join(self.tree, "pdb2beg.ent")))
+        self.assertEqual(loader.resolve("PDB/1MOT.pdb"),
+                         ("1MOT", "PDB/1MOT.pdb"))
+        self.assertRaises(ValueError, loader.resolve, "9xyz")
+        self.assertRaises(ValueError, StructureLoader().resolve, "1a8o")
+
+    def test_get_structures(self):
+        """Loading several structures, with and without worker processes."""
+        for workers in (1, 2):
+            loader = StructureLoader(pdb_list=PDBList(pdb=self.tree),
+                                     workers=workers)
+            structures = loader.get_structures(["1a8o", "2BEG", "1A8O",
+                                                "PDB/1A8O.pdb"])
+            self.assertEqual([s.id for s in structures],
+                             ["1a8o", "2beg", "1a8o", "1A8O"])
+            self.assertEqual([len(s) for s in structures],
+                             [644, 1855, 644, 644])
+            self.assertTrue(structures[0] is structures[2])
+            self.assertEqual(len(loader.cache), 3)
+            self.assertTrue(loader.get_structure("2beg") is structures[1])
+
+    def test_cache(self):
+        """Least recently used entries are dropped from the cache."""
+        cache = StructureCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache["a"], 1)
+        cache["c"] = 3
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertTrue("c" in cache)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        cache = StructureCache(0)
+        cache["a"] = 1
+        self.assertFalse("a" in cache)
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity=2)
     unittest.main(testRunner=runner)
@@ -0,0 +1,98 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for the protein_properties and protein_scales functions."""
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SeqUtils.ProtParam.protein_properties.")
+
+import math
+import random
+import unittest
+
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from Bio.SeqUtils import ProtParamData
+from Bio.SeqUtils.ProtParam import ProteinAnalysis, protein_properties, \
+     protein_scales, PROPERTIES
+
+random.seed(42)
+sequences = ["".join(random.choice("ACDEFGHIKLMNPQRSTVWY")
+                     for i in range(random.randint(1, 60)))
+             for j in range(50)]
+sequences.extend(["K", "D", "MAEGEITTFTALTEKFNLPPGNYKKPKLLYCSNGGHFLRILPDGTVDGTRDRSDQHIQLQLSAESVGEVYIKSTETGQYLAMDTDGLLYGSQTPNEECLFLERLEENHYNTYISKKHAEKNWFVGLKKNGSCKRGPRTHYGQKAILFLPLPV"])
+
+
+class ProteinPropertiesTests(unittest.TestCase):
+
+    def test_properties(self):
+        """All properties match the ProteinAnalysis methods."""
+        table = protein_properties(sequences)
+        self.assertEqual(sorted(table), sorted(PROPERTIES))
+        for i, sequence in enumerate(sequences):
+            analysis = ProteinAnalysis(sequence)
+            helix, turn, sheet = analysis.secondary_structure_fraction()
+            expected = {"length": analysis.length,
+                        "molecular_weight": analysis.molecular_weight(),
+                        "aromaticity": analysis.aromaticity(),
+                        "instability_index": analysis.instability_index(),
+                        "gravy": analysis.gravy(),
+                        "isoelectric_point": analysis.isoelectric_point(),
+                        "helix_fraction": helix,
+                        "turn_fraction": turn,
+                        "sheet_fraction": sheet}
+            for name in PROPERTIES:
+                self.assertAlmostEqual(table[name][i], expected[name])
+
+    def test_composition(self):
+        """Composition counts and sequence types."""
+        table = protein_properties([Seq("ACCA"), SeqRecord(Seq("wwy"))],
+                                   ["composition", "aromaticity"])
+        analysis = ProteinAnalysis("ACCA")
+        counts = analysis.count_amino_acids()
+        self.assertEqual(table["composition"][0].tolist(),
+                         [counts[aa] for aa in "ACDEFGHIKLMNPQRSTVWY"])
+        self.assertEqual(table["composition"][1].sum(), 3)
+        self.assertEqual(table["aromaticity"].tolist(), [0.0, 1.0])
+
+    def test_flexibility(self):
+        """Flexibility profiles match the ProteinAnalysis method."""
+        profiles = protein_properties(sequences, ["flexibility"])["flexibility"]
+        for sequence, profile in zip(sequences, profiles):
+            expected = ProteinAnalysis(sequence).flexibility()
+            self.assertEqual(len(profile), len(expected))
+            for value, exp in zip(profile, expected):
+                self.assertAlmostEqual(value, exp)
+
+    def test_scales(self):
+        """Scale profiles match the ProteinAnalysis method."""
+        for window, edge in [(9, 1.0), (5, 0.4), (6, 0.5)]:
+            profiles = protein_scales(sequences, ProtParamData.kd, window, edge)
+            for sequence, profile in zip(sequences, profiles):
+                expected = ProteinAnalysis(sequence).protein_scale(
+                    ProtParamData.kd, window, edge)
+                self.assertEqual(len(profile), len(expected))
+                for value, exp in zip(profile, expected):
+                    self.assertAlmostEqual(value, exp)
+
+    def test_nonstandard(self):
+        """Non-standard amino acids and empty sequences."""
+        table = protein_properties(["ACXD", "", "ACD"])
+        self.assertTrue(math.isnan(table["molecular_weight"][0]))
+        self.assertTrue(math.isnan(table["gravy"][0]))
+        self.assertTrue(math.isnan(table["isoelectric_point"][1]))
+        self.assertAlmostEqual(table["isoelectric_point"][2],
+                               ProteinAnalysis("ACD").isoelectric_point())
+        table = protein_properties([], ["length", "isoelectric_point"])
+        self.assertEqual(len(table["isoelectric_point"]), 0)
+        self.assertRaises(ValueError, protein_properties, ["ACD"], ["charge"])
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -1,6 +1,7 @@
 """Testing code for Restriction enzyme classes of Biopython.
 """
 
+import random
 import unittest
 
 from Bio.Restriction import *
@@ -40,6 +41,15 @@ class SimpleEnzyme(unittest.TestCase):
         locations = EcoRI.search(parts[0], linear = False)
         self.assertEqual(locations, [1])
 
+    def test_compsite(self):
+        """Check the recognition site regular expression.
+        """
+        self.assertEqual(EcoRI.compsite.pattern,
+                         "(?P<EcoRI>GAATTC)|(?P<EcoRI_as>GAATTC)")
+        self.assertEqual(EcoRI.compsite.search(" GAATTC").group("EcoRI"),
+                         "GAATTC")
+        self.assertTrue(EcoRI.compsite is EcoRI.compsite)
+
 
 class EnzymeComparison(unittest.TestCase):
     """Tests for comparing various enzymes.
@@ -109,6 +119,32 @@ class RestrictionBatches(unittest.TestCase):
         self.assertEqual(hits[EcoRV], [8])
         self.assertEqual(hits[EcoRI], [16])
 
+    def test_batch_search_all(self):
+        """Single pass batch search agrees with individual enzyme searches.
+        """
+        random.seed(1960)
+        for length, letters in [(3000, "ACGT"), (2000, "ACGTN"),
+                                (500, "ACGTRYWSN"), (20, "ACGT"), (2, "GC")]:
+            seq = Seq("".join(random.choice(letters) for i in range(length)),
+                      IUPACAmbiguousDNA())
+            for linear in [True, False]:
+                batch = RestrictionBatch(AllEnzymes)
+                hits = batch.search(seq, linear)
+                self.assertEqual(len(hits), len(AllEnzymes))
+                for enzyme in AllEnzymes:
+                    self.assertEqual(hits[enzyme], enzyme.search(seq, linear),
+                                     "%s %s" % (enzyme, linear))
+        #Check results from a FormattedSeq, and sites across the origin
+        seq = Seq(EcoRI.site[3:] + "AAAA" + EcoRV.site + "AAAA" + EcoRI.site[:3],
+                  IUPACAmbiguousDNA())
+        batch = RestrictionBatch([EcoRV, EcoRI, BsaI])
+        hits = batch.search(FormattedSeq(seq, linear=False))
+        self.assertEqual(hits[EcoRV], [11])
+        self.assertEqual(hits[EcoRI], [19])
+        hits = batch.search(FormattedSeq(seq, linear=True))
+        self.assertEqual(hits[EcoRV], [11])
+        self.assertEqual(hits[EcoRI], [])
+
 
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
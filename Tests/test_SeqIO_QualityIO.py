@@ -15,6 +15,12 @@ try:
 except ImportError:
     BytesIO = StringIO
 
+try:
+    import numpy
+except ImportError:
+    #Only needed for the optional quality_array tests
+    numpy = None
+
 from Bio import BiopythonWarning
 from Bio.Alphabet import generic_dna
 from Bio.SeqIO import QualityIO
@@ -712,6 +718,181 @@ class MappingTests(unittest.TestCase):
                          expected_phred)
 
 
+class TestFastqBatch(unittest.TestCase):
+    """Reading and writing FASTQ files in batches of reads."""
+    def check(self, filename, max_reads, max_bases=None):
+        handle = open(filename, "rU")
+        expected = list(QualityIO.FastqGeneralIterator(handle))
+        handle.close()
+        handle = open(filename, "rU")
+        batches = list(QualityIO.FastqBatchIterator(handle, max_reads,
+                                                    max_bases))
+        handle.close()
+        self.assertEqual(expected, [read for batch in batches
+                                    for read in batch])
+        for batch in batches[:-1]:
+            if max_bases:
+                self.assertTrue(len(batch) == max_reads or \
+                                sum(batch.lengths()) >= max_bases)
+            else:
+                self.assertEqual(len(batch), max_reads)
+        for batch in batches:
+            self.assertEqual(list(batch), [batch[i] for i in range(len(batch))])
+        #Write them back, and compare with the SeqRecord based writer
+        #(which removes any line wrapping and repeated titles)
+        out_handle = StringIO()
+        self.assertEqual(len(expected),
+                         QualityIO.write_fastq_batches(batches, out_handle))
+        handle = open(filename, "rU")
+        self.assertEqual(out_handle.getvalue(),
+                         "".join(r.format("fastq")
+                                 for r in SeqIO.parse(handle, "fastq")))
+        handle.close()
+
+    def test_example(self):
+        """Batches from example.fastq"""
+        for max_reads in [1, 2, 3, 4]:
+            self.check("Quality/example.fastq", max_reads)
+        self.check("Quality/example.fastq", 10, 30)
+
+    def test_tricky(self):
+        """Batches from tricky.fastq"""
+        self.check("Quality/tricky.fastq", 2)
+        self.check("Quality/tricky.fastq", 100, 50)
+
+    def test_wrapped(self):
+        """Batches from a line wrapped FASTQ file"""
+        self.check("Quality/wrapping_original_sanger.fastq", 2)
+
+    def test_empty(self):
+        """Batches from an empty file"""
+        batches = list(QualityIO.FastqBatchIterator(StringIO("")))
+        self.assertEqual(batches, [])
+        out_handle = StringIO()
+        self.assertEqual(0, QualityIO.write_fastq_batches(batches, out_handle))
+        self.assertEqual("", out_handle.getvalue())
+
+    def test_subset(self):
+        """Selecting reads from a batch"""
+        handle = open("Quality/tricky.fastq", "rU")
+        batch = QualityIO.FastqBatchIterator(handle).next()
+        handle.close()
+        reads = list(batch)
+        wanted = [len(seq) > 35 for title, seq, qual in reads]
+        subset = batch.subset(wanted)
+        self.assertEqual(list(subset),
+                         [r for r, w in zip(reads, wanted) if w])
+        self.assertEqual(list(batch.subset([3, 1])), [reads[3], reads[1]])
+        self.assertEqual(list(batch.subset([])), [])
+        self.assertEqual(list(batch.subset([-1, -len(reads)])),
+                         [reads[-1], reads[0]])
+        self.assertRaises(IndexError, batch.subset, [len(reads)])
+        self.assertRaises(IndexError, batch.subset, [-len(reads) - 1])
+
+    def test_negative_index(self):
+        """Negative read indices count from the end of the batch"""
+        handle = open("Quality/tricky.fastq", "rU")
+        batch = QualityIO.FastqBatchIterator(handle).next()
+        handle.close()
+        reads = list(batch)
+        self.assertEqual(batch[-1], reads[-1])
+        self.assertEqual(batch[-len(reads)], reads[0])
+        self.assertRaises(IndexError, batch.__getitem__, len(reads))
+        self.assertRaises(IndexError, batch.__getitem__, -len(reads) - 1)
+
+    def test_bad_batch(self):
+        """Inconsistent batch columns"""
+        self.assertRaises(ValueError, QualityIO.FastqBatch,
+                          ["a", "b"], "ACGT", "!!!!", [0, 4])
+        self.assertRaises(ValueError, QualityIO.FastqBatch,
+                          ["a"], "ACGT", "!!!", [0, 4])
+        self.assertRaises(ValueError, QualityIO.FastqBatch,
+                          ["a"], "ACGT", "!!!!", [0, 3])
+        self.assertRaises(ValueError, QualityIO.FastqBatchIterator(
+                          StringIO(""), max_reads=0).next)
+
+
+if numpy is not None:
+    class TestQualityArray(unittest.TestCase):
+        """Parsing FASTQ qualities as NumPy arrays."""
+        iterators = {"fastq-sanger" : QualityIO.FastqPhredIterator,
+                     "fastq-solexa" : QualityIO.FastqSolexaIterator,
+                     "fastq-illumina" : QualityIO.FastqIlluminaIterator}
+
+        def check(self, filename, format):
+            handle = open(filename, "rU")
+            records = list(SeqIO.parse(handle, format))
+            handle.close()
+            handle = open(filename, "rU")
+            arrays = list(self.iterators[format](handle, quality_array=True))
+            handle.close()
+            self.assertEqual(len(records), len(arrays))
+            for old, new in zip(records, arrays):
+                self.assertEqual(old.id, new.id)
+                self.assertEqual(str(old.seq), str(new.seq))
+                for key, value in old.letter_annotations.iteritems():
+                    new_value = new.letter_annotations[key]
+                    self.assertTrue(isinstance(new_value, numpy.ndarray))
+                    self.assertEqual(value, list(new_value))
+                #Writing them out should give the same output
+                for out_format in ["fastq-sanger", "fastq-solexa",
+                                   "fastq-illumina", "qual"]:
+                    warnings.simplefilter("ignore", BiopythonWarning)
+                    try:
+                        self.assertEqual(old.format(out_format),
+                                         new.format(out_format))
+                    finally:
+                        warnings.filters.pop()
+                #Slicing and adding records should work as with lists
+                self.assertEqual((new[:5] + new[5:]).format(format),
+                                 old.format(format))
+
+        def test_sanger(self):
+            """Sanger FASTQ qualities as arrays"""
+            self.check("Quality/sanger_93.fastq", "fastq-sanger")
+            self.check("Quality/example.fastq", "fastq-sanger")
+
+        def test_solexa(self):
+            """Solexa FASTQ qualities as arrays"""
+            self.check("Quality/solexa_faked.fastq", "fastq-solexa")
+
+        def test_illumina(self):
+            """Illumina 1.3+ FASTQ qualities as arrays"""
+            self.check("Quality/illumina_faked.fastq", "fastq-illumina")
+
+        def test_invalid(self):
+            """Invalid qualities are rejected when parsing as arrays"""
+            data = "@Test\nACGT\n+\n%s\n"
+            for format, bad in [("fastq-sanger", "AA A"),
+                                ("fastq-solexa", "AA:A"),
+                                ("fastq-illumina", "hh?h")]:
+                records = self.iterators[format](StringIO(data % bad),
+                                                 quality_array=True)
+                self.assertRaises(ValueError, records.next)
+
+        def test_batch(self):
+            """Batch quality scores as one array"""
+            handle = open("Quality/tricky.fastq", "rU")
+            batch = QualityIO.FastqBatchIterator(handle).next()
+            handle.close()
+            handle = open("Quality/tricky.fastq", "rU")
+            records = list(SeqIO.parse(handle, "fastq"))
+            handle.close()
+            scores = batch.quality_array()
+            self.assertEqual(len(scores), len(batch.sequences))
+            totals = numpy.add.reduceat(scores, batch.offsets[:-1])
+            self.assertEqual(list(totals),
+                             [sum(r.letter_annotations["phred_quality"])
+                              for r in records])
+            #Filter on mean quality
+            means = totals / numpy.asarray(batch.lengths(), float)
+            subset = batch.subset(means > 30)
+            self.assertEqual(subset.titles,
+                             [r.description for r, m in zip(records, means)
+                              if m > 30])
+            self.assertTrue(0 < len(subset) < len(batch))
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
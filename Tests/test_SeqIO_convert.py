@@ -10,10 +10,17 @@ import warnings
 from Bio.Seq import UnknownSeq
 from Bio import SeqIO
 from Bio.SeqIO import QualityIO
+from Bio.SeqIO import _convert
 from Bio.SeqIO._convert import _converter as converter_dict
 from StringIO import StringIO
 from Bio.Alphabet import generic_protein, generic_nucleotide, generic_dna
 
+try:
+    import multiprocessing
+except ImportError:
+    #Python 2.5
+    multiprocessing = None
+
 #TODO - share this with the QualityIO tests...
 def truncation_expected(format):
     if format in ["fastq-solexa", "fastq-illumina"]:
@@ -231,6 +238,91 @@ for filename, format, alphabet in tests:
     del funct
 
 
+if multiprocessing:
+    class ParallelConvertTests(unittest.TestCase):
+        """Converting files using several processes."""
+        def setUp(self):
+            #Use tiny chunks to test splitting up our small example files
+            self.old_chunk_size = _convert._CHUNK_SIZE
+            _convert._CHUNK_SIZE = 100
+
+        def tearDown(self):
+            _convert._CHUNK_SIZE = self.old_chunk_size
+
+        def check(self, filename, in_format, out_format, alphabet=None):
+            serial = StringIO()
+            parallel = StringIO()
+            warnings.simplefilter('ignore', UserWarning)
+            try:
+                count = SeqIO.convert(filename, in_format, serial, out_format,
+                                      alphabet)
+                self.assertEqual(count,
+                                 SeqIO.convert(filename, in_format, parallel,
+                                               out_format, alphabet, workers=3))
+            finally:
+                warnings.filters.pop()
+            self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+        def check_chunks(self, filename, format):
+            handle = open(filename, "rU")
+            data = handle.read()
+            handle.close()
+            if format.startswith("fastq"):
+                chunks = list(_convert._split_fastq(StringIO(data), 100))
+            else:
+                chunks = list(_convert._split_at_markers(StringIO(data),
+                              _convert._SplitMarkers[format], 100))
+            self.assertEqual(data, "".join(chunks))
+            self.assertTrue(len(chunks) > 1)
+            expected = [r.id for r in SeqIO.parse(StringIO(data), format)]
+            ids = [r.id for chunk in chunks
+                   for r in SeqIO.parse(StringIO(chunk), format)]
+            self.assertEqual(expected, ids)
+
+        def test_chunks(self):
+            """Split files into chunks of whole records."""
+            self.check_chunks("Quality/tricky.fastq", "fastq")
+            self.check_chunks("Quality/wrapping_original_sanger.fastq", "fastq")
+            self.check_chunks("GenBank/cor6_6.gb", "gb")
+            self.check_chunks("GenBank/NC_005816.ffn", "fasta")
+            self.check_chunks("EMBL/epo_prt_selection.embl", "embl")
+
+        def test_fastq(self):
+            """Convert FASTQ files using several processes."""
+            for out_format in ["fastq", "fastq-solexa", "fastq-illumina",
+                               "fasta", "qual", "tab"]:
+                self.check("Quality/tricky.fastq", "fastq", out_format)
+                self.check("Quality/wrapping_original_sanger.fastq", "fastq",
+                           out_format)
+            self.check("Quality/solexa_faked.fastq", "fastq-solexa", "fastq")
+
+        def test_genbank(self):
+            """Convert GenBank and EMBL files using several processes."""
+            self.check("GenBank/NC_005816.gb", "gb", "fasta")
+            self.check("GenBank/cor6_6.gb", "genbank", "embl")
+            self.check("EMBL/epo_prt_selection.embl", "embl", "fasta")
+
+        def test_fasta(self):
+            """Convert a FASTA file using several processes."""
+            self.check("GenBank/NC_005816.ffn", "fasta", "tab", generic_dna)
+
+        def test_serial_fallback(self):
+            """Formats which can't be split are converted as usual."""
+            self.check("GenBank/NC_005816.ffn", "fasta", "seqxml", generic_dna)
+            self.check("Roche/greek.sff", "sff", "fasta")
+
+        def test_errors(self):
+            """Conversion errors in a worker process are raised."""
+            for filename in ["Quality/error_qual_null.fastq",
+                             "Quality/error_short_qual.fastq"]:
+                self.assertRaises(ValueError, SeqIO.convert, filename,
+                                  "fastq", StringIO(), "fastq-solexa",
+                                  workers=2)
+            self.assertRaises(ValueError, SeqIO.convert,
+                              "Quality/example.fastq", "fastq", StringIO(),
+                              "fasta", workers=0)
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
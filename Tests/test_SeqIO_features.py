@@ -1157,6 +1157,56 @@ class TestWriteRead(unittest.TestCase):
         write_read(os.path.join("EMBL", "U87107.embl"), "embl")
 
 
+class TestLazyFeatures(unittest.TestCase):
+    """Test the genbank-lazy and embl-lazy parsers match the normal ones."""
+    def check(self, filename, format):
+        old_records = list(SeqIO.parse(filename, format))
+        new_records = list(SeqIO.parse(filename, format + "-lazy"))
+        self.assertEqual(len(old_records), len(new_records))
+        for old, new in zip(old_records, new_records):
+            #Feature table is not parsed until needed
+            self.assertTrue(new._feature_table is not None or not old.features)
+            self.assertEqual(old.id, new.id)
+            self.assertEqual(str(old.seq), str(new.seq))
+            self.assertEqual(len(old.features), len(new.features))
+            self.assertEqual(new._feature_table, None)
+            compare_features(old.features, new.features)
+        compare_records(old_records, new_records)
+
+    def test_genbank(self):
+        """Lazy parsing of NC_005816.gb"""
+        self.check(os.path.join("GenBank", "NC_005816.gb"), "genbank")
+
+    def test_genbank_multiple(self):
+        """Lazy parsing of cor6_6.gb"""
+        self.check(os.path.join("GenBank", "cor6_6.gb"), "genbank")
+
+    def test_embl(self):
+        """Lazy parsing of AE017046.embl"""
+        self.check(os.path.join("EMBL", "AE017046.embl"), "embl")
+
+    def test_embl_multiple(self):
+        """Lazy parsing of epo_prt_selection.embl"""
+        self.check(os.path.join("EMBL", "epo_prt_selection.embl"), "embl")
+
+    def test_set_features(self):
+        """Replacing the features of a lazy record"""
+        record = SeqIO.read(os.path.join("GenBank", "NC_005816.gb"),
+                            "genbank-lazy")
+        record.features = []
+        self.assertEqual(record.features, [])
+        self.assertEqual(record._feature_table, None)
+
+    def test_index(self):
+        """Indexing with genbank-lazy"""
+        filename = os.path.join("GenBank", "cor6_6.gb")
+        old = SeqIO.index(filename, "genbank")
+        new = SeqIO.index(filename, "genbank-lazy")
+        self.assertEqual(sorted(old), sorted(new))
+        for key in old:
+            compare_record(old[key], new[key])
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
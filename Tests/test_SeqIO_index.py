@@ -13,6 +13,7 @@ except ImportError:
     sqlite3 = None
 
 import os
+import gzip
 import unittest
 from StringIO import StringIO
 try:
@@ -23,8 +24,15 @@ except ImportError:
 from Bio._py3k import _as_bytes, _bytes_to_string
 
 
+try:
+    import multiprocessing
+except ImportError:
+    #Python 2.5
+    multiprocessing = None
+
 from Bio.SeqRecord import SeqRecord
 from Bio import SeqIO
+from Bio.SeqIO import _index
 from Bio.SeqIO._index import _FormatToRandomAccess
 from Bio.Alphabet import generic_protein, generic_nucleotide, generic_dna
 
@@ -78,6 +86,169 @@ if sqlite3:
 
 
 
+if sqlite3 and multiprocessing:
+    class ParallelIndexTest(unittest.TestCase):
+        """Building an index_db using several processes."""
+        def setUp(self):
+            #Use tiny chunks to test splitting up our small example files
+            self.old_chunk_size = _index._MIN_CHUNK_SIZE
+            _index._MIN_CHUNK_SIZE = 200
+
+        def tearDown(self):
+            _index._MIN_CHUNK_SIZE = self.old_chunk_size
+
+        def check(self, filenames, format, key_function=None):
+            serial = SeqIO.index_db(":memory:", filenames, format,
+                                    key_function=key_function)
+            parallel = SeqIO.index_db(":memory:", filenames, format,
+                                      key_function=key_function, workers=3)
+            sql = "SELECT key, file_number, offset, length FROM offset_data;"
+            self.assertEqual(sorted(serial._con.execute(sql).fetchall()),
+                             sorted(parallel._con.execute(sql).fetchall()))
+            self.assertEqual(len(serial), len(parallel))
+            for key in serial:
+                self.assertEqual(serial.get_raw(key), parallel.get_raw(key))
+            serial.close()
+            parallel.close()
+
+        def test_chunk_starts(self):
+            """Split a FASTQ file into chunks at record boundaries."""
+            starts = _index._chunk_starts("Quality/tricky.fastq", "fastq", 2)
+            self.assertTrue(len(starts) > 2)
+            self.assertEqual(0, starts[0])
+            self.assertEqual(os.path.getsize("Quality/tricky.fastq"),
+                             starts[-1])
+            proxy = _FormatToRandomAccess["fastq"]("Quality/tricky.fastq",
+                                                   "fastq", None)
+            offsets = [offset for key, offset, length in proxy]
+            proxy._handle.close()
+            for start in starts[:-1]:
+                self.assertTrue(start in offsets, start)
+
+        def test_fasta(self):
+            """Index several FASTA files using several processes."""
+            self.check(["GenBank/NC_000932.faa", "GenBank/NC_005816.faa",
+                        "GenBank/NC_005816.ffn"], "fasta")
+
+        def test_fasta_key_function(self):
+            """Index a FASTA file using several processes and a key function."""
+            self.check(["GenBank/NC_000932.faa"], "fasta", add_prefix)
+
+        def test_fastq(self):
+            """Index FASTQ files using several processes."""
+            self.check(["Quality/tricky.fastq", "Quality/example.fastq",
+                        "Quality/longreads_as_sanger.fastq"], "fastq")
+
+        def test_fastq_wrapped(self):
+            """Index a line wrapped FASTQ file using several processes."""
+            self.check(["Quality/wrapping_original_sanger.fastq"], "fastq")
+
+        def test_genbank(self):
+            """Index GenBank files using several processes."""
+            self.check(["GenBank/NC_005816.gb", "GenBank/cor6_6.gb"], "gb")
+
+        def test_sff(self):
+            """Index SFF files using several processes."""
+            self.check(["Roche/E3MFGYR02_no_manifest.sff", "Roche/greek.sff",
+                        "Roche/paired.sff"], "sff")
+
+        def test_duplicates(self):
+            """Index file with duplicate identifers using several processes."""
+            self.assertRaises(ValueError, SeqIO.index_db, ":memory:",
+                              ["Fasta/dups.fasta"], "fasta", workers=2)
+
+
+class IndexBgzfTests(unittest.TestCase):
+    """Indexing BGZF compressed files."""
+    def check(self, filename, format):
+        """Compare the compressed file index with the uncompressed one."""
+        plain = SeqIO.index(filename, format)
+        id_list = list(plain)
+        for options in [{}, {"use_mmap": True}, {"compact": True}]:
+            rec_dict = SeqIO.index(filename + ".bgz", format, **options)
+            self.assertEqual(len(plain), len(rec_dict))
+            self.assertEqual(set(id_list), set(rec_dict))
+            for key in id_list:
+                self.assertEqual(plain.get_raw(key), rec_dict.get_raw(key))
+                self.assertTrue(compare_record(plain[key], rec_dict[key]))
+            keys = id_list[::-1]
+            self.assertEqual([plain.get_raw(key) for key in keys],
+                             list(rec_dict.get_raw_many(keys)))
+            rec_dict._proxy._handle.close() #TODO - Better solution
+        if sqlite3:
+            rec_dict = SeqIO.index_db(":memory:", [filename + ".bgz"], format)
+            self.assertEqual(len(plain), len(rec_dict))
+            for key in id_list:
+                self.assertEqual(plain.get_raw(key), rec_dict.get_raw(key))
+            rec_dict.close()
+        if sqlite3 and multiprocessing:
+            rec_dict = SeqIO.index_db(":memory:", [filename + ".bgz"], format,
+                                      workers=2)
+            self.assertEqual(len(plain), len(rec_dict))
+            for key in id_list:
+                self.assertEqual(plain.get_raw(key), rec_dict.get_raw(key))
+            rec_dict.close()
+        plain._proxy._handle.close()
+
+    def test_fasta(self):
+        """Index a BGZF compressed FASTA file."""
+        self.check("GenBank/NC_005816.fna", "fasta")
+
+    def test_fastq(self):
+        """Index a BGZF compressed FASTQ file."""
+        self.check("Quality/example.fastq", "fastq")
+
+    def test_genbank(self):
+        """Index a BGZF compressed GenBank file (spanning several blocks)."""
+        self.check("GenBank/NC_000932.gb", "gb")
+
+    def test_uniprot_xml(self):
+        """Index a BGZF compressed UniProt XML file."""
+        self.check("SwissProt/multi_ex.xml", "uniprot-xml")
+
+    def test_cache(self):
+        """Index a BGZF compressed file with an offset cache file."""
+        filename = "GenBank/NC_000932.gb.bgz"
+        cache_tmp = filename + ".idx"
+        if os.path.isfile(cache_tmp):
+            os.remove(cache_tmp)
+        plain = SeqIO.index("GenBank/NC_000932.gb", "gb")
+        for attempt in range(2):
+            rec_dict = SeqIO.index(filename, "gb", cache_filename=cache_tmp)
+            for key in plain:
+                self.assertEqual(plain.get_raw(key), rec_dict.get_raw(key))
+            rec_dict._proxy._handle.close()
+        plain._proxy._handle.close()
+        os.remove(cache_tmp)
+
+    def test_plain_gzip(self):
+        """Plain GZIP compressed files cannot be indexed."""
+        filename = "Quality/example.fastq.gz"
+        data = open("Quality/example.fastq", "rb").read()
+        handle = gzip.open(filename, "wb")
+        handle.write(data)
+        handle.close()
+        try:
+            self.assertRaises(ValueError, SeqIO.index, filename, "fastq")
+            if sqlite3:
+                self.assertRaises(ValueError, SeqIO.index_db, ":memory:",
+                                  [filename], "fastq")
+        finally:
+            os.remove(filename)
+
+    def test_sff(self):
+        """BGZF compressed SFF files are not supported."""
+        filename = "Roche/greek.sff.bgz"
+        from Bio import bgzf
+        handle = bgzf.BgzfWriter(filename, "wb")
+        handle.write(open("Roche/greek.sff", "rb").read())
+        handle.close()
+        try:
+            self.assertRaises(ValueError, SeqIO.index, filename, "sff")
+        finally:
+            os.remove(filename)
+
+
 class IndexDictTests(unittest.TestCase):
     """Cunning unit test where methods are added at run time."""
     def simple_check(self, filename, format, alphabet):
@@ -203,6 +374,18 @@ class IndexDictTests(unittest.TestCase):
             pass
         self.assertEqual(rec_dict.get(chr(0)), None)
         self.assertEqual(rec_dict.get(chr(0), chr(1)), chr(1))
+        #Check bulk retrieval, with the keys in a different order
+        wanted = list(reversed(keys)) + keys[:1]
+        wanted_ids = list(reversed(ids)) + ids[:1]
+        records = list(rec_dict.get_many(wanted))
+        self.assertEqual(wanted_ids, [rec.id for rec in records])
+        try:
+            raws = list(rec_dict.get_raw_many(wanted))
+        except NotImplementedError:
+            pass
+        else:
+            self.assertEqual([rec_dict.get_raw(key) for key in wanted], raws)
+        self.assertRaises(KeyError, list, rec_dict.get_many(keys[:1] + [chr(0)]))
         if hasattr(dict, "iteritems"):
             #Python 2.x
             for key, rec in rec_dict.iteritems():
@@ -292,6 +475,178 @@ class IndexDictTests(unittest.TestCase):
         rec_dict._proxy._handle.close() #TODO - Better solution
         del rec_dict
 
+    def mmap_check(self, filename, format, alphabet):
+        """Check indexing via a memory map matches using a file handle."""
+        rec_dict = SeqIO.index(filename, format, alphabet)
+        mmap_dict = SeqIO.index(filename, format, alphabet, use_mmap=True)
+        self.assertTrue(repr(mmap_dict).endswith("use_mmap=True)"))
+        self.assertEqual(set(rec_dict.keys()), set(mmap_dict.keys()))
+        for key in rec_dict:
+            self.assertEqual(True, compare_record(rec_dict[key],
+                                                  mmap_dict[key]))
+            try:
+                raw = rec_dict.get_raw(key)
+            except NotImplementedError:
+                continue
+            self.assertEqual(raw, mmap_dict.get_raw(key))
+        rec_dict._proxy._handle.close() #TODO - Better solution
+        mmap_dict._proxy._handle.close()
+        del rec_dict, mmap_dict
+
+        if not sqlite3:
+            return
+
+        id_list = [rec.id for rec in SeqIO.parse(filename, format, alphabet)]
+        rec_dict = SeqIO.index_db(":memory:", [filename], format, alphabet,
+                                  use_mmap=True)
+        self.assertTrue(repr(rec_dict).endswith("use_mmap=True)"))
+        self.check_dict_methods(rec_dict, id_list, id_list)
+        rec_dict.close()
+        del rec_dict
+
+    def cache_check(self, filename, format, alphabet):
+        """Check indexing with an offset cache file."""
+        id_list = [rec.id for rec in SeqIO.parse(filename, format, alphabet)]
+        key_list = [add_prefix(id) for id in id_list]
+        cache_tmp = filename + ".cache.idx"
+        if os.path.isfile(cache_tmp):
+            os.remove(cache_tmp)
+
+        #Create the cache file,
+        rec_dict = SeqIO.index(filename, format, alphabet, add_prefix,
+                               cache_filename=cache_tmp)
+        self.assertTrue(os.path.isfile(cache_tmp))
+        self.check_dict_methods(rec_dict, key_list, id_list)
+        rec_dict._proxy._handle.close() #TODO - Better solution
+        del rec_dict
+
+        #Now reuse it, which must not scan the file again
+        proxy_class = _FormatToRandomAccess[format]
+        scan = proxy_class.__iter__
+        def no_scan(proxy):
+            raise AssertionError("Should not rescan %s" % filename)
+        proxy_class.__iter__ = no_scan
+        try:
+            rec_dict = SeqIO.index(filename, format, alphabet, add_prefix,
+                                   cache_filename=cache_tmp)
+        finally:
+            proxy_class.__iter__ = scan
+        self.check_dict_methods(rec_dict, key_list, id_list)
+        self.assertEqual(sorted(key_list), list(rec_dict))
+        rec_dict._proxy._handle.close()
+        del rec_dict
+        os.remove(cache_tmp)
+
+    def compact_check(self, filename, format, alphabet):
+        """Check indexing with the compact key and offset store."""
+        id_list = [rec.id for rec in SeqIO.parse(filename, format, alphabet)]
+        key_list = [add_prefix(id) for id in id_list]
+        rec_dict = SeqIO.index(filename, format, alphabet, add_prefix)
+        compact_dict = SeqIO.index(filename, format, alphabet, add_prefix,
+                                   compact=True)
+        self.check_dict_methods(compact_dict, key_list, id_list)
+        self.assertEqual(sorted(key_list), list(compact_dict))
+        for key in key_list:
+            try:
+                raw = rec_dict.get_raw(key)
+            except NotImplementedError:
+                continue
+            self.assertEqual(raw, compact_dict.get_raw(key))
+        rec_dict._proxy._handle.close() #TODO - Better solution
+        compact_dict._proxy._handle.close()
+        del rec_dict, compact_dict
+
+    def test_sort_offsets_runs(self):
+        """Sort keys and offsets in several runs."""
+        entries = [("k%03i" % (i * 37 % 101), i, i + 1) for i in range(101)]
+        keys, ends, offsets, lengths = _index._sort_offsets(entries, 10)
+        store = _index._SortedOffsets(keys, ends, offsets, lengths)
+        self.assertEqual(sorted(k for k, o, l in entries), list(store))
+        for key, offset, length in entries:
+            self.assertEqual(offset, store[key])
+            self.assertEqual((offset, length), store.offset_and_length(key))
+        self.assertFalse("k101" in store)
+        self.assertFalse("" in store)
+        self.assertFalse(None in store)
+        self.assertRaises(KeyError, store.__getitem__, "k")
+        #Duplicates in different runs,
+        self.assertRaises(ValueError, _index._sort_offsets,
+                          entries + [("k050", 0, 0)], 10)
+        #Empty,
+        store = _index._SortedOffsets(*_index._sort_offsets([]))
+        self.assertEqual(0, len(store))
+        self.assertFalse("k" in store)
+
+    def test_compact_bad_keys(self):
+        """The compact key and offset store requires string keys."""
+        self.assertRaises(TypeError, SeqIO.index, "Quality/example.fastq",
+                          "fastq", key_function=len, compact=True)
+
+    def test_duplicates_index_compact(self):
+        """Index file with duplicate identifers with the compact store"""
+        self.assertRaises(ValueError, SeqIO.index, "Fasta/dups.fasta",
+                          "fasta", compact=True)
+
+    def test_cache_stale(self):
+        """Rebuild an offset cache file when the indexed file changes."""
+        filename = "Quality/example.fastq.tmp"
+        cache_tmp = filename + ".idx"
+        handle = open("Quality/example.fastq", "rb")
+        data = handle.read()
+        handle.close()
+        handle = open(filename, "wb")
+        handle.write(data)
+        handle.close()
+        rec_dict = SeqIO.index(filename, "fastq", cache_filename=cache_tmp)
+        self.assertEqual(3, len(rec_dict))
+        rec_dict._proxy._handle.close()
+        del rec_dict
+        #Now drop the first record
+        handle = open(filename, "wb")
+        handle.write(data[data.index(_as_bytes("@EAS54_6_R1_2_1_540_792")):])
+        handle.close()
+        rec_dict = SeqIO.index(filename, "fastq", cache_filename=cache_tmp)
+        self.assertEqual(2, len(rec_dict))
+        self.assertFalse("EAS54_6_R1_2_1_413_324" in rec_dict)
+        self.assertEqual("EAS54_6_R1_2_1_443_348",
+                         rec_dict["EAS54_6_R1_2_1_443_348"].id)
+        rec_dict._proxy._handle.close()
+        del rec_dict
+        os.remove(cache_tmp)
+        os.remove(filename)
+
+    def test_cache_key_function(self):
+        """Rebuild an offset cache file when the key function changes."""
+        filename = "Quality/example.fastq"
+        cache_tmp = filename + ".idx"
+        ids = ["EAS54_6_R1_2_1_413_324", "EAS54_6_R1_2_1_443_348",
+               "EAS54_6_R1_2_1_540_792"]
+        for key_function, keys in [(None, ids),
+                                   (add_prefix, [add_prefix(k) for k in ids]),
+                                   (lambda k: k.lower(), [k.lower() for k in ids]),
+                                   (lambda k: k[-3:], [k[-3:] for k in ids]),
+                                   (None, ids)]:
+            rec_dict = SeqIO.index(filename, "fastq", key_function=key_function,
+                                   cache_filename=cache_tmp)
+            self.assertEqual(sorted(keys), list(rec_dict))
+            rec_dict._proxy._handle.close()
+            del rec_dict
+        os.remove(cache_tmp)
+
+    def test_cache_bad_keys(self):
+        """Offset cache files require string keys."""
+        cache_tmp = "Quality/example.fastq.idx"
+        self.assertRaises(TypeError, SeqIO.index, "Quality/example.fastq",
+                          "fastq", key_function=len, cache_filename=cache_tmp)
+        self.assertFalse(os.path.isfile(cache_tmp))
+
+    def test_duplicates_index_cache(self):
+        """Index file with duplicate identifers with an offset cache file"""
+        cache_tmp = "Fasta/dups.fasta.idx"
+        self.assertRaises(ValueError, SeqIO.index, "Fasta/dups.fasta",
+                          "fasta", cache_filename=cache_tmp)
+        self.assertFalse(os.path.isfile(cache_tmp))
+
     if sqlite3:
         def test_duplicates_index_db(self):
             """Index file with duplicate identifers with Bio.SeqIO.index_db()"""
@@ -391,6 +746,33 @@ for filename, format, alphabet in tests:
             funct(filename, format, alphabet))
     del funct
 
+    def funct(fn,fmt,alpha):
+        f = lambda x : x.cache_check(fn, fmt, alpha)
+        f.__doc__ = "Index %s file %s with offset cache file" % (fmt, fn)
+        return f
+    setattr(IndexDictTests, "test_%s_%s_cache" \
+            % (filename.replace("/","_").replace(".","_"), format),
+            funct(filename, format, alphabet))
+    del funct
+
+    def funct(fn,fmt,alpha):
+        f = lambda x : x.compact_check(fn, fmt, alpha)
+        f.__doc__ = "Index %s file %s with compact store" % (fmt, fn)
+        return f
+    setattr(IndexDictTests, "test_%s_%s_compact" \
+            % (filename.replace("/","_").replace(".","_"), format),
+            funct(filename, format, alphabet))
+    del funct
+
+    def funct(fn,fmt,alpha):
+        f = lambda x : x.mmap_check(fn, fmt, alpha)
+        f.__doc__ = "Index %s file %s with memory map" % (fmt, fn)
+        return f
+    setattr(IndexDictTests, "test_%s_%s_mmap" \
+            % (filename.replace("/","_").replace(".","_"), format),
+            funct(filename, format, alphabet))
+    del funct
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -138,3 +138,21 @@ for i, seq_str in enumerate(examples):
         #Finally check it works with a MutableSeq object
         assert value == checksum(MutableSeq(seq_str, single_letter_alphabet))
 
+
+##############
+# six_frames #
+##############
+
+from Bio.SeqUtils import six_frames
+from Bio.Seq import translate, reverse_complement
+for seq_str in ["ATGCGTATCGATCGCGATACGATTAGGCGGAT",
+                "ATGGCCATTGTAATGGGCCGCTGANNNTARCTAG",
+                "auggccauuguaaugggccgcuga", "AC", ""]:
+    for table in [1, 2, "Vertebrate Mitochondrial"]:
+        frames = six_frames(seq_str, table)
+        assert frames == six_frames(Seq(seq_str), table)
+        rc_str = reverse_complement(seq_str)
+        for i in range(3):
+            assert frames[i + 1] == translate(seq_str[i:], table)
+            assert frames[-(i + 1)] == translate(rc_str[i:], table)
+assert six_frames("ATGTAG", stop_symbol="@")[1] == "M@"
@@ -0,0 +1,124 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.SeqUtils.Kmers."""
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SeqUtils.Kmers.")
+
+import unittest
+from StringIO import StringIO
+
+from Bio import SeqIO
+from Bio.Seq import Seq, reverse_complement
+from Bio.SeqUtils import Kmers
+from Bio.SeqUtils.Kmers import KmerCounts, count_kmers, load, \
+     encode_kmer, decode_kmer
+
+
+def simple_counts(sequences, k, canonical=False):
+    counts = {}
+    for sequence in sequences:
+        sequence = str(sequence).upper()
+        for i in range(len(sequence) - k + 1):
+            kmer = sequence[i:i+k]
+            if kmer.strip("ACGT"):
+                continue
+            if canonical:
+                kmer = min(kmer, reverse_complement(kmer))
+            counts[kmer] = counts.get(kmer, 0) + 1
+    return sorted(counts.items())
+
+
+class KmerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sequences = [str(record.seq) for record in
+                          SeqIO.parse("Quality/example.fastq", "fastq")]
+
+    def test_codes(self):
+        """Encoding and decoding k-mers."""
+        for kmer in ["A", "T", "ACGT", "T" * 31, "GATTACA" * 4]:
+            self.assertEqual(decode_kmer(encode_kmer(kmer), len(kmer)), kmer)
+        self.assertEqual(encode_kmer("acgt"), encode_kmer("ACGT"))
+        self.assertEqual(encode_kmer("T" * 31), 4 ** 31 - 1)
+        self.assertRaises(ValueError, encode_kmer, "ACNT")
+        self.assertRaises(ValueError, encode_kmer, "A" * 32)
+        self.assertRaises(ValueError, KmerCounts, 32)
+
+    def test_counts(self):
+        """Counting k-mers, compared to using strings."""
+        for k in [1, 4, 12, 31]:
+            for canonical in [False, True]:
+                kmers = KmerCounts(k, canonical)
+                kmers.update(self.sequences)
+                expected = simple_counts(self.sequences, k, canonical)
+                self.assertEqual(kmers.items(), expected)
+                self.assertEqual(len(kmers), len(expected))
+                self.assertEqual(kmers.total(),
+                                 sum(count for kmer, count in expected))
+
+    def test_lookup(self):
+        """Looking up single k-mers."""
+        kmers = KmerCounts(4, canonical=True)
+        kmers.add(Seq("AAAACCCCTTTT"))
+        self.assertEqual(kmers["AAAA"], 2)
+        self.assertEqual(kmers["TTTT"], 2)
+        self.assertEqual(kmers["GGTT"], 1)
+        self.assertEqual(kmers["ACGT"], 0)
+        self.assertTrue("AACC" in kmers)
+        self.assertFalse("ACGT" in kmers)
+        self.assertRaises(ValueError, kmers.__getitem__, "AAA")
+
+    def test_batches(self):
+        """Long sequences and small batches give the same counts."""
+        old = Kmers._BATCH_SIZE
+        try:
+            Kmers._BATCH_SIZE = 10
+            kmers = KmerCounts(5)
+            kmers.update(self.sequences + ["".join(self.sequences)])
+        finally:
+            Kmers._BATCH_SIZE = old
+        expected = simple_counts(self.sequences + ["".join(self.sequences)], 5)
+        self.assertEqual(kmers.items(), expected)
+        self.assertEqual(count_kmers(self.sequences, 5, batch_size=50).items(),
+                         simple_counts(self.sequences, 5))
+
+    def test_count_file(self):
+        """Counting k-mers in a file, with and without worker processes."""
+        expected = simple_counts(self.sequences, 7, True)
+        for workers in [1, 2]:
+            kmers = count_kmers("Quality/example.fastq", 7, "fastq",
+                                canonical=True, workers=workers,
+                                batch_size=100)
+            self.assertEqual(kmers.items(), expected)
+        records = SeqIO.parse("Quality/example.fastq", "fastq")
+        self.assertEqual(count_kmers(records, 7, canonical=True).items(),
+                         expected)
+
+    def test_dump_load_merge(self):
+        """Saving, loading and merging counts."""
+        kmers = count_kmers(self.sequences, 6)
+        handle = StringIO()
+        kmers.dump(handle)
+        handle.seek(0)
+        loaded = load(handle)
+        self.assertEqual(loaded.k, 6)
+        self.assertEqual(loaded.items(), kmers.items())
+        loaded.merge(kmers)
+        self.assertEqual(loaded.items(),
+                         [(kmer, 2 * count) for kmer, count in kmers.items()])
+        self.assertRaises(ValueError, loaded.merge, KmerCounts(5))
+        self.assertRaises(ValueError, load, StringIO("ACGT\n"))
+        self.assertRaises(ValueError, load, StringIO(handle.getvalue()[:-3]))
+        self.assertEqual(kmers.most_common(1), [("GGGGGG", 2)])
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
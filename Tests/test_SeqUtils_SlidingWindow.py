@@ -0,0 +1,99 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.SeqUtils.SlidingWindow."""
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SeqUtils.SlidingWindow.")
+
+import math
+import unittest
+
+from Bio.Seq import Seq
+from Bio.SeqUtils import GC, GC_skew
+from Bio.SeqUtils.lcc import lcc_simp, lcc_mult
+from Bio.SeqUtils.SlidingWindow import WindowCounter, window_stats, \
+     gc_content, gc_skew, lcc, entropy
+
+seq = "ACGTTGCAAGCTSNNACGTAGGGCCCATTATAcgtagctagGCTAGCATGCAAACCCGGGTTT"
+
+
+def chunked(sequence, size):
+    return (sequence[i:i+size] for i in range(0, len(sequence), size))
+
+
+class SlidingWindowTests(unittest.TestCase):
+
+    def test_gc(self):
+        """GC content of each window, compared to GC."""
+        for window, step in [(1, 1), (10, 1), (10, 7), (16, 20)]:
+            values = gc_content(seq, window, step)
+            expected = [GC(seq[i:i+window])
+                        for i in range(0, len(seq) - window + 1, step)]
+            self.assertEqual(len(values), len(expected))
+            for value, exp in zip(values, expected):
+                self.assertAlmostEqual(value, exp)
+
+    def test_gc_skew(self):
+        """GC skew in non-overlapping windows, compared to GC_skew."""
+        values = gc_skew(seq, 16, 16)
+        #GC_skew also has a shorter final window
+        expected = GC_skew(seq, 16)[:len(values)]
+        self.assertEqual(len(values), len(seq) // 16)
+        for value, exp in zip(values, expected):
+            self.assertAlmostEqual(value, exp)
+        self.assertTrue(math.isnan(gc_skew("AATTAA", 3)[0]))
+
+    def test_lcc(self):
+        """Local composition complexity, compared to lcc_simp and lcc_mult."""
+        dna = seq.upper().replace("N", "A").replace("S", "C")
+        values = lcc(dna, 20)
+        for i, value in enumerate(values):
+            self.assertAlmostEqual(value, lcc_simp(dna[i:i+20]))
+        for value, exp in zip(values, lcc_mult(dna, 20)[1:]):
+            self.assertAlmostEqual(value, exp)
+
+    def test_entropy(self):
+        """Shannon entropy of k-mers."""
+        self.assertEqual(entropy("AAAAAAAA", 4).tolist(), [0.0] * 5)
+        self.assertEqual(entropy("ACGTACGT", 4).tolist(), [2.0] * 5)
+        #AC, CG and GT twice each, and TA once
+        self.assertAlmostEqual(entropy("ACGTACGT", 8, k=2)[0],
+                               - 6/7. * math.log(2/7.) / math.log(2)
+                               - 1/7. * math.log(1/7.) / math.log(2))
+        self.assertTrue(math.isnan(entropy("ACNNNNT", 4, k=2)[2]))
+
+    def test_chunks(self):
+        """Same results from chunks of any size, or a Seq object."""
+        expected = window_stats(seq, 12, 5, k=3)
+        for chunks in [Seq(seq), chunked(seq, 1), chunked(seq, 7),
+                       chunked(seq, 100), iter([])]:
+            stats = window_stats(chunks, 12, 5, k=3)
+            if isinstance(chunks, Seq) or len(stats["start"]):
+                self.assertEqual(sorted(stats), sorted(expected))
+                for name in expected:
+                    self.assertEqual(str(stats[name]), str(expected[name]))
+            else:
+                self.assertEqual(len(stats["gc"]), 0)
+
+    def test_counter(self):
+        """Incremental updates only return completed windows."""
+        counter = WindowCounter(5, 3, tracks=["gc"])
+        self.assertEqual(counter.update("ACG")["start"].tolist(), [])
+        self.assertEqual(counter.update("TTTTG")["start"].tolist(), [0, 3])
+        self.assertEqual(counter.update("C")["start"].tolist(), [])
+        stats = counter.update("CC")
+        self.assertEqual(stats["start"].tolist(), [6])
+        self.assertEqual(stats["gc"].tolist(), [80.0])
+        self.assertRaises(ValueError, WindowCounter, 5, tracks=["at"])
+        self.assertRaises(ValueError, WindowCounter, 5, k=6)
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -16,7 +16,7 @@ from Bio.Alphabet import generic_protein, generic_nucleotide, \
 from Bio.Alphabet.IUPAC import protein, extended_protein
 from Bio.Alphabet.IUPAC import unambiguous_dna, ambiguous_dna, ambiguous_rna
 from Bio.Data.IUPACData import ambiguous_dna_values, ambiguous_rna_values
-from Bio.Seq import Seq, UnknownSeq, MutableSeq, translate
+from Bio.Seq import Seq, UnknownSeq, MutableSeq, BufferSeq, PackedSeq, translate
 from Bio.Data.CodonTable import TranslationError, CodonTable
 
 #This is just the standard table with less stop codons
@@ -86,6 +86,17 @@ class StringMethodTests(unittest.TestCase):
         UnknownSeq(10, generic_protein, "X"),
         UnknownSeq(10, character="X"),
         UnknownSeq(10),
+        BufferSeq("ACGTGGGGT", generic_dna),
+        BufferSeq("ACGUGGGGU", generic_rna),
+        BufferSeq(">header\nACGTGGGGT\n", generic_nucleotide, 8, 17),
+        BufferSeq("ACGTGGGGT", generic_protein)[1:-3],
+        PackedSeq("ACGTGGGGT", generic_dna),
+        PackedSeq("ACGTGGGGT", generic_nucleotide)[2:7],
+        PackedSeq("GG", generic_dna),
+        PackedSeq("T", generic_dna),
+        BufferSeq("ACGTGGGGTC", generic_dna).reverse_complement(),
+        BufferSeq("ACGUGGGGU", generic_rna).reverse_complement()[1:],
+        PackedSeq("ACGTGGGGTC", generic_dna).reverse_complement()[2:-1],
         ]
     for seq in _examples[:]:
         if isinstance(seq, Seq):
@@ -489,6 +500,28 @@ class StringMethodTests(unittest.TestCase):
                 except TranslationError :
                     pass
 
+    def test_the_translation_of_invalid_codons_after_stop(self):
+        """Check obj.translate(to_stop=True) ignores invalid codons after a stop."""
+        for codon in ["TA?", "N-N", "AC_", "Ac_"]:
+            nuc = Seq("ATGGCCTAG" + codon, generic_dna)
+            self.assertEqual(str(nuc.translate(to_stop=True)), "MA")
+            self.assertRaises(TranslationError, nuc.translate)
+            nuc = Seq("ATG" + codon + "TAG", generic_dna)
+            self.assertRaises(TranslationError, nuc.translate, to_stop=True)
+
+    def test_the_translation_of_codons_outside_alphabet(self):
+        """Check obj.translate() copes with X and N in codons as before."""
+        for alphabet in [generic_dna, ambiguous_dna]:
+            for nuc, protein in [("ACX", "T"), ("XGU", "X"), ("ACGACX", "TT"),
+                                 ("ACN", "T"), ("NNN", "X"), ("TAN", "X"),
+                                 ("ATGACXTAGXGT", "MT*X")]:
+                self.assertEqual(str(Seq(nuc, alphabet).translate()), protein)
+                self.assertEqual(translate(nuc), protein)
+            nuc = Seq("ATGACXTAGC?G", alphabet)
+            self.assertEqual(str(nuc.translate(to_stop=True)), "MT")
+            self.assertRaises(TranslationError, nuc.translate)
+            self.assertRaises(TranslationError, Seq("AC?", alphabet).translate)
+
     def test_the_translation_of_ambig_codons(self):
         """Check obj.translate() method with ambiguous codons."""
         for letters, ambig_values in [(ambiguous_dna.letters, ambiguous_dna_values),
@@ -527,6 +560,112 @@ class StringMethodTests(unittest.TestCase):
 
     #TODO - Addition...
 
+
+class BufferSeqTests(unittest.TestCase):
+    """Check BufferSeq and PackedSeq slices share their buffer."""
+
+    def test_bytearray(self):
+        """BufferSeq using a bytearray."""
+        data = bytearray("ACGTACGTNNNNACGT")
+        s = BufferSeq(data, generic_dna)
+        sub = s[4:12]
+        self.assertTrue(sub._buffer is data)
+        self.assertEqual(str(sub), "ACGTNNNN")
+        self.assertEqual(str(sub[4:]), "NNNN")
+        self.assertEqual(str(sub.reverse_complement()), "NNNNACGT")
+        self.assertEqual(sub.count("N"), 4)
+        self.assertEqual(sub.find("N"), 4)
+
+    def test_mmap(self):
+        """BufferSeq using a memory mapped file."""
+        import mmap
+        handle = open("Fasta/f002", "rb")
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        start = data.find("\n") + 1
+        end = data.find("\n>")
+        s = BufferSeq(data, generic_dna, start, end)
+        self.assertEqual(str(s)[:10], "CGGACCAGAC")
+        self.assertEqual(str(s[2:6]), "GACC")
+        self.assertEqual(str(s[-3:]), data[end - 3:end])
+        self.assertEqual(str(s), data[start:end])
+        data.close()
+        handle.close()
+
+    def test_invalid(self):
+        """BufferSeq and PackedSeq with invalid arguments."""
+        self.assertRaises(TypeError, BufferSeq, Seq("ACGT"))
+        self.assertRaises(ValueError, BufferSeq, "ACGT", generic_dna, 3, 2)
+        self.assertRaises(ValueError, BufferSeq, "ACGT", generic_dna, 0, 5)
+        self.assertRaises(ValueError, PackedSeq, "acgt")
+        self.assertRaises(IndexError, BufferSeq("ACGT").__getitem__, 4)
+        self.assertRaises(IndexError, PackedSeq("ACGT").__getitem__, -5)
+
+    def test_packed(self):
+        """PackedSeq round trips and slicing."""
+        letters = "ACGT" * 25 + "TTGCA"
+        s = PackedSeq(letters, generic_dna)
+        self.assertEqual(len(s._buffer), 27)
+        self.assertEqual(str(s), letters)
+        for start in range(0, 10):
+            for end in range(95, 106):
+                sub = s[start:end]
+                self.assertTrue(sub._buffer is s._buffer)
+                self.assertEqual(str(sub), letters[start:end])
+                self.assertEqual(len(sub), len(letters[start:end]))
+        self.assertEqual(str(s + "NN"), letters + "NN")
+        self.assertTrue(isinstance(s + "NN", Seq))
+
+    def test_reverse_complement_views(self):
+        """Slices of reverse complement views."""
+        letters = "ACGTTTAGGCCAGTTNACGTACCAGATTACC"
+        rc_letters = str(Seq(letters, generic_dna).reverse_complement())
+        for s in [BufferSeq(letters, generic_dna),
+                  BufferSeq(letters.lower(), generic_dna)]:
+            rc = s.reverse_complement()
+            self.assertTrue(rc._buffer is s._buffer)
+            self.assertEqual(str(rc).upper(), rc_letters)
+            self.assertEqual(str(rc.reverse_complement()), str(s))
+            for start in range(-5, 7):
+                for end in range(-7, 5):
+                    sub = rc[start:end]
+                    self.assertTrue(sub._buffer is s._buffer)
+                    self.assertEqual(str(sub).upper(), rc_letters[start:end])
+                    self.assertEqual(str(sub[1:-1]).upper(),
+                                     rc_letters[start:end][1:-1])
+                    self.assertEqual(str(sub.reverse_complement()),
+                        str(Seq(str(sub), generic_dna).reverse_complement()))
+            for i in range(-len(rc), len(rc)):
+                self.assertEqual(rc[i].upper(), rc_letters[i])
+            self.assertEqual("".join(rc).upper(), rc_letters)
+        letters = "ACGTTTAGGCCAGTTAACGTACCAGATTACC"
+        rc_letters = str(Seq(letters, generic_dna).reverse_complement())
+        packed = PackedSeq(letters)
+        self.assertEqual(str(packed.reverse_complement()[3:20]),
+                         rc_letters[3:20])
+        self.assertEqual(str(packed[3:20].reverse_complement()),
+                         rc_letters[-20:-3])
+
+    def test_reverse_complement_rna(self):
+        """Reverse complement views with RNA or generic nucleotides."""
+        s = BufferSeq("ACGUGGGU", generic_nucleotide)
+        self.assertEqual(str(s.reverse_complement()), "ACCCACGU")
+        s = BufferSeq("ACGUGGGT", generic_nucleotide)
+        self.assertRaises(ValueError, s.reverse_complement)
+        s = BufferSeq("MKLV", generic_protein)
+        self.assertRaises(ValueError, s.reverse_complement)
+
+    def test_extract(self):
+        """Extracting reverse strand features from a BufferSeq."""
+        from Bio.SeqFeature import SeqFeature, FeatureLocation
+        letters = "ACGTTTAGGCCAGTTNACGTACCAGATTACC"
+        s = BufferSeq(letters, generic_dna)
+        f = SeqFeature(FeatureLocation(5, 20), strand=-1)
+        sub = f.extract(s)
+        self.assertTrue(sub._buffer is s._buffer)
+        self.assertEqual(str(sub), str(f.extract(Seq(letters, generic_dna))))
+        self.assertEqual(str(sub.translate()),
+                         str(f.extract(Seq(letters, generic_dna)).translate()))
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
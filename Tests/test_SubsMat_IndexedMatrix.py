@@ -0,0 +1,96 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for the IndexedMatrix class in Bio.SubsMat."""
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SubsMat.IndexedMatrix.")
+
+import cPickle
+import os
+import unittest
+
+from Bio import pairwise2
+from Bio import SubsMat
+from Bio.SubsMat import MatrixInfo, IndexedMatrix
+
+
+class IndexedMatrixTests(unittest.TestCase):
+
+    def test_matrix_info(self):
+        """Same scores as the MatrixInfo dictionaries."""
+        for name in MatrixInfo.available_matrices:
+            data = getattr(MatrixInfo, name)
+            matrix = IndexedMatrix(data)
+            for (letter1, letter2), value in data.iteritems():
+                self.assertEqual(matrix[letter1, letter2], value)
+                self.assertEqual(matrix(letter2, letter1), value)
+
+    def test_letters(self):
+        """Using a subset of the letters in a given order."""
+        matrix = IndexedMatrix(MatrixInfo.blosum62, "WAC")
+        self.assertEqual(len(matrix), 3)
+        self.assertEqual(matrix.array.tolist(),
+                         [[11, -3, -2], [-3, 4, 0], [-2, 0, 9]])
+        self.assertEqual(list(matrix.encode("CAW")), [2, 1, 0])
+        self.assertRaises(ValueError, matrix.encode, "CAT")
+        self.assertTrue(("A", "W") in matrix)
+        self.assertFalse(("A", "T") in matrix)
+
+    def test_missing(self):
+        """Missing scores are an error."""
+        self.assertRaises(ValueError, IndexedMatrix,
+                          {("A", "A"): 1, ("C", "C"): 1})
+
+    def test_scores(self):
+        """Vectorised scores against the dictionary."""
+        matrix = IndexedMatrix(MatrixInfo.pam250)
+        seq1, seq2 = "MKTAYIAKQRQISFVKSHF", "MKTLYVAKQKQLSFVRSHY"
+        expected = [MatrixInfo.pam250.get((a, b), MatrixInfo.pam250.get((b, a)))
+                    for a, b in zip(seq1, seq2)]
+        self.assertEqual(list(matrix.score_pairs(seq1, seq2)), expected)
+        self.assertEqual(matrix.score(matrix.encode(seq1), seq2),
+                         sum(expected))
+        scores = matrix.pair_scores(seq1, seq2[:5])
+        self.assertEqual(scores.shape, (len(seq1), 5))
+        self.assertEqual(scores[3, 4], matrix["A", "Y"])
+        self.assertRaises(ValueError, matrix.score, seq1, seq2[:-1])
+
+    def test_entropy(self):
+        """Entropy functions agree with SeqMat."""
+        pickle_file = os.path.join('SubsMat', 'acc_rep_mat.pik')
+        acc_rep_mat = cPickle.load(open(pickle_file, 'rb'))
+        acc_rep_mat = SubsMat.AcceptedReplacementsMatrix(acc_rep_mat)
+        obs_freq_mat = SubsMat._build_obs_freq_mat(acc_rep_mat)
+        obs_freq_mat.make_entropy()
+        self.assertAlmostEqual(IndexedMatrix(obs_freq_mat).entropy(),
+                               obs_freq_mat.entropy)
+        subs_mat = SubsMat.observed_frequency_to_substitution_matrix(
+            obs_freq_mat)
+        self.assertAlmostEqual(
+            IndexedMatrix(subs_mat).relative_entropy(obs_freq_mat,
+                                                     log_odds=False),
+            subs_mat.calculate_relative_entropy(obs_freq_mat))
+        lo_mat = SubsMat.make_log_odds_matrix(acc_rep_mat)
+        self.assertAlmostEqual(
+            IndexedMatrix(lo_mat).relative_entropy(
+                IndexedMatrix(obs_freq_mat)),
+            lo_mat.calculate_relative_entropy(obs_freq_mat))
+
+    def test_pairwise2(self):
+        """Same alignments as using the dictionary in pairwise2."""
+        matrix = IndexedMatrix(MatrixInfo.blosum62)
+        seq1, seq2 = "KEVLAHHWCTYR", "EVLAWCYR"
+        self.assertEqual(
+            pairwise2.align.localds(seq1, seq2, matrix, -5, -1),
+            pairwise2.align.localds(seq1, seq2, MatrixInfo.blosum62, -5, -1))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -0,0 +1,202 @@
+# Copyright 2012 by the Biopython developers.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Test code for working with BGZF files (used in BAM files).
+
+See also the doctests in bgzf.py which are called via run_tests.py
+"""
+
+import unittest
+import gzip
+import os
+
+from Bio._py3k import _as_bytes
+from Bio import bgzf
+
+
+class BgzfTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_file = "temp.bgzf"
+        if os.path.isfile(self.temp_file):
+            os.remove(self.temp_file)
+
+    def tearDown(self):
+        if os.path.isfile(self.temp_file):
+            os.remove(self.temp_file)
+
+    def rewrite(self, compressed_input_file, output_file):
+        h = gzip.open(compressed_input_file, "rb")
+        data = h.read()
+        h.close()
+
+        h = bgzf.BgzfWriter(output_file, "wb")
+        h.write(data)
+        h.close() #Gives empty BGZF block as BAM EOF marker
+
+        h = gzip.open(output_file)
+        new_data = h.read()
+        h.close()
+
+        #Check the decompressed files agree
+        self.assertTrue(new_data, "Empty BGZF file?")
+        self.assertEqual(len(data), len(new_data))
+        self.assertEqual(data, new_data)
+
+    def check_blocks(self, old_file, new_file):
+        h = open(old_file, "rb")
+        old = list(bgzf.BgzfBlocks(h))
+        h.close()
+        h = open(new_file, "rb")
+        new = list(bgzf.BgzfBlocks(h))
+        h.close()
+        self.assertEqual(len(old), len(new))
+        self.assertEqual(old, new)
+
+    def check_by_line(self, old_file, new_file, old_gzip=False):
+        for mode in ["r", "rb"]:
+            if old_gzip:
+                h = gzip.open(old_file, mode)
+            else:
+                h = open(old_file, mode)
+            old = h.read()
+            #Seems gzip can return bytes even if mode="r",
+            #perhaps a bug in Python 3.2?
+            if "b" in mode:
+                old = _as_bytes(old)
+            h.close()
+
+            for cache in [1, 10]:
+                h = bgzf.BgzfReader(new_file, mode, max_cache=cache)
+                new = _as_bytes("").join(_as_bytes(line) for line in h)
+                h.close()
+
+                self.assertEqual(len(old), len(new))
+                self.assertEqual(old[:10], new[:10], \
+                                 "%r vs %r, mode %r" % (old[:10], new[:10], mode))
+                self.assertEqual(old, new)
+
+    def check_random(self, filename):
+        """Check BGZF random access by reading blocks in forward & reverse order"""
+        h = gzip.open(filename, "rb")
+        old = h.read()
+        h.close()
+
+        h = open(filename, "rb")
+        blocks = list(bgzf.BgzfBlocks(h))
+        h.close()
+
+        #Forward
+        new = _as_bytes("")
+        h = bgzf.BgzfReader(filename, "rb")
+        self.assertTrue(h.seekable())
+        self.assertFalse(h.isatty())
+        self.assertEqual(h.fileno(), h._handle.fileno())
+        for start, raw_len, data_start, data_len in blocks:
+            h.seek(bgzf.make_virtual_offset(start, 0))
+            data = h.read(data_len)
+            self.assertEqual(len(data), data_len)
+            self.assertEqual(len(new), data_start)
+            new += data
+        h.close()
+        self.assertEqual(len(old), len(new))
+        self.assertEqual(old, new)
+
+        #Reverse
+        new = _as_bytes("")
+        h = bgzf.BgzfReader(filename, "rb")
+        for start, raw_len, data_start, data_len in blocks[::-1]:
+            h.seek(bgzf.make_virtual_offset(start, 0))
+            data = h.read(data_len)
+            self.assertEqual(len(data), data_len)
+            new = data + new
+        h.close()
+        self.assertEqual(len(old), len(new))
+        self.assertEqual(old, new)
+
+        #Jump back - non-sequential seeking
+        if len(blocks) >= 3:
+            h = bgzf.BgzfReader(filename, "rb", max_cache=1)
+            #Seek to a late block in the file,
+            #half way into the third last block
+            start, raw_len, data_start, data_len = blocks[-3]
+            voffset = bgzf.make_virtual_offset(start, data_len // 2)
+            h.seek(voffset)
+            self.assertEqual(voffset, h.tell())
+            data = h.read(1000)
+            self.assertTrue(data in old)
+            self.assertEqual(old.find(data), data_start + data_len // 2)
+            #Now seek to an early block in the file,
+            #half way into the second block
+            start, raw_len, data_start, data_len = blocks[1]
+            h.seek(bgzf.make_virtual_offset(start, data_len // 2))
+            voffset = bgzf.make_virtual_offset(start, data_len // 2)
+            h.seek(voffset)
+            self.assertEqual(voffset, h.tell())
+            #Now read all rest of this block and start of next block
+            data = h.read(data_len + 1000)
+            self.assertTrue(data in old)
+            self.assertEqual(old.find(data), data_start + data_len // 2)
+            h.close()
+
+    def test_random_genbank(self):
+        """Check random access to GenBank/NC_000932.gb.bgz"""
+        self.check_random("GenBank/NC_000932.gb.bgz")
+
+    def test_random_fastq(self):
+        """Check random access to Quality/example.fastq.bgz"""
+        self.check_random("Quality/example.fastq.bgz")
+
+    def test_text_genbank(self):
+        """Check text mode access to GenBank/NC_000932.gb.bgz"""
+        self.check_by_line("GenBank/NC_000932.gb",
+                           "GenBank/NC_000932.gb.bgz")
+
+    def test_text_fastq(self):
+        """Check text mode access to Quality/example.fastq.bgz"""
+        self.check_by_line("Quality/example.fastq",
+                           "Quality/example.fastq.bgz")
+
+    def test_write_genbank(self):
+        """Check rewriting GenBank/NC_000932.gb.bgz gives the same blocks"""
+        self.rewrite("GenBank/NC_000932.gb.bgz", self.temp_file)
+        self.check_blocks("GenBank/NC_000932.gb.bgz", self.temp_file)
+
+    def test_write_tell(self):
+        """Check offset works during BGZF writing"""
+        h = bgzf.BgzfWriter(self.temp_file, "w")
+        offset1 = h.tell()
+        self.assertEqual(offset1, 0)
+        h.write("Magic\n" * 20000)
+        offset2 = h.tell()
+        h.write("Spell\n" * 20000)
+        offset3 = h.tell()
+        h.close()
+
+        h = bgzf.BgzfReader(self.temp_file, "r")
+        h.seek(offset1)
+        self.assertEqual(offset1, h.tell())
+        self.assertEqual(h.readline(), "Magic\n")
+        h.seek(offset2)
+        self.assertEqual(offset2, h.tell())
+        self.assertEqual(h.readline(), "Spell\n")
+        h.seek(offset3)
+        #Here tell may instead give the start of the (empty) next block
+        self.assertEqual(h.readline(), "")
+        h.close()
+
+    def test_cache_size(self):
+        """Check the decompressed block cache is limited in size"""
+        self.assertRaises(ValueError, bgzf.BgzfReader,
+                          "GenBank/NC_000932.gb.bgz", max_cache=0)
+        h = bgzf.BgzfReader("GenBank/NC_000932.gb.bgz", "rb", max_cache=2)
+        data = h.read()
+        self.assertEqual(len(data), 305622)
+        self.assertTrue(len(h._buffers) <= 2)
+        h.close()
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity = 2)
+    unittest.main(testRunner=runner)
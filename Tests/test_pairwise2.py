@@ -5,8 +5,10 @@
 # as part of this package.
 
 import unittest
+from random import Random
 
 from Bio import pairwise2
+from Bio.SubsMat.MatrixInfo import blosum62
 
 
 class TestPairwiseGlobal(unittest.TestCase):
@@ -379,6 +381,144 @@ abcde
 """)
 
 
+class TestPairwiseLinearMemory(unittest.TestCase):
+
+    def setUp(self):
+        # Small blocks so that the divide and conquer code is used
+        self.old_block_size = pairwise2._LinearAligner.block_size
+        pairwise2._LinearAligner.block_size = 4
+
+    def tearDown(self):
+        pairwise2._LinearAligner.block_size = self.old_block_size
+
+    def test_globalxx_linear_memory(self):
+        aligns = pairwise2.align.globalxx("GAACT", "GAT", linear_memory=1)
+        self.assertEqual(len(aligns), 1)
+        self.assertTrue(aligns[0] in pairwise2.align.globalxx("GAACT", "GAT"))
+
+    def test_globalms_linear_memory(self):
+        seqA = "ACGTTGACCATGACGATTACGGATCCA"
+        seqB = "ACGTGACCATGCCGATTTACGGATCA"
+        for penalize_end_gaps in [0, 1]:
+            aligns = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                penalize_end_gaps=penalize_end_gaps)
+            best = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                penalize_end_gaps=penalize_end_gaps,
+                                linear_memory=1)
+            self.assertEqual(len(best), 1)
+            self.assertTrue(best[0] in aligns)
+            score = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                penalize_end_gaps=penalize_end_gaps,
+                                linear_memory=1, score_only=1)
+            self.assertEqual(score, aligns[0][2])
+
+    def test_localms_linear_memory(self):
+        aligns = pairwise2.align.localms("TTTTACGTACGTTTTT", "GGACGTCCGTGG",
+                                         2, -1, -2, -1, linear_memory=1)
+        self.assertEqual(len(aligns), 1)
+        seq1, seq2, score, begin, end = aligns[0]
+        alignment = pairwise2.format_alignment(seq1, seq2, score, begin, end)
+        self.assertEqual(alignment, """\
+TTTTACGTACGTTTTT
+    ||||||||
+--GGACGTCCGTGG--
+  Score=13
+""")
+
+    def test_globalms_banded(self):
+        seqA = "ACGTTGACCATGACGATTACGGATCCAAGGCTAGCTAGGATCGA"
+        seqB = "ACGTGACCATGCCGATTTACGGATCAAGGCTAGCTTAGGATCGA"
+        score = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                         score_only=1)
+        aligns = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                          band_width=2)
+        self.assertEqual(len(aligns), 1)
+        self.assertEqual(aligns[0][2], score)
+        # Too narrow a band can't find the best alignment
+        narrow = pairwise2.align.globalms(seqA, seqB, 2, -1, -3, -0.5,
+                                          band_width=0)
+        self.assertTrue(narrow[0][2] < score)
+        self.assertEqual(narrow[0][0].replace("-", ""), seqA)
+        self.assertEqual(narrow[0][1].replace("-", ""), seqB)
+
+    def test_global_random(self):
+        """Global scores match the generic code for random sequences."""
+        random = Random(11)
+        for trial in range(100):
+            alphabet = random.choice(["ACGT", "ACDEFGHIKLMNPQRSTVWY"])
+            seqA = "".join(random.choice(alphabet)
+                           for i in range(random.randint(1, 15)))
+            seqB = "".join(random.choice(alphabet)
+                           for i in range(random.randint(1, 15)))
+            gap_open = -random.choice([0.5, 1, 2, 3, 5])
+            gap_extend = max(gap_open, -random.choice([0, 0.5, 1]))
+            if alphabet == "ACGT":
+                align = pairwise2.align.globalms
+                args = (seqA, seqB, 2, -1, gap_open, gap_extend)
+            else:
+                align = pairwise2.align.globalds
+                args = (seqA, seqB, blosum62, gap_open, gap_extend)
+            penalize_end_gaps = random.choice([0, 1])
+            aligns = align(force_generic=1,
+                           penalize_end_gaps=penalize_end_gaps, *args)
+            for option in [{"linear_memory": 1},
+                           {"band_width": max(len(seqA), len(seqB))}]:
+                best = align(penalize_end_gaps=penalize_end_gaps,
+                             *args, **option)
+                self.assertEqual(len(best), 1)
+                self.assertAlmostEqual(best[0][2], aligns[0][2])
+                self.assertEqual(best[0][0].replace("-", ""), seqA)
+                self.assertEqual(best[0][1].replace("-", ""), seqB)
+                if len(aligns) < pairwise2.MAX_ALIGNMENTS:
+                    self.assertTrue(best[0] in aligns)
+
+    def test_generic_gaps_not_supported(self):
+        gap_fn = lambda index, length: -length
+        self.assertRaises(ValueError, pairwise2.align.globalxc, "GAACT",
+                          "GAT", gap_fn, gap_fn, linear_memory=1)
+
+
+class TestPairwiseBatch(unittest.TestCase):
+
+    targets = [("a", "GAT"), ("b", "TTTT"), ("c", "GAACT"), ("d", "AAC")]
+
+    def test_batch_score_only(self):
+        results = list(pairwise2.align.globalms.batch(
+            "GAACT", self.targets, 2, -1, -0.5, -0.1, score_only=1))
+        self.assertEqual([r[0] for r in results], ["a", "b", "c", "d"])
+        for (target_id, seq), (result_id, score, aligns) \
+        in zip(self.targets, results):
+            self.assertEqual(score, pairwise2.align.globalms(
+                "GAACT", seq, 2, -1, -0.5, -0.1, score_only=1))
+            self.assertEqual(aligns, None)
+
+    def test_batch_alignments(self):
+        matrix = {("A", "A"): 2, ("C", "C"): 2, ("G", "G"): 2,
+                  ("T", "T"): 2, ("A", "C"): -1, ("A", "G"): -1,
+                  ("A", "T"): -1, ("C", "G"): -1, ("C", "T"): -1,
+                  ("G", "T"): -1}
+        results = list(pairwise2.align.localds.batch(
+            "GAACT", self.targets, matrix, -1, -1))
+        for (target_id, seq), (result_id, score, aligns) \
+        in zip(self.targets, results):
+            self.assertEqual(target_id, result_id)
+            expected = pairwise2.align.localds("GAACT", seq, matrix, -1, -1)
+            self.assertEqual(aligns, expected)
+            self.assertEqual(score, expected[0][2])
+
+    def test_batch_top(self):
+        results = pairwise2.align.globalxx.batch(
+            "GAACT", self.targets, score_only=1, top=2)
+        self.assertFalse(isinstance(results, list))
+        self.assertEqual(list(results), [("c", 5, None), ("a", 3, None)])
+
+    def test_batch_workers(self):
+        results = list(pairwise2.align.globalxx.batch(
+            "GAACT", self.targets, score_only=1, workers=2))
+        self.assertEqual(results, [("a", 3, None), ("b", 1, None),
+                                   ("c", 5, None), ("d", 3, None)])
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)